@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Urbanfix.settings')
 
 application = get_asgi_application()
+
+# Per-process caches loaded before the first request
+from user.duplicates import duplicate_index  # noqa: E402
+
+duplicate_index.warm()
@@ -128,6 +128,37 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media') 
 
+# Background complaint exports hold personal data: kept outside MEDIA_ROOT and only
+# served to admins by admin_dashboard's download_export view
+EXPORT_ROOT = os.path.join(BASE_DIR, 'private', 'exports')
+
+
+# Shared by every worker process on this host: contractor principal version stamps
+# (contractor/principal.py), map tiles, analytics. With several hosts use
+# 'django.core.cache.backends.redis.RedisCache' with 'LOCATION': 'redis://...'.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# Route the hot read views (home, tracking, contractor dashboard and complaint list,
+# complaints API list and detail) to their async variants. Turn on when serving with
+# an ASGI server (uvicorn Urbanfix.asgi:application); under WSGI the sync views are
+# cheaper.
+ASYNC_VIEWS = False
+
+
+# Live complaint updates (user/live.py), served over ASGI. The in-process broker only
+# reaches clients of the same process; use 'user.live.RedisBroker' with
+# 'OPTIONS': {'url': 'redis://...'} when running several workers.
+LIVE_UPDATES = {
+    'BROKER': 'user.live.InProcessBroker',
+    'OPTIONS': {},
+}
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
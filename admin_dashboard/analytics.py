@@ -0,0 +1,168 @@
+# admin_dashboard/analytics.py
+"""
+Vectorized complaint analytics for the admin dashboards.
+
+load() reads every complaint submitted in a date range with a single values_list()
+pass. The resolution time comes from the event log, through a correlated subquery
+on complaint_event_idx. Timestamps come back from the database as epoch seconds
+(EpochSeconds), so the columns go straight into NumPy arrays, and the statistics
+are computed on whole arrays: Python only loops over the handful of categories and
+contractors, never over complaints. The backlog histogram covers every open
+complaint, whenever it was submitted. summary() caches the results per date range.
+"""
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import FloatField, Func, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from user.models import Complaint, ComplaintEvent
+
+PERCENTILES = (50, 75, 90, 95)
+BACKLOG_AGE_BINS = (0, 1, 3, 7, 14, 30, 60, 90)   # Days; the last bin is open-ended
+CACHE_TIMEOUT = 10 * 60
+OPEN_STATUSES = ('pending', 'in_progress')
+
+
+class EpochSeconds(Func):
+    """
+    A datetime column as seconds since the Unix epoch (float; NULL stays NULL).
+    """
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)'
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # Stored as UTC text; julianday() keeps the fractional seconds
+        return self.as_sql(compiler, connection, template='(julianday(%(expressions)s) - 2440587.5) * 86400.0',
+                           **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='UNIX_TIMESTAMP(%(expressions)s)', **extra_context)
+
+
+def _epoch_seconds(values):
+    # NULLs (None) become NaN
+    return np.array(values, dtype=np.float64)
+
+
+def load(start, end):
+    """
+    Arrays for the complaints submitted in [start, end) (aware datetimes): epoch
+    seconds `submitted` / `resolved` (NaN if not resolved), and `status`,
+    `category` and `contractor` (0 if unassigned) per complaint.
+    """
+    first_resolution = ComplaintEvent.objects.filter(
+        complaint_id=OuterRef('pk'), kind=ComplaintEvent.STATUS_CHANGED,
+        status=ComplaintEvent.STATUS_CODES['resolved'],
+    ).order_by('ts').values('ts')[:1]
+    rows = list(
+        Complaint.objects.filter(submitted_at__gte=start, submitted_at__lt=end)
+        .values_list(EpochSeconds('submitted_at'), EpochSeconds(Subquery(first_resolution)), 'status', 'category',
+                     Coalesce('assigned_to_id', Value(0)))
+    )
+    submitted, resolved, status, category, contractor = zip(*rows) if rows else ((),) * 5
+    resolved_at = _epoch_seconds(resolved)
+    statuses = np.array(status, dtype='U20')
+    resolved_at[statuses != 'resolved'] = np.nan    # Reopened since
+    return {
+        'submitted': _epoch_seconds(submitted),
+        'resolved': resolved_at,
+        'status': statuses,
+        'category': np.array(category, dtype='U50'),
+        'contractor': np.array(contractor, dtype=np.int64),
+    }
+
+
+def _split_by(keys, values):
+    """
+    {key: values for that key}, with one sort instead of a mask per group.
+    """
+    order = np.argsort(keys, kind='stable')
+    groups, starts = np.unique(keys[order], return_index=True)
+    return dict(zip(groups.tolist(), np.split(values[order], starts[1:])))
+
+
+def resolution_times(data, by):
+    """
+    {group: {'count', 'mean', 'p50', 'p75', ...}} in hours, grouped by 'category' or
+    'contractor', plus the '__all__' total.
+    """
+    done = ~np.isnan(data['resolved'])
+    hours = (data['resolved'][done] - data['submitted'][done]) / 3600
+    groups = _split_by(data[by][done], hours)
+    groups['__all__'] = hours
+    result = {}
+    for group, values in groups.items():
+        if not len(values):
+            continue
+        stats = {'count': int(len(values)), 'mean': round(float(values.mean()), 1)}
+        for pct, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            stats[f'p{pct}'] = round(float(value), 1)
+        result[group] = stats
+    return result
+
+
+def open_submitted():
+    """
+    Epoch seconds of submission of every open complaint, however old (one pass over
+    complaint_status_sub_idx).
+    """
+    return _epoch_seconds(
+        Complaint.objects.filter(status__in=OPEN_STATUSES).values_list(EpochSeconds('submitted_at'), flat=True)
+    )
+
+
+def backlog_age_histogram(submitted, now):
+    """
+    Open complaints per age bucket (BACKLOG_AGE_BINS, in days), from their epoch
+    submission times (open_submitted()).
+    """
+    ages = (now.timestamp() - submitted) / 86400
+    counts, _ = np.histogram(ages, bins=[*BACKLOG_AGE_BINS, np.inf])
+    labels = [f"{low}-{high}d" for low, high in zip(BACKLOG_AGE_BINS, BACKLOG_AGE_BINS[1:])]
+    labels.append(f"{BACKLOG_AGE_BINS[-1]}d+")
+    return {'labels': labels, 'counts': counts.tolist()}
+
+
+def weekly_throughput(data, by, start, end):
+    """
+    Complaints resolved per week of the range, per group: {'weeks': [start dates],
+    'series': {group: [count per week]}}.
+    """
+    week = 7 * 86400
+    n_weeks = max(int(np.ceil((end - start).total_seconds() / week)), 1)
+    done = ~np.isnan(data['resolved'])
+    week_index = ((data['resolved'][done] - start.timestamp()) // week).astype(np.int64)
+    in_range = (week_index >= 0) & (week_index < n_weeks)
+    groups, group_index = np.unique(data[by][done][in_range], return_inverse=True)
+    counts = np.bincount(group_index * n_weeks + week_index[in_range], minlength=len(groups) * n_weeks)
+    return {
+        'weeks': [(start + timedelta(weeks=i)).date().isoformat() for i in range(n_weeks)],
+        'series': dict(zip(groups.tolist(), counts.reshape(len(groups), n_weeks).tolist())),
+    }
+
+
+def summary(start_date, end_date):
+    """
+    All the analytics for complaints submitted from start_date up to and including
+    end_date, and the current backlog, cached per range.
+    """
+    key = f"complaint-analytics:{start_date.isoformat()}:{end_date.isoformat()}"
+    result = cache.get(key)
+    if result is not None:
+        return result
+    start = timezone.make_aware(datetime.combine(start_date, time.min))
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    data = load(start, end)
+    result = {
+        'complaints': int(len(data['submitted'])),
+        'resolution_by_category': resolution_times(data, 'category'),
+        'resolution_by_contractor': resolution_times(data, 'contractor'),
+        'backlog_age': backlog_age_histogram(open_submitted(), timezone.now()),
+        'throughput_by_category': weekly_throughput(data, 'category', start, end),
+        'throughput_by_contractor': weekly_throughput(data, 'contractor', start, end),
+    }
+    cache.set(key, result, CACHE_TIMEOUT)
+    return result
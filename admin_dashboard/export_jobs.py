@@ -0,0 +1,129 @@
+# admin_dashboard/export_jobs.py
+"""
+Background complaint exports: job claiming, file writing and artifact eviction.
+
+Jobs are created by the admin panel and picked up by `manage.py run_export_worker`,
+which runs them on a thread pool. Files reuse the row-building logic in exports.py.
+
+Exports hold personal data. They are written under settings.EXPORT_ROOT, which
+nothing serves, with a random token in the name, and only reach admins through
+the download_export view.
+"""
+import csv
+import os
+import secrets
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.db.models import Sum
+from django.utils import timezone
+
+from user.models import Complaint
+from .exports import EXPORT_HEADERS, complaint_export_rows, stream_xlsx
+from .models import ExportJob
+
+PROGRESS_EVERY = 1000                        # Rows between progress writes
+EXPORT_MAX_AGE = timedelta(days=7)           # Finished artifacts older than this are evicted
+EXPORT_MAX_TOTAL_BYTES = 2 * 1024 ** 3       # Oldest artifacts are evicted above this total
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to 'running'. Returns it, or None.
+    """
+    while True:
+        job = ExportJob.objects.filter(status='queued').order_by('created_at').first()
+        if job is None:
+            return None
+        # Conditional UPDATE: only one worker can win the queued -> running transition
+        claimed = ExportJob.objects.filter(pk=job.pk, status='queued').update(
+            status='running', started_at=timezone.now(), processed_rows=0,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def requeue_interrupted_jobs():
+    """
+    Put jobs left 'running' by a worker that died back on the queue.
+    """
+    return ExportJob.objects.filter(status='running').update(status='queued', started_at=None, processed_rows=0)
+
+
+def _tracked(rows, job):
+    # Count rows as they are written and publish progress every PROGRESS_EVERY rows
+    processed = 0
+    for row in rows:
+        yield row
+        processed += 1
+        if processed % PROGRESS_EVERY == 0:
+            ExportJob.objects.filter(pk=job.pk).update(processed_rows=processed)
+    ExportJob.objects.filter(pk=job.pk).update(processed_rows=processed)
+
+
+def run_job(job):
+    """
+    Write the export file for a claimed job and record the outcome on the job.
+    """
+    # Imported here: views imports this app's models, and the filters live there
+    from .views import filter_complaints
+
+    close_old_connections()
+    storage = ExportJob._meta.get_field('file').storage
+    name = f"urbanfix_complaints_{job.pk}_{timezone.now():%Y%m%d%H%M%S}_{secrets.token_urlsafe(16)}.{job.format}"
+    path = storage.path(name)
+    partial_path = path + '.part'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        complaints, _ = filter_complaints(Complaint.objects.all(), job.filters)
+        ExportJob.objects.filter(pk=job.pk).update(total_rows=complaints.count())
+
+        rows = _tracked(complaint_export_rows(complaints), job)
+        if job.format == 'csv':
+            with open(partial_path, 'w', newline='', encoding='utf-8') as output:
+                writer = csv.writer(output)
+                writer.writerow(EXPORT_HEADERS)
+                writer.writerows(rows)
+        else:
+            with open(partial_path, 'wb') as output:
+                for block in stream_xlsx(rows):
+                    output.write(block)
+        os.replace(partial_path, path)
+
+        ExportJob.objects.filter(pk=job.pk).update(
+            status='done', file=name, file_size=os.path.getsize(path), finished_at=timezone.now(),
+        )
+    except Exception as e:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        ExportJob.objects.filter(pk=job.pk).update(status='failed', error=str(e), finished_at=timezone.now())
+    finally:
+        close_old_connections()
+
+
+def _expire(job):
+    if job.file:
+        job.file.delete(save=False)
+    ExportJob.objects.filter(pk=job.pk).update(status='expired', file='', file_size=0)
+
+
+def evict_exports(max_age=EXPORT_MAX_AGE, max_total_bytes=EXPORT_MAX_TOTAL_BYTES):
+    """
+    Delete finished artifacts older than `max_age`, then the oldest ones until the
+    remaining files fit in `max_total_bytes`. Returns the number of jobs expired.
+    """
+    expired = 0
+    for job in ExportJob.objects.filter(status='done', finished_at__lt=timezone.now() - max_age):
+        _expire(job)
+        expired += 1
+
+    finished = ExportJob.objects.filter(status='done')
+    total_bytes = finished.aggregate(total=Sum('file_size'))['total'] or 0
+    for job in finished.order_by('finished_at'):
+        if total_bytes <= max_total_bytes:
+            break
+        total_bytes -= job.file_size
+        _expire(job)
+        expired += 1
+    return expired
@@ -0,0 +1,46 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.core.management.base import BaseCommand
+
+from admin_dashboard.export_jobs import claim_next_job, evict_exports, requeue_interrupted_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Run queued complaint export jobs on a local thread pool and evict old export files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="Exports written in parallel.")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds between queue checks.")
+        parser.add_argument('--once', action='store_true', help="Drain the queue, then exit.")
+
+    def handle(self, *args, **options):
+        # Run a single worker per deployment: anything still 'running' was orphaned
+        requeued = requeue_interrupted_jobs()
+        if requeued:
+            self.stdout.write(f"Re-queued {requeued} interrupted export job(s).")
+
+        running = set()
+        last_eviction = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                if time.monotonic() - last_eviction > 60:
+                    expired = evict_exports()
+                    if expired:
+                        self.stdout.write(f"Evicted {expired} old export file(s).")
+                    last_eviction = time.monotonic()
+
+                while len(running) < options['workers']:
+                    job = claim_next_job()
+                    if job is None:
+                        break
+                    self.stdout.write(f"Starting {job}.")
+                    running.add(pool.submit(run_job, job))
+
+                if options['once'] and not running:
+                    break
+                if running:
+                    done, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS("Export queue drained."))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:36
+
+import os
+
+import admin_dashboard.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+def expire_public_exports(apps, schema_editor):
+    # Files written before this lived under MEDIA_ROOT/exports/ with guessable names:
+    # remove them rather than move them, their jobs can simply be queued again
+    ExportJob = apps.get_model('admin_dashboard', 'ExportJob')
+    for job in ExportJob.objects.filter(status='done').exclude(file=''):
+        path = os.path.join(settings.MEDIA_ROOT, job.file.name)
+        if os.path.exists(path):
+            os.remove(path)
+    ExportJob.objects.filter(status='done').update(status='expired', file='', file_size=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='file',
+            field=models.FileField(blank=True, storage=admin_dashboard.models.export_storage, upload_to=''),
+        ),
+        migrations.RunPython(expire_public_exports, migrations.RunPython.noop),
+    ]
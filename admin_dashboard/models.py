@@ -1,3 +1,61 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
+from django.contrib.auth.models import User
 
 # Create your models here.
+
+# --- Background Export Jobs ---
+def export_storage():
+    # Not under MEDIA_ROOT: nothing serves these files but download_export
+    return FileSystemStorage(location=settings.EXPORT_ROOT)
+
+
+class ExportJob(models.Model):
+    """
+    A complaint export queued from the admin panel and written to
+    settings.EXPORT_ROOT by `manage.py run_export_worker`.
+    """
+    FORMAT_CHOICES = [
+        ('xlsx', 'Excel (XLSX)'),
+        ('csv', 'CSV'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('expired', 'Expired'),
+    ]
+
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='xlsx')
+    filters = models.JSONField(default=dict, blank=True) # Same keys as the complaint_list query string
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+
+    total_rows = models.IntegerField(default=0)
+    processed_rows = models.IntegerField(default=0)
+    file = models.FileField(storage=export_storage, blank=True)
+    file_size = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Export #{self.pk} ({self.format}, {self.status})"
+
+    @property
+    def progress(self):
+        """
+        Percentage of rows written so far (0-100).
+        """
+        if self.status == 'done':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, int(self.processed_rows * 100 / self.total_rows))
@@ -0,0 +1,147 @@
+# admin_dashboard/pagination.py
+"""
+Keyset (cursor) pagination for the admin complaint list.
+
+Pages are walked on (submitted_at, id), newest first, so fetching page N costs the
+same index seek as page 1; searches are walked on (relevance rank, id) instead.
+Totals are approximated instead of COUNT(*)-ing the table.
+"""
+import base64
+import binascii
+
+from django.db.models import Sum
+from django.utils.dateparse import parse_datetime
+
+from user import search
+from user.models import ComplaintRollup
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+PAGE_SIZE_CHOICES = [25, 50, 100, 200]
+APPROX_COUNT_CAP = 10000   # Filtered counts stop here and are shown as "10000+"
+
+
+def encode_cursor(complaint):
+    raw = f"{complaint.submitted_at.isoformat()}|{complaint.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(value):
+    """
+    Returns (submitted_at, id) for a cursor string, or None if it is malformed.
+    """
+    try:
+        submitted_at, pk = base64.urlsafe_b64decode(value.encode()).decode().split('|')
+        submitted_at = parse_datetime(submitted_at)
+        if submitted_at is None:
+            return None
+        return submitted_at, int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+
+
+def page_size_from(params):
+    try:
+        size = int(params.get('per_page', DEFAULT_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def keyset_page(queryset, params, page_size):
+    """
+    One page of `queryset` after (`?after=`) or before (`?before=`) a cursor.
+
+    Returns a dict with the page's objects and the cursors for the neighbouring pages.
+    """
+    after = decode_cursor(params.get('after', ''))
+    before = decode_cursor(params.get('before', '')) if after is None else None
+
+    if before is not None:
+        submitted_at, pk = before
+        # Written as a range plus an exclusion so the database can seek on submitted_at
+        rows = list(queryset.filter(submitted_at__gte=submitted_at).exclude(
+            submitted_at=submitted_at, id__lte=pk
+        ).order_by('submitted_at', 'id')[:page_size + 1])
+        has_previous = len(rows) > page_size
+        objects = rows[:page_size][::-1]
+        has_next = True
+    else:
+        if after is not None:
+            submitted_at, pk = after
+            queryset = queryset.filter(submitted_at__lte=submitted_at).exclude(
+                submitted_at=submitted_at, id__gte=pk
+            )
+        rows = list(queryset.order_by('-submitted_at', '-id')[:page_size + 1])
+        has_next = len(rows) > page_size
+        objects = rows[:page_size]
+        has_previous = after is not None
+
+    return {
+        'objects': objects,
+        'next_cursor': encode_cursor(objects[-1]) if has_next and objects else None,
+        'previous_cursor': encode_cursor(objects[0]) if has_previous and objects else None,
+    }
+
+
+def encode_rank_cursor(rank, pk):
+    return base64.urlsafe_b64encode(f"r{rank!r}|{pk}".encode()).decode()
+
+
+def decode_rank_cursor(value):
+    """
+    Returns (rank, id) for a search cursor string, or None if it is malformed.
+    """
+    try:
+        rank, pk = base64.urlsafe_b64decode(value.encode()).decode().split('|')
+        if not rank.startswith('r'):
+            return None
+        return float(rank[1:]), int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+
+
+def ranked_page(queryset, text, params, page_size):
+    """
+    keyset_page() for a search: one page of the matches for `text` in `queryset`,
+    most relevant first.
+    """
+    after = decode_rank_cursor(params.get('after', ''))
+    before = decode_rank_cursor(params.get('before', '')) if after is None else None
+
+    rows = search.ranked_matches(text, queryset, after=after, before=before, limit=page_size + 1)
+    if before is not None:
+        has_previous, has_next = len(rows) > page_size, True
+        rows = rows[-page_size:]
+    else:
+        has_previous, has_next = after is not None, len(rows) > page_size
+        rows = rows[:page_size]
+
+    by_id = queryset.in_bulk([pk for pk, _ in rows])
+    objects = [by_id[pk] for pk, _ in rows if pk in by_id]
+    return {
+        'objects': objects,
+        'next_cursor': encode_rank_cursor(*rows[-1][::-1]) if has_next and rows else None,
+        'previous_cursor': encode_rank_cursor(*rows[0][::-1]) if has_previous and rows else None,
+    }
+
+
+def approximate_total(queryset, filters):
+    """
+    A cheap total for the filtered list: (count, is_lower_bound).
+
+    Filters the rollups can express are answered from them; anything else (search,
+    a specific contractor) is a COUNT bounded at APPROX_COUNT_CAP rows.
+    """
+    if not filters['search'] and filters['contractor'] in (None, '', 'assigned', 'unassigned'):
+        rollups = ComplaintRollup.objects.all()
+        if filters['category']:
+            rollups = rollups.filter(category=filters['category'])
+        if filters['status']:
+            rollups = rollups.filter(status=filters['status'])
+        if filters['contractor']:
+            rollups = rollups.filter(is_assigned=filters['contractor'] == 'assigned')
+        return rollups.aggregate(total=Sum('total'))['total'] or 0, False
+
+    count = queryset.order_by()[:APPROX_COUNT_CAP + 1].count()
+    return min(count, APPROX_COUNT_CAP), count > APPROX_COUNT_CAP
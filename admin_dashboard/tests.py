@@ -1,3 +1,306 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from user.models import Complaint, Contractor
+
+from . import analytics, export_jobs, exports
+from .models import ExportJob
+
+COMPLAINT_ID_RE = re.compile(r'name="complaint_ids" value="(\d+)"')
+PAGE_LINK_RE = r'href="\?([^"]*{}=[^"]*)"'
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+# Never the on-disk cache of settings.CACHES: tests clear it
+@override_settings(CACHES=TEST_CACHES)
+class AdminTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.citizen = User.objects.create_user('citizen', 'citizen@example.com', 'pw')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def create_complaints(self, count, **fields):
+        defaults = {'user': self.citizen, 'category': 'road', 'location': 'Main Street',
+                    'description': 'Pothole', 'latitude': 10, 'longitude': 70}
+        return Complaint.bulk_create_reports([Complaint(**{**defaults, **fields}) for _ in range(count)])
+
+    def list_page(self, query):
+        """
+        (complaint ids on the page, next page query, previous page query).
+        """
+        content = self.client.get('/admin-panel/complaints/?' + query).content.decode()
+        links = []
+        for direction in ('after', 'before'):
+            match = re.search(PAGE_LINK_RE.format(direction), content)
+            links.append(match.group(1).replace('&amp;', '&') if match else None)
+        return [int(pk) for pk in COMPLAINT_ID_RE.findall(content)], *links
+
+    def walk(self, query):
+        ids, pages = [], []
+        while query:
+            page, query, _ = self.list_page(query)
+            ids += page
+            pages.append(page)
+        return ids, pages
+
+
+class ComplaintListPaginationTests(AdminTestCase):
+    def test_keyset_pages_cover_every_row_once(self):
+        self.create_complaints(60)
+        ids, pages = self.walk('per_page=25')
+        self.assertEqual([len(page) for page in pages], [25, 25, 10])
+        self.assertEqual(sorted(ids), sorted(Complaint.objects.values_list('id', flat=True)))
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_previous_link_returns_the_previous_page(self):
+        self.create_complaints(60)
+        first, second_query, _ = self.list_page('per_page=25')
+        second, _, previous_query = self.list_page(second_query)
+        self.assertEqual(self.list_page(previous_query)[0], first)
+
+
+class ComplaintSearchTests(AdminTestCase):
+    def test_filtered_search_reaches_every_match(self):
+        # More matches than the old 200-row cap, most of them in another category
+        self.create_complaints(230, category='water', description='Pothole leak')
+        roads = self.create_complaints(40, description='Deep pothole')
+        self.create_complaints(10, description='Broken streetlight')
+
+        ids, pages = self.walk('search=pothole&category=road&per_page=15')
+        self.assertEqual(sorted(ids), sorted(complaint.id for complaint in roads))
+        self.assertEqual(len(pages), 3)
+
+    def test_search_previous_link(self):
+        self.create_complaints(30, description='Pothole')
+        first, second_query, _ = self.list_page('search=pothole&per_page=10')
+        second, _, previous_query = self.list_page(second_query)
+        self.assertFalse(set(first) & set(second))
+        self.assertEqual(self.list_page(previous_query)[0], first)
+
+
+class BulkActionTests(AdminTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.contractor = Contractor.objects.create(name='Roads Ltd', email='roads@example.com', password='pw',
+                                                   specialization='road')
+        cls.retired = Contractor.objects.create(name='Old Roads', email='old@example.com', password='pw',
+                                                specialization='road', is_active=False)
+
+    def bulk(self, complaints, action, **fields):
+        return self.client.post('/admin-panel/complaints/bulk/', {
+            'complaint_ids': [complaint.pk for complaint in complaints], 'action': action, **fields})
+
+    def states(self):
+        return sorted(Complaint.objects.values_list('status', 'assigned_to_id'))
+
+    def test_assign_moves_pending_complaints_in_progress(self):
+        complaints = self.create_complaints(3)
+        self.bulk(complaints[:2], 'assign', assigned_to=self.contractor.pk)
+        self.assertEqual(self.states(), [('in_progress', self.contractor.pk)] * 2 + [('pending', None)])
+        self.contractor.refresh_from_db()
+        self.assertEqual(self.contractor.open_complaints, 2)
+
+    def test_assign_refuses_inactive_contractors(self):
+        complaints = self.create_complaints(2)
+        response = self.bulk(complaints, 'assign', assigned_to=self.retired.pk)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.states(), [('pending', None)] * 2)
+        self.assertEqual(self.bulk(complaints, 'assign', assigned_to='').status_code, 302)
+        self.assertEqual(self.states(), [('pending', None)] * 2)
+
+    def test_unassign_and_set_status(self):
+        complaints = self.create_complaints(3)
+        self.bulk(complaints, 'assign', assigned_to=self.contractor.pk)
+        self.bulk(complaints[:1], 'unassign')
+        self.bulk(complaints[1:2], 'status', status='resolved')
+        self.assertEqual(self.states(), [('in_progress', self.contractor.pk), ('pending', None),
+                                         ('resolved', self.contractor.pk)])
+        self.contractor.refresh_from_db()
+        self.assertEqual((self.contractor.open_complaints, self.contractor.resolved_complaints), (1, 1))
+
+
+class AnalyticsTests(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def summary(self, days=90):
+        today = timezone.localdate()
+        return analytics.summary(today - timedelta(days=days - 1), today)
+
+    def test_backlog_covers_every_open_complaint(self):
+        old, recent, done = self.create_complaints(3)
+        Complaint.objects.filter(pk=old.pk).update(submitted_at=timezone.now() - timedelta(days=200))
+        Complaint.objects.filter(pk=recent.pk).update(submitted_at=timezone.now() - timedelta(days=2))
+        done.status = 'resolved'
+        done.save()
+
+        stats = self.summary()
+        self.assertEqual(stats['complaints'], 2)        # Submitted in the range
+        backlog = dict(zip(stats['backlog_age']['labels'], stats['backlog_age']['counts']))
+        self.assertEqual(sum(backlog.values()), 2)
+        self.assertEqual((backlog['1-3d'], backlog['90d+']), (1, 1))
+        self.assertEqual(stats['resolution_by_category']['road']['count'], 1)
+
+    def test_epoch_seconds_match_python_timestamps(self):
+        complaint, = self.create_complaints(1)
+        complaint.status = 'resolved'
+        complaint.save()
+        complaint.refresh_from_db()
+        data = analytics.load(timezone.now() - timedelta(days=1), timezone.now() + timedelta(days=1))
+        self.assertAlmostEqual(data['submitted'][0], complaint.submitted_at.timestamp(), places=3)
+        self.assertGreaterEqual(data['resolved'][0], data['submitted'][0])
+        self.assertEqual(analytics.open_submitted().size, 0)
+
+
+class StreamingExportTests(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        self.contractor = Contractor.objects.create(name='Roads Ltd', email='roads@example.com', password='pw',
+                                                    specialization='road')
+        self.matching = self.create_complaints(3, description='Deep pothole', assigned_to=self.contractor)
+        self.create_complaints(2, description='Deep pothole')                     # Unassigned
+        self.create_complaints(2, description='Broken streetlight', assigned_to=self.contractor)
+        # The same filters as the complaint list
+        self.filters = {'search': 'pothole', 'contractor': self.contractor.pk}
+
+    def download(self, url):
+        response = self.client.get(url, self.filters)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_rows_match_the_filters(self):
+        response, content = self.download('/admin-panel/export-complaints/csv/')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        header, *rows = csv.reader(io.StringIO(content))
+        self.assertEqual(header, exports.EXPORT_HEADERS)
+        self.assertEqual(sorted(row[0] for row in rows), sorted(complaint.report_id for complaint in self.matching))
+        self.assertEqual({(row[2], row[6], row[7]) for row in rows}, {('Broken Road/Potholes', 'Pending', 'Roads Ltd')})
+
+    def test_ndjson_records_use_raw_codes(self):
+        response, content = self.download('/admin-panel/export-complaints/ndjson/')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(sorted(record['report_id'] for record in records),
+                         sorted(complaint.report_id for complaint in self.matching))
+        record = records[0]
+        self.assertEqual((record['category'], record['status'], record['assigned_to'], record['photo']),
+                         ('road', 'pending', 'Roads Ltd', None))
+        complaint = Complaint.objects.get(report_id=record['report_id'])
+        self.assertEqual(record['submitted_at'], complaint.submitted_at.isoformat())
+
+
+class XlsxExportTests(AdminTestCase):
+    def test_streamed_workbook_has_every_filtered_row(self):
+        roads = self.create_complaints(5, location='A very long street name that sets the column width')
+        self.create_complaints(2, category='water')
+        # Column widths come from a sample; the rows after it are still written
+        with mock.patch.object(exports, 'WIDTH_SAMPLE_SIZE', 2):
+            response = self.client.get('/admin-panel/export-complaints/', {'category': 'road'})
+            content = b''.join(response.streaming_content)
+        self.assertEqual(response['Content-Type'], 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+        worksheet = load_workbook(io.BytesIO(content)).active
+        header, *rows = worksheet.iter_rows(values_only=True)
+        self.assertEqual(list(header), exports.EXPORT_HEADERS)
+        self.assertTrue(worksheet['A1'].font.bold)
+        self.assertEqual(sorted(row[0] for row in rows), sorted(complaint.report_id for complaint in roads))
+        self.assertEqual({row[2] for row in rows}, {'Broken Road/Potholes'})
+        self.assertEqual(worksheet.column_dimensions['D'].width, len(roads[0].location) + 2)
+
+
+class ExportJobTests(AdminTestCase):
+    def setUp(self):
+        super().setUp()
+        export_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_root, ignore_errors=True)
+        self.storage = FileSystemStorage(location=export_root)
+        patcher = mock.patch.object(ExportJob._meta.get_field('file'), 'storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_export(self, **fields):
+        ExportJob.objects.create(requested_by=self.admin, **fields)
+        job = export_jobs.claim_next_job()
+        export_jobs.run_job(job)
+        job.refresh_from_db()
+        return job
+
+    def test_files_are_private_and_only_downloaded_by_admins(self):
+        self.create_complaints(3)
+        job = self.run_export(format='csv')
+        self.assertEqual((job.status, job.processed_rows), ('done', 3))
+        path = self.storage.path(job.file.name)
+        self.assertTrue(os.path.exists(path))
+        self.assertFalse(os.path.abspath(path).startswith(os.path.abspath(settings.MEDIA_ROOT)))
+        # A random token, not just the job id and a timestamp
+        self.assertRegex(job.file.name, rf'^urbanfix_complaints_{job.pk}_\d{{14}}_[\w-]{{22}}\.csv$')
+
+        response = self.client.get(f'/admin-panel/exports/{job.pk}/download/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(job.file.name.rsplit('_', 1)[1], response['Content-Disposition'])
+        self.assertEqual(b''.join(response.streaming_content).decode().count('\n'), 4)
+        response.close()
+
+        self.client.force_login(self.citizen)
+        self.assertEqual(self.client.get(f'/admin-panel/exports/{job.pk}/download/').status_code, 302)
+
+    def test_a_job_is_claimed_once(self):
+        first, second = (ExportJob.objects.create(requested_by=self.admin) for _ in range(2))
+        first_queued = QuerySet.first
+
+        def another_worker_wins(queryset):
+            # Another worker claims the job between our read and our conditional update
+            job = first_queued(queryset)
+            if job is not None and job.pk == first.pk:
+                ExportJob.objects.filter(pk=job.pk).update(status='running')
+            return job
+
+        with mock.patch.object(QuerySet, 'first', another_worker_wins):
+            self.assertEqual(export_jobs.claim_next_job().pk, second.pk)
+        self.assertIsNone(export_jobs.claim_next_job())
+        self.assertEqual(ExportJob.objects.filter(status='running').count(), 2)
+
+    def test_eviction_removes_old_and_excess_files(self):
+        self.create_complaints(2)
+        old, big, recent = (self.run_export(format='csv') for _ in range(3))
+        ExportJob.objects.filter(pk=old.pk).update(finished_at=timezone.now() - export_jobs.EXPORT_MAX_AGE - timedelta(hours=1))
+        ExportJob.objects.filter(pk=big.pk).update(finished_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(export_jobs.evict_exports(max_total_bytes=recent.file_size), 2)
+        self.assertEqual(dict(ExportJob.objects.values_list('pk', 'status')),
+                         {old.pk: 'expired', big.pk: 'expired', recent.pk: 'done'})
+        self.assertEqual(os.listdir(self.storage.location), [recent.file.name])
+        self.assertEqual(self.client.get(f'/admin-panel/exports/{old.pk}/download/').status_code, 404)
+
+
+class LiveUpdatesTests(AdminTestCase):
+    def test_only_admins_get_the_stream(self):
+        self.client.force_login(self.citizen)
+        self.assertEqual(self.client.get('/admin-panel/live/').status_code, 403)
+        self.client.logout()
+        self.assertEqual(self.client.get('/admin-panel/live/').status_code, 403)
+        # Admins are let through; over WSGI the stream answers 204 so EventSource stops retrying
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get('/admin-panel/live/').status_code, 204)
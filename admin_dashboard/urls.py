@@ -9,6 +9,10 @@ urlpatterns = [
     path('logout/', views.admin_logout, name='logout'),
     path('', views.dashboard_home, name='home'),
     path('complaints/', views.complaint_list, name='complaint_list'),
+    path('live/', views.live_updates, name='live_updates'),
+    path('map/', views.complaint_map, name='complaint_map'),
+    path('map/clusters/', views.complaint_clusters, name='complaint_clusters'),
+    path('complaints/bulk/', views.complaint_bulk_action, name='complaint_bulk_action'),
     path('complaints/<str:report_id>/', views.complaint_detail, name='complaint_detail'),
     # --- NEW: Delete Complaint URL ---
     path('complaints/delete/<str:report_id>/', views.delete_complaint, name='delete_complaint'),
@@ -16,6 +20,11 @@ urlpatterns = [
     path('users/', views.user_list, name='user_list'),
     path('users/<int:user_id>/deactivate/', views.deactivate_user, name='deactivate_user'),
     path('export-complaints/', views.export_complaints, name='export_complaints'),
+    path('export-complaints/csv/', views.export_complaints_csv, name='export_complaints_csv'),
+    path('export-complaints/ndjson/', views.export_complaints_ndjson, name='export_complaints_ndjson'),
+    path('exports/', views.export_jobs, name='export_jobs'),
+    path('exports/<int:job_id>/status/', views.export_job_status, name='export_job_status'),
+    path('exports/<int:job_id>/download/', views.download_export, name='download_export'),
     path('monthly-summary/', views.monthly_summary_report, name='monthly_summary_report'),
 
     # --- New Contractor Management URLs ---
@@ -4,19 +4,26 @@ from django.contrib.auth.decorators import user_passes_test, login_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.db import models # Keep this import for Q objects
-from django.db.models import Count, Sum, Case, When, IntegerField
+from django.db.models import Count, F, Sum, Case, When, IntegerField
 from django.db.models.functions import TruncMonth
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
+from itertools import chain
 import csv
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment
-from openpyxl.utils import get_column_letter
-
-from user.models import Complaint, Contractor  # Import Contractor model
+import json
+
+from . import analytics
+from .models import ExportJob
+from .pagination import PAGE_SIZE_CHOICES, approximate_total, keyset_page, page_size_from, ranked_page
+from .exports import EXPORT_HEADERS, Echo, complaint_export_records, complaint_export_rows, stream_xlsx
+from user import clusters, live, search, sla
+from user.models import Complaint, ComplaintRollup, ComplaintSlaBucket, Contractor  # Import Contractor model
 from django.contrib.auth.models import User
 
+ANALYTICS_RANGE_CHOICES = (30, 90, 365)   # Days offered on contractor_analytics
+
 # --- Helper function to check if user is staff/superuser ---
 # ... (is_admin function remains the same) ...
 def is_admin(user):
@@ -55,23 +62,26 @@ def admin_logout(request):
 # ... (dashboard_home view remains the same) ...
 @user_passes_test(is_admin, login_url='/admin-panel/login/')
 def dashboard_home(request):
+    # All complaint KPIs come from the pre-aggregated rollups, not the complaint table
+    rollups = ComplaintRollup.objects.all()
+
     # Total counts
-    total_complaints = Complaint.objects.count()
-    status_counts = Complaint.objects.values('status').annotate(total=Count('status'))
-    status_dict = {item['status']: item['total'] for item in status_counts}
+    total_complaints = rollups.aggregate(total=Sum('total'))['total'] or 0
+    status_counts = rollups.values('status').annotate(count=Sum('total')).filter(count__gt=0).order_by()
+    status_dict = {item['status']: item['count'] for item in status_counts}
 
     total_registered_users = User.objects.filter(is_staff=False, is_superuser=False).count()
 
     # Complaints per category
-    complaints_per_category = Complaint.objects.values('category').annotate(count=Count('category')).order_by('-count')
+    complaints_per_category = rollups.values('category').annotate(count=Sum('total')).filter(count__gt=0).order_by('-count')
 
     # Monthly complaints trend (last 6 months)
     today = timezone.now()
     six_months_ago = today - timedelta(days=180)
-    monthly_complaints = Complaint.objects.filter(submitted_at__gte=six_months_ago) \
-                                        .annotate(month=TruncMonth('submitted_at')) \
+    monthly_complaints = rollups.filter(day__gte=timezone.localdate(six_months_ago)) \
+                                        .annotate(month=TruncMonth('day')) \
                                         .values('month') \
-                                        .annotate(count=Count('report_id')) \
+                                        .annotate(count=Sum('total')) \
                                         .order_by('month')
 
     monthly_labels = [m['month'].strftime("%b %Y") for m in monthly_complaints]
@@ -80,8 +90,8 @@ def dashboard_home(request):
     # --- Contractor KPIs for Dashboard Home ---
     total_contractors = Contractor.objects.count()
     active_contractors = Contractor.objects.filter(is_active=True).count()
-    completed_tasks = Complaint.objects.filter(status='resolved', assigned_to__isnull=False).count()
-    pending_tasks = Complaint.objects.filter(status__in=['pending', 'in_progress'], assigned_to__isnull=False).count()
+    completed_tasks = rollups.filter(status='resolved', is_assigned=True).aggregate(total=Sum('total'))['total'] or 0
+    pending_tasks = rollups.filter(status__in=['pending', 'in_progress'], is_assigned=True).aggregate(total=Sum('total'))['total'] or 0
 
 
     context = {
@@ -99,37 +109,67 @@ def dashboard_home(request):
     }
     return render(request, "admin_dashboard/dashboard.html", context)
 
-# --- Complaint Management: List with Filters ---
-# ... (complaint_list view remains the same) ...
-@user_passes_test(is_admin, login_url='/admin-panel/login/')
-def complaint_list(request):
-    complaints = Complaint.objects.all().select_related('user', 'assigned_to') # Also prefetch assigned_to
-    # ... (filtering and search logic remains the same) ...
-
-    # Filtering
-    category_filter = request.GET.get('category')
-    status_filter = request.GET.get('status')
-    search_query = request.GET.get('search')
-    contractor_filter = request.GET.get('contractor') # New filter for contractors
+# --- Complaint filters shared by the list and the exports ---
+def filter_complaints(complaints, params):
+    """
+    Apply the category / status / search / contractor query parameters.
+    Returns the filtered queryset and the parsed filter values.
+    """
+    category_filter = params.get('category')
+    status_filter = params.get('status')
+    search_query = params.get('search')
+    contractor_filter = params.get('contractor') # New filter for contractors
 
     if category_filter:
         complaints = complaints.filter(category=category_filter)
     if status_filter:
         complaints = complaints.filter(status=status_filter)
     if search_query:
-        complaints = complaints.filter(
-            models.Q(report_id__icontains=search_query) |
-            models.Q(category__icontains=search_query) |
-            models.Q(user__username__icontains=search_query)
-        )
+        # Full-text index over report ID, location, description and username
+        complaints = complaints.filter(search.complaint_search_q(search_query))
     if contractor_filter:
         if contractor_filter == 'unassigned':
             complaints = complaints.filter(assigned_to__isnull=True)
         elif contractor_filter == 'assigned':
             complaints = complaints.filter(assigned_to__isnull=False)
-        else:
+        elif contractor_filter.isdigit():
             complaints = complaints.filter(assigned_to__id=contractor_filter)
+        else:
+            complaints = complaints.none()
 
+    filters = {
+        'category': category_filter,
+        'status': status_filter,
+        'search': search_query,
+        'contractor': contractor_filter,
+    }
+    return complaints, filters
+
+# --- Complaint Management: List with Filters ---
+# ... (complaint_list view remains the same) ...
+@user_passes_test(is_admin, login_url='/admin-panel/login/')
+def complaint_list(request):
+    complaints = Complaint.objects.all().select_related('user', 'assigned_to') # Also prefetch assigned_to
+    complaints, filters = filter_complaints(complaints, request.GET)
+
+    page_size = page_size_from(request.GET)
+    if filters['search'] and search.is_enabled():
+        # Searches list every match by relevance rather than by date, keyset-paged on (rank, id)
+        page = ranked_page(complaints, filters['search'], request.GET, page_size)
+    else:
+        # Keyset pagination on (submitted_at, id): page N costs the same as page 1
+        page = keyset_page(complaints, request.GET, page_size)
+    total, total_is_lower_bound = approximate_total(complaints, filters)
+
+    # Query strings for the neighbouring pages keep every filter
+    page_links = {}
+    for direction, cursor in (('after', page['next_cursor']), ('before', page['previous_cursor'])):
+        if cursor:
+            params = request.GET.copy()
+            params.pop('after', None)
+            params.pop('before', None)
+            params[direction] = cursor
+            page_links[direction] = params.urlencode()
 
     # Get available categories and statuses for filters
     categories = Complaint.CATEGORY_CHOICES
@@ -137,17 +177,100 @@ def complaint_list(request):
     contractors = Contractor.objects.filter(is_active=True).order_by('name') # Active contractors for filter
 
     context = {
-        'complaints': complaints,
+        'complaints': page['objects'],
+        'next_page_query': page_links.get('after'),
+        'previous_page_query': page_links.get('before'),
+        'page_size': page_size,
+        'page_size_choices': PAGE_SIZE_CHOICES,
+        'approx_total': total,
+        'approx_total_is_lower_bound': total_is_lower_bound,
         'categories': categories,
         'statuses': statuses,
         'contractors': contractors, # Pass contractors for filter dropdown
-        'selected_category': category_filter,
-        'selected_status': status_filter,
-        'selected_contractor': contractor_filter,
-        'search_query': search_query,
+        'selected_category': filters['category'],
+        'selected_status': filters['status'],
+        'selected_contractor': filters['contractor'],
+        'search_query': filters['search'],
     }
     return render(request, "admin_dashboard/complaint_list.html", context)
 
+# --- Bulk actions from the complaint list ---
+@user_passes_test(is_admin, login_url='/admin-panel/login/')
+def complaint_bulk_action(request):
+    list_url = reverse('admin_dashboard:complaint_list')
+    if request.POST.get('next'):
+        list_url += '?' + request.POST['next']
+    if request.method != 'POST':
+        return redirect(list_url)
+
+    ids = [value for value in request.POST.getlist('complaint_ids') if value.isdigit()]
+    if not ids:
+        messages.warning(request, "Select at least one complaint.")
+        return redirect(list_url)
+    complaints = Complaint.objects.filter(id__in=ids)
+
+    # Same transitions as complaint_detail, applied with one UPDATE for the whole selection
+    action = request.POST.get('action')
+    if action == 'assign':
+        contractor_id = request.POST.get('assigned_to', '')
+        contractor = Contractor.objects.filter(id=contractor_id, is_active=True).first() if contractor_id.isdigit() else None
+        if contractor is None:
+            messages.error(request, "Choose an active contractor to assign to.")
+            return redirect(list_url)
+        changed = Complaint.bulk_assign(complaints, contractor.id)
+        messages.success(request, f"{changed} complaint(s) assigned to {contractor.name}.")
+    elif action == 'unassign':
+        changed = Complaint.bulk_unassign(complaints)
+        messages.info(request, f"{changed} complaint(s) unassigned.")
+    elif action == 'status' and request.POST.get('status') in dict(Complaint.STATUS_CHOICES):
+        status = request.POST['status']
+        changed = Complaint.bulk_set_status(complaints, status)
+        messages.success(request, f"{changed} complaint(s) set to '{dict(Complaint.STATUS_CHOICES)[status]}'.")
+    else:
+        messages.error(request, "Unknown bulk action.")
+    return redirect(list_url)
+
+# --- Complaint Map (server-side clustering) ---
+@user_passes_test(is_admin, login_url='/admin-panel/login/')
+def complaint_map(request):
+    # Start on the most recent complaint that has coordinates
+    latest = Complaint.objects.filter(latitude__isnull=False, longitude__isnull=False) \
+        .order_by('-submitted_at').values('latitude', 'longitude').first()
+    context = {
+        'center_lat': float(latest['latitude']) if latest else 20.5937,
+        'center_lng': float(latest['longitude']) if latest else 78.9629,
+        'max_zoom': clusters.MAX_ZOOM,
+    }
+    return render(request, "admin_dashboard/complaint_map.html", context)
+
+@user_passes_test(is_admin, login_url='/admin-panel/login/')
+def complaint_clusters(request):
+    # Pre-aggregated clusters for every tile in the viewport, never raw points
+    try:
+        zoom = int(request.GET.get('zoom', ''))
+        west, south, east, north = (float(v) for v in request.GET.get('bbox', '').split(','))
+    except ValueError:
+        return JsonResponse({'error': "Expected zoom=<int> and bbox=west,south,east,north."}, status=400)
+    zoom = max(clusters.MIN_ZOOM, min(zoom, clusters.MAX_ZOOM))
+    west, east = max(west, -180.0), min(east, 180.0)
+    south, north = max(south, -85.0511), min(north, 85.0511)
+
+    tiles = clusters.tiles_in_bbox(zoom, south, west, north, east)
+    if tiles is None:
+        return JsonResponse({'error': "Viewport spans too many tiles; zoom in."}, status=400)
+    result = []
+    for x, y in tiles:
+        result.extend(clusters.clusters_for_tile(zoom, x, y))
+    return JsonResponse({'zoom': zoom, 'clusters': result})
+
+# --- Live updates (Server-Sent Events, ASGI only) ---
+async def live_updates(request):
+    # user_passes_test is sync-only; check the user here instead
+    user = await request.auser()
+    if not is_admin(user):
+        return HttpResponseForbidden()
+    return live.sse_response(request, ['admin'])
+
 # --- Complaint Management: Detail & Contractor Assignment ---
 # ... (complaint_detail view remains the same) ...
 @user_passes_test(is_admin, login_url='/admin-panel/login/')
@@ -247,61 +370,119 @@ def deactivate_user(request, user_id):
 # ... (export_complaints view remains the same) ...
 @user_passes_test(is_admin, login_url='/admin-panel/login/')
 def export_complaints(request):
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    # Streamed: rows are pulled in chunks and written to a write-only workbook
+    complaints, _ = filter_complaints(Complaint.objects.all(), request.GET)
+    response = StreamingHttpResponse(
+        stream_xlsx(complaint_export_rows(complaints)),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
     response['Content-Disposition'] = 'attachment; filename="urbanfix_complaints.xlsx"'
-    workbook = Workbook()
-    worksheet = workbook.active
-    worksheet.title = "Complaints"
-    headers = ["Report ID", "User", "Category", "Location", "Description", "Submitted At", "Status", "Assigned To"]
-    worksheet.append(headers)
-    for col_num, header in enumerate(headers, 1):
-        col_letter = get_column_letter(col_num)
-        worksheet[f"{col_letter}1"].font = Font(bold=True)
-        worksheet[f"{col_letter}1"].alignment = Alignment(horizontal="center")
-        worksheet.column_dimensions[col_letter].width = 18
-    complaints = Complaint.objects.all().select_related('user', 'assigned_to').order_by('-submitted_at')
-    for complaint in complaints:
-        row = [
-            complaint.report_id,
-            complaint.user.username,
-            complaint.get_category_display(),
-            complaint.location,
-            complaint.description,
-            complaint.submitted_at.strftime("%Y-%m-%d %H:%M:%S"),
-            complaint.get_status_display(),
-            complaint.assigned_to.name if complaint.assigned_to else "Unassigned", # New field for export
-        ]
-        worksheet.append(row)
-    for col in worksheet.columns:
-        max_length = 0
-        column = col[0].column
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        worksheet.column_dimensions[get_column_letter(column)].width = adjusted_width
-    workbook.save(response)
     return response
 
+@user_passes_test(is_admin, login_url='/admin-panel/login/')
+def export_complaints_csv(request):
+    # Same columns as the XLSX export, streamed row by row from the cursor
+    complaints, _ = filter_complaints(Complaint.objects.all(), request.GET)
+    writer = csv.writer(Echo())
+    rows = chain([EXPORT_HEADERS], complaint_export_rows(complaints))
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in rows),
+        content_type='text/csv; charset=utf-8',
+    )
+    response['Content-Disposition'] = 'attachment; filename="urbanfix_complaints.csv"'
+    return response
+
+@user_passes_test(is_admin, login_url='/admin-panel/login/')
+def export_complaints_ndjson(request):
+    # One JSON object per line with raw codes and ISO timestamps, for BI jobs
+    complaints, _ = filter_complaints(Complaint.objects.all(), request.GET)
+    response = StreamingHttpResponse(
+        (json.dumps(record) + "\n" for record in complaint_export_records(complaints)),
+        content_type='application/x-ndjson',
+    )
+    response['Content-Disposition'] = 'attachment; filename="urbanfix_complaints.ndjson"'
+    return response
+
+# --- Background Export Jobs ---
+@user_passes_test(is_admin, login_url='/admin-panel/login/')
+def export_jobs(request):
+    if request.method == 'POST':
+        export_format = request.POST.get('format', 'xlsx')
+        if export_format not in dict(ExportJob.FORMAT_CHOICES):
+            messages.error(request, "Unknown export format.")
+            return redirect('admin_dashboard:export_jobs')
+        _, filters = filter_complaints(Complaint.objects.none(), request.POST)
+        job = ExportJob.objects.create(
+            requested_by=request.user,
+            format=export_format,
+            filters={key: value for key, value in filters.items() if value},
+        )
+        messages.success(request, f"Export #{job.pk} queued. It will be available for download here once ready.")
+        return redirect('admin_dashboard:export_jobs')
+
+    jobs = ExportJob.objects.select_related('requested_by')[:50]
+    context = {
+        'jobs': jobs,
+        'format_choices': ExportJob.FORMAT_CHOICES,
+    }
+    return render(request, "admin_dashboard/export_jobs.html", context)
+
+@user_passes_test(is_admin, login_url='/admin-panel/login/')
+def export_job_status(request, job_id):
+    # Polled by the export jobs page while a job is queued or running
+    job = get_object_or_404(ExportJob, id=job_id)
+    return JsonResponse({
+        'id': job.id,
+        'status': job.status,
+        'progress': job.progress,
+        'processed_rows': job.processed_rows,
+        'total_rows': job.total_rows,
+        'error': job.error,
+        'download_url': reverse('admin_dashboard:download_export', args=[job.id]) if job.status == 'done' else None,
+    })
+
+@user_passes_test(is_admin, login_url='/admin-panel/login/')
+def download_export(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id, status='done')
+    if not job.file or not job.file.storage.exists(job.file.name):
+        raise Http404("Export file is no longer available.")
+    # The stored name carries a random token; the download doesn't need it
+    filename = f"urbanfix_complaints_{job.pk}_{job.finished_at:%Y%m%d%H%M%S}.{job.format}"
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=filename)
+
 # ... (monthly_summary_report view remains the same) ...
 @user_passes_test(is_admin, login_url='/admin-panel/login/')
 def monthly_summary_report(request):
     today = timezone.now()
     one_year_ago = today - timedelta(days=365)
-    monthly_data = Complaint.objects.filter(submitted_at__gte=one_year_ago) \
-        .annotate(month=TruncMonth('submitted_at')) \
+    monthly_data = ComplaintRollup.objects.filter(day__gte=timezone.localdate(one_year_ago)) \
+        .annotate(month=TruncMonth('day')) \
         .values('month') \
         .annotate(
-            total=Count('id'),
-            pending=Sum(Case(When(status='pending', then=1), default=0, output_field=IntegerField())),
-            in_progress=Sum(Case(When(status='in_progress', then=1), default=0, output_field=IntegerField())),
-            resolved=Sum(Case(When(status='resolved', then=1), default=0, output_field=IntegerField())),
-            rejected=Sum(Case(When(status='rejected', then=1), default=0, output_field=IntegerField())),
-        ).order_by('month')
-    context = { 'monthly_data': monthly_data, }
+            total_count=Sum('total'),
+            pending=Sum(Case(When(status='pending', then='total'), default=0, output_field=IntegerField())),
+            in_progress=Sum(Case(When(status='in_progress', then='total'), default=0, output_field=IntegerField())),
+            resolved=Sum(Case(When(status='resolved', then='total'), default=0, output_field=IntegerField())),
+            rejected=Sum(Case(When(status='rejected', then='total'), default=0, output_field=IntegerField())),
+        ).filter(total_count__gt=0).order_by('month')
+    # Weekly throughput and resolution-time percentiles per category (NumPy, cached per range)
+    stats = analytics.summary(timezone.localdate(one_year_ago), timezone.localdate(today))
+    category_names = dict(Complaint.CATEGORY_CHOICES)
+    throughput = stats['throughput_by_category']
+    resolution_by_category = [
+        {'name': category_names.get(key, key), **values}
+        for key, values in sorted(stats['resolution_by_category'].items()) if key != '__all__'
+    ]
+    charts = {
+        'weeks': throughput['weeks'],
+        'series': [{'label': category_names.get(key, key), 'data': counts} for key, counts in throughput['series'].items()],
+    }
+    context = {
+        'monthly_data': monthly_data,
+        'resolution_by_category': resolution_by_category,
+        'resolution_overall': stats['resolution_by_category'].get('__all__'),
+        'throughput_charts': charts,
+    }
     return render(request, "admin_dashboard/monthly_summary.html", context)
 
 
@@ -310,8 +491,9 @@ def monthly_summary_report(request):
 @user_passes_test(is_admin, login_url='/admin-panel/login/')
 def contractor_list(request):
     # ... (contractor_list view remains the same) ...
+    # Workload comes from the counter columns on Contractor, not a join over every complaint
     contractors = Contractor.objects.annotate(
-        total_assigned_tasks=Count('assigned_complaints')
+        total_assigned_tasks=F('open_complaints') + F('resolved_complaints') + F('rejected_complaints')
     ).order_by('name')
 
     context = {
@@ -446,27 +628,83 @@ def contractor_analytics(request):
 
     # Complaints assigned per contractor
     contractors_assigned_counts = Contractor.objects.annotate(
-        assigned_count=Count('assigned_complaints')
+        assigned_count=F('open_complaints') + F('resolved_complaints') + F('rejected_complaints')
     ).order_by('-assigned_count')
 
     assigned_labels = [c.name for c in contractors_assigned_counts]
     assigned_data = [c.assigned_count for c in contractors_assigned_counts]
 
     # Task distribution by status for assigned complaints
-    task_distribution_assigned = Complaint.objects.filter(assigned_to__isnull=False) \
+    task_distribution_assigned = ComplaintRollup.objects.filter(is_assigned=True) \
         .values('status') \
-        .annotate(total=Count('status'))
+        .annotate(count=Sum('total')) \
+        .filter(count__gt=0) \
+        .order_by('status')
+    task_dist = {item['status']: item['count'] for item in task_distribution_assigned}
 
-    task_dist_labels = [item['status'].replace('_', ' ').title() for item in task_distribution_assigned]
-    task_dist_data = [item['total'] for item in task_distribution_assigned]
+    task_dist_labels = [status.replace('_', ' ').title() for status in task_dist]
+    task_dist_data = list(task_dist.values())
 
     # Calculate completed vs pending tasks (for assigned tasks only)
-    assigned_resolved_tasks = Complaint.objects.filter(assigned_to__isnull=False, status='resolved').count()
-    assigned_pending_tasks = Complaint.objects.filter(assigned_to__isnull=False, status__in=['pending', 'in_progress']).count()
+    assigned_resolved_tasks = task_dist.get('resolved', 0)
+    assigned_pending_tasks = task_dist.get('pending', 0) + task_dist.get('in_progress', 0)
+
+    # SLA figures come from the precomputed buckets (user/sla.py), never the event log
+    def hours(summary, key):
+        return round(summary[key] / 3600, 1) if summary else None
+
+    sla_tables = {}
+    for by in ('contractor_id', 'category'):
+        to_assign = sla.summaries(ComplaintSlaBucket.TIME_TO_ASSIGN, by)
+        to_resolve = sla.summaries(ComplaintSlaBucket.TIME_TO_RESOLVE, by)
+        reassignments = sla.summaries(ComplaintSlaBucket.REASSIGNMENTS, by)
+        sla_tables[by] = {
+            group: {
+                'assigned': to_assign.get(group, {}).get('count', 0),
+                'assign_p50': hours(to_assign.get(group), 'p50'),
+                'assign_p90': hours(to_assign.get(group), 'p90'),
+                'resolved': to_resolve.get(group, {}).get('count', 0),
+                'resolve_mean': hours(to_resolve.get(group), 'mean'),
+                'resolve_p50': hours(to_resolve.get(group), 'p50'),
+                'resolve_p90': hours(to_resolve.get(group), 'p90'),
+                'reassignments': reassignments.get(group, {}).get('count', 0),
+            }
+            for group in set(to_assign) | set(to_resolve) | set(reassignments)
+        }
+    contractor_sla = [
+        {'name': c.name, **sla_tables['contractor_id'][c.id]}
+        for c in contractors_assigned_counts if c.id in sla_tables['contractor_id']
+    ]
+    category_names = dict(Complaint.CATEGORY_CHOICES)
+    category_sla = [
+        {'name': category_names.get(category, category), **row}
+        for category, row in sorted(sla_tables['category'].items())
+    ]
+
+    # Resolution-time percentiles for the chosen range and the open backlog's age (NumPy, cached per range)
+    range_days = {str(days): days for days in ANALYTICS_RANGE_CHOICES}.get(request.GET.get('days'), 90)
+    today = timezone.localdate()
+    stats = analytics.summary(today - timedelta(days=range_days - 1), today)
+    names = {c.id: c.name for c in contractors_assigned_counts}
+    by_contractor = {k: v for k, v in stats['resolution_by_contractor'].items() if k in names}
+    charts = {
+        'resolution': {
+            'labels': [names[k] for k in by_contractor],
+            'p50': [v['p50'] for v in by_contractor.values()],
+            'p90': [v['p90'] for v in by_contractor.values()],
+        },
+        'backlog_age': stats['backlog_age'],
+    }
 
     context = {
         'total_contractors': total_contractors,
         'active_contractors': active_contractors,
+        'range_days': range_days,
+        'range_choices': ANALYTICS_RANGE_CHOICES,
+        'resolution_overall': stats['resolution_by_category'].get('__all__'),
+        'analytics_charts': charts,
+        'contractor_sla': contractor_sla,
+        'category_sla': category_sla,
         'assigned_resolved_tasks': assigned_resolved_tasks,
         'assigned_pending_tasks': assigned_pending_tasks,
         'assigned_labels': assigned_labels,
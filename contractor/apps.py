@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ContractorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'contractor'
+
+    def ready(self):
+        from . import principal  # noqa: F401  (connects the principal cache invalidation)
@@ -0,0 +1,63 @@
+# contractor/authentication.py
+"""
+JWT authentication for the contractor API.
+
+Contractors are not Django users, so their tokens carry a `contractor_id` claim
+instead of simplejwt's `user_id`. Citizen tokens are rejected here, and contractor
+tokens are rejected by simplejwt's own JWTAuthentication. The contractor is loaded
+through the cached principal, so an authenticated API request makes no query for the
+contractor, and a deactivation applies to tokens that are already out there.
+"""
+from rest_framework import exceptions, permissions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from user.models import Contractor
+
+from . import principal
+
+CONTRACTOR_CLAIM = 'contractor_id'
+
+
+def tokens_for_contractor(contractor):
+    refresh = RefreshToken()
+    refresh[CONTRACTOR_CLAIM] = contractor.pk
+    return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+
+def contractor_from_token(token):
+    contractor_id = token.get(CONTRACTOR_CLAIM)
+    if contractor_id is None:
+        raise exceptions.AuthenticationFailed("Not a contractor token.")
+    contractor = principal.get_principal(contractor_id)
+    if contractor is None:
+        raise exceptions.AuthenticationFailed("Contractor account is not active or does not exist.")
+    return contractor
+
+
+class ContractorJWTAuthentication(BaseAuthentication):
+    """
+    `Authorization: Bearer <access token>` from /contractor/api/token/.
+    """
+    keyword = b'bearer'
+
+    def authenticate(self, request):
+        header = get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword:
+            return None
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed("Invalid Authorization header.")
+        try:
+            token = AccessToken(header[1].decode())
+        except (TokenError, UnicodeError) as e:
+            raise exceptions.AuthenticationFailed(str(e))
+        return contractor_from_token(token), token
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="contractor"'
+
+
+class IsContractor(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return isinstance(request.user, Contractor)
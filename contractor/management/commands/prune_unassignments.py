@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from user.models import ComplaintUnassignment
+
+
+class Command(BaseCommand):
+    help = "Delete contractor-sync unassignment records older than the retention window (30 days)."
+
+    def handle(self, *args, **options):
+        deleted = ComplaintUnassignment.prune()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} unassignment records."))
@@ -0,0 +1,89 @@
+# contractor/principal.py
+"""
+Cached contractor principal for contractor_login_required.
+
+A logged-in contractor's identity and active flag are cached as a small snapshot,
+keyed by a per-contractor version stamp. Saving or deleting a Contractor, and
+queryset .update()s of anything but the workload counters (editing, deactivating,
+deleting), bump the stamp, and bump it again once the change commits. The next
+request then reads the row again, so a deactivation applies immediately, while
+ordinary requests never query the contractor table. The stamp must reach every
+worker process, so this relies on the shared cache configured in settings.CACHES.
+"""
+import time
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user.models import Contractor, contractors_updated
+
+SNAPSHOT_FIELDS = ('id', 'name', 'email', 'contact_number', 'specialization', 'area_assigned', 'is_active')
+SNAPSHOT_TIMEOUT = 15 * 60
+
+
+def _version_key(contractor_id):
+    return f"contractor-principal-version:{contractor_id}"
+
+
+def _snapshot_key(contractor_id, version):
+    return f"contractor-principal:{contractor_id}:{version}"
+
+
+def current_version(contractor_id):
+    key = _version_key(contractor_id)
+    version = cache.get(key)
+    if version is None:
+        # A fresh stamp, never an old one: an evicted version key can't revive a stale snapshot
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(contractor_id):
+    cache.set(_version_key(contractor_id), time.time_ns(), None)
+
+
+def get_principal(contractor_id):
+    """
+    The active Contractor with this id, built from the cached snapshot, or None.
+    Fields outside SNAPSHOT_FIELDS (the password hash) are deferred.
+    """
+    key = _snapshot_key(contractor_id, current_version(contractor_id))
+    snapshot = cache.get(key)
+    if snapshot is None:
+        # Unknown ids are cached too, as inactive
+        snapshot = Contractor.objects.filter(id=contractor_id).values(*SNAPSHOT_FIELDS).first() \
+            or {'id': contractor_id, 'is_active': False}
+        cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+    if not snapshot['is_active']:
+        return None
+    return Contractor.from_db('default', list(SNAPSHOT_FIELDS), [snapshot[field] for field in SNAPSHOT_FIELDS])
+
+
+async def aget_principal(contractor_id):
+    # One hop to the thread pool for the cache reads and, on a miss, the query
+    return await sync_to_async(get_principal)(contractor_id)
+
+
+def _invalidate(contractor_id):
+    # Now, for this process and the rest of the transaction, and after commit, so a
+    # concurrent request can't re-cache the old row in between
+    bump_version(contractor_id)
+    transaction.on_commit(partial(bump_version, contractor_id))
+
+
+@receiver(post_save, sender=Contractor)
+@receiver(post_delete, sender=Contractor)
+def invalidate_principal(sender, instance, **kwargs):
+    _invalidate(instance.pk)
+
+
+@receiver(contractors_updated, sender=Contractor)
+def invalidate_updated_principals(sender, pks, **kwargs):
+    for contractor_id in pks:
+        _invalidate(contractor_id)
@@ -0,0 +1,57 @@
+from rest_framework import serializers
+
+from user.models import Complaint
+
+
+# --- Complaint as seen by its assigned contractor ---
+class ContractorComplaintSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the contractor API; only `status` is writable.
+    """
+    category_display = serializers.CharField(source='get_category_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    reported_by = serializers.CharField(source='user.username', read_only=True)
+
+    # Contractors can only start work on a pending complaint (automatic assignment
+    # leaves it pending) or close one, as in the HTML views
+    ALLOWED_STATUSES = ('resolved', 'rejected')
+
+    @classmethod
+    def allowed_statuses(cls, current):
+        return ('in_progress', *cls.ALLOWED_STATUSES) if current == 'pending' else cls.ALLOWED_STATUSES
+
+    class Meta:
+        model = Complaint
+        fields = [
+            'id',
+            'report_id',
+            'reported_by',
+            'category',
+            'category_display',
+            'location',
+            'description',
+            'photo',
+            'photo_thumbnail',
+            'photo_medium',
+            'latitude',
+            'longitude',
+            'status',
+            'status_display',
+            'submitted_at',
+            'assigned_at',
+            'updated_at',
+        ]
+        read_only_fields = [field for field in fields if field != 'status']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # The original still carries its EXIF until the photo pipeline has cleaned it
+        if not instance.photo_processed_at:
+            data['photo'] = None
+        return data
+
+    def validate_status(self, value):
+        allowed = self.allowed_statuses(self.instance.status if self.instance else None)
+        if value not in allowed:
+            raise serializers.ValidationError(f"Contractors can only set: {', '.join(allowed)}.")
+        return value
@@ -1,3 +1,138 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from user.models import Complaint, ComplaintUnassignment, Contractor
+
+from . import principal, views
+from .authentication import tokens_for_contractor
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+# Never the on-disk cache of settings.CACHES: tests clear it
+@override_settings(CACHES=TEST_CACHES)
+class ContractorTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.contractor = Contractor.objects.create(
+            name='Roads Ltd', email='roads@example.com', password='pw', specialization='road', area_assigned='Main Street')
+        cls.other = Contractor.objects.create(
+            name='Paving Co', email='paving@example.com', password='pw', specialization='road', area_assigned='High Street')
+        cls.citizen = User.objects.create_user('citizen', 'citizen@example.com', 'pw')
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION='Bearer ' + tokens_for_contractor(self.contractor)['access'])
+
+    def create_complaint(self, **fields):
+        defaults = {'user': self.citizen, 'category': 'road', 'location': 'Main Street',
+                    'description': 'Pothole', 'latitude': 10, 'longitude': 70, 'assigned_to': self.contractor}
+        return Complaint.objects.create(**{**defaults, **fields})
+
+    def assign(self, complaint, contractor):
+        complaint.assigned_to = contractor
+        complaint.save()
+
+
+class PrincipalInvalidationTests(ContractorTestCase):
+    def login(self):
+        session = self.client.session
+        session['contractor_id'] = self.contractor.pk
+        session.save()
+
+    def test_principal_is_served_from_the_cache(self):
+        self.assertEqual(principal.get_principal(self.contractor.pk).name, 'Roads Ltd')
+        with self.assertNumQueries(0):
+            self.assertEqual(principal.get_principal(self.contractor.pk).name, 'Roads Ltd')
+
+    def test_deactivation_by_save_logs_the_contractor_out(self):
+        self.login()
+        self.assertEqual(self.client.get('/contractor/').status_code, 200)
+        self.contractor.is_active = False
+        self.contractor.save()
+        self.assertRedirects(self.client.get('/contractor/'), '/contractor/login/', fetch_redirect_response=False)
+
+    def test_deactivation_by_queryset_update_logs_the_contractor_out(self):
+        self.login()
+        self.assertEqual(self.client.get('/contractor/').status_code, 200)
+        Contractor.objects.filter(pk=self.contractor.pk).update(is_active=False)
+        self.assertRedirects(self.client.get('/contractor/'), '/contractor/login/', fetch_redirect_response=False)
+
+    def test_deactivation_rejects_issued_tokens(self):
+        self.assertEqual(self.api.get('/contractor/api/complaints/').status_code, 200)
+        Contractor.objects.filter(pk=self.contractor.pk).update(is_active=False)
+        self.assertEqual(self.api.get('/contractor/api/complaints/').status_code, 401)
+
+    def test_workload_counter_updates_keep_the_cached_principal(self):
+        principal.get_principal(self.contractor.pk)
+        Contractor.apply_workload_changes({(self.contractor.pk, 'open_complaints'): 1})
+        with self.assertNumQueries(0):
+            principal.get_principal(self.contractor.pk)
+
+
+class ChangesFeedTests(ContractorTestCase):
+    def sync(self, cursor=None):
+        response = self.api.get('/contractor/api/complaints/changes/', {'since': cursor} if cursor else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_full_sync_pages_through_every_assigned_complaint(self):
+        mine = {self.create_complaint().pk for _ in range(5)}
+        self.create_complaint(assigned_to=self.other)
+        seen, cursor, pages = set(), None, 0
+        with mock.patch.object(views, 'SYNC_PAGE_SIZE', 2):
+            while True:
+                page = self.sync(cursor)
+                seen |= {item['id'] for item in page['changed']}
+                cursor, pages = page['cursor'], pages + 1
+                if not page['has_more']:
+                    break
+        self.assertEqual(seen, mine)
+        self.assertEqual(pages, 3)
+
+    def test_cursor_returns_removals_since_the_last_sync(self):
+        kept, taken = self.create_complaint(), self.create_complaint()
+        cursor = self.sync()['cursor']
+        self.assign(taken, self.other)
+        page = self.sync(cursor)
+        self.assertEqual(page['removed'], [{'id': taken.pk, 'report_id': taken.report_id}])
+        self.assertNotIn(taken.pk, {item['id'] for item in page['changed']})
+        self.assertIn(kept.pk, {item['id'] for item in self.sync()['changed']})
+
+    def test_repeated_removals_send_one_tombstone(self):
+        complaint = self.create_complaint()
+        cursor = self.sync()['cursor']
+        self.assign(complaint, self.other)
+        self.assign(complaint, self.contractor)
+        self.assign(complaint, None)
+        self.assertEqual(ComplaintUnassignment.objects.filter(complaint_id=complaint.pk, contractor=self.contractor).count(), 2)
+        self.assertEqual(self.sync(cursor)['removed'], [{'id': complaint.pk, 'report_id': complaint.report_id}])
+
+    def test_complaint_given_back_is_not_removed(self):
+        complaint = self.create_complaint()
+        cursor = self.sync()['cursor']
+        self.assign(complaint, self.other)
+        self.assign(complaint, self.contractor)
+        page = self.sync(cursor)
+        self.assertEqual(page['removed'], [])
+        self.assertIn(complaint.pk, {item['id'] for item in page['changed']})
+
+    def test_expired_cursor_asks_for_a_full_sync(self):
+        old = timezone.now() - ComplaintUnassignment.TOMBSTONE_RETENTION - timedelta(days=1)
+        cursor = views._encode_sync_cursor({'changed': (old, 0), 'removed': (old, 0)})
+        response = self.api.get('/contractor/api/complaints/changes/', {'since': cursor})
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.json()['reset'])
+
+    def test_tombstones_are_deleted_with_their_contractor(self):
+        complaint = self.create_complaint(assigned_to=self.other)
+        self.assign(complaint, None)
+        self.other.delete()
+        self.assertFalse(ComplaintUnassignment.objects.filter(complaint_id=complaint.pk).exists())
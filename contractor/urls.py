@@ -1,14 +1,25 @@
 # contractor/urls.py
-from django.urls import path
+from django.conf import settings
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
 from . import views
 
 app_name = 'contractor'
 
+# --- Contractor API Router (JWT, see contractor/authentication.py) ---
+router = DefaultRouter()
+router.register(r'complaints', views.ContractorComplaintViewSet, basename='api-complaint')
+
 urlpatterns = [
     path('login/', views.contractor_login, name='login'),
     path('logout/', views.contractor_logout, name='logout'),
     path('home/', views.home, name='home'),
-    path('', views.dashboard, name='dashboard'),
-    path('complaints/', views.complaint_list, name='complaint_list'),
+    path('', views.adashboard if settings.ASYNC_VIEWS else views.dashboard, name='dashboard'),
+    path('complaints/', views.acomplaint_list if settings.ASYNC_VIEWS else views.complaint_list, name='complaint_list'),
     path('complaints/<str:report_id>/', views.complaint_detail, name='complaint_detail'),
+    path('live/', views.live_updates, name='live_updates'),
+    # API
+    path('api/token/', views.ContractorTokenView.as_view(), name='api-token'),
+    path('api/token/refresh/', views.ContractorTokenRefreshView.as_view(), name='api-token-refresh'),
+    path('api/', include(router.urls)),
 ]
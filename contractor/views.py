@@ -6,7 +6,26 @@ from django.db.models import Count
 from django.utils import timezone
 from datetime import timedelta
 from functools import wraps
+from asgiref.sync import iscoroutinefunction
+import asyncio
+from django.http import HttpResponseForbidden
 from django.db import models # <-- NEW: Added this import
+import base64
+import json
+from datetime import datetime
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+from user import live
+from user.models import ComplaintUnassignment
+from . import principal
+from .authentication import ContractorJWTAuthentication, IsContractor, contractor_from_token, tokens_for_contractor
+from .serializers import ContractorComplaintSerializer
 
 # --- Decorator for Contractor Login ---
 def contractor_login_required(view_func):
@@ -14,22 +33,39 @@ def contractor_login_required(view_func):
     """
     Decorator to ensure a contractor is logged in via session.
     """
-    @wraps(view_func)
-    def _wrapped_view(request, *args, **kwargs):
-        contractor_id = request.session.get('contractor_id')
+    def _login_redirect(request, contractor_id):
         if not contractor_id:
             messages.error(request, "Please log in to access this page.")
-            return redirect('contractor:login')
-        
-        try:
-            contractor = Contractor.objects.get(id=contractor_id, is_active=True)
-            request.contractor = contractor # Attach contractor to request
-        except Contractor.DoesNotExist:
+        else:
             messages.error(request, "Your account is not active or does not exist.")
             # Clear the bad session key
             if 'contractor_id' in request.session:
                 del request.session['contractor_id']
-            return redirect('contractor:login')
+        return redirect('contractor:login')
+
+    if iscoroutinefunction(view_func):
+        # Async views (ASGI): the same checks, without blocking the event loop
+        @wraps(view_func)
+        async def _wrapped_async_view(request, *args, **kwargs):
+            contractor_id = await request.session.aget('contractor_id')
+            contractor = await principal.aget_principal(contractor_id) if contractor_id else None
+            if contractor is None:
+                return _login_redirect(request, contractor_id)
+            request.contractor = contractor
+            return await view_func(request, *args, **kwargs)
+        return _wrapped_async_view
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        contractor_id = request.session.get('contractor_id')
+        if not contractor_id:
+            return _login_redirect(request, contractor_id)
+        
+        # Cached snapshot; re-read only after the contractor is edited, deactivated or deleted
+        contractor = principal.get_principal(contractor_id)
+        if contractor is None:
+            return _login_redirect(request, contractor_id)
+        request.contractor = contractor # Attach contractor to request
             
         return view_func(request, *args, **kwargs)
     return _wrapped_view
@@ -70,6 +106,15 @@ def contractor_logout(request):
     messages.success(request, "You have been logged out.")
     return redirect('contractor:login')
 
+# --- Live updates (Server-Sent Events, ASGI only) ---
+async def live_updates(request):
+    # Not contractor_login_required: that decorator is sync, and this response stays open
+    contractor_id = await request.session.aget('contractor_id')
+    contractor = await principal.aget_principal(contractor_id) if contractor_id else None
+    if contractor is None:
+        return HttpResponseForbidden()
+    return live.sse_response(request, [f"contractor:{contractor.id}"])
+
 # --- Contractor Dashboard (Analytics) ---
 @contractor_login_required
 def dashboard(request):
@@ -79,11 +124,10 @@ def dashboard(request):
     # Get all complaints assigned to this contractor
     complaints = Complaint.objects.filter(assigned_to=contractor)
 
-    # --- KPIs ---
-    total_assigned = complaints.count()
-    total_pending = complaints.filter(status__in=['pending', 'in_progress']).count()
-    total_resolved = complaints.filter(status='resolved').count()
-    total_rejected = complaints.filter(status='rejected').count()
+    # --- KPIs (the workload counters on the contractor row; the cached principal may be older) ---
+    total_pending, total_resolved, total_rejected = Contractor.objects.filter(pk=contractor.pk) \
+        .values_list(*Contractor.WORKLOAD_FIELDS).get()
+    total_assigned = total_pending + total_resolved + total_rejected
 
     # --- Pie Chart: Status Distribution ---
     status_distribution = complaints.values('status').annotate(total=Count('status')).order_by('status')
@@ -131,6 +175,51 @@ def complaint_list(request):
     }
     return render(request, "contractor/complaint_list.html", context)
 
+async def _alist(queryset):
+    return [row async for row in queryset]
+
+# --- Async Dashboard and Complaint List (ASGI, settings.ASYNC_VIEWS) ---
+@contractor_login_required
+async def adashboard(request):
+    contractor = request.contractor
+    complaints = Complaint.objects.filter(assigned_to=contractor)
+    six_months_ago = timezone.now() - timedelta(days=180)
+
+    # The three queries are independent, so they are issued together
+    (total_pending, total_resolved, total_rejected), status_distribution, monthly_data = await asyncio.gather(
+        Contractor.objects.filter(pk=contractor.pk).values_list(*Contractor.WORKLOAD_FIELDS).aget(),
+        _alist(complaints.values('status').annotate(total=Count('status')).order_by('status')),
+        _alist(complaints.filter(assigned_at__gte=six_months_ago)
+               .annotate(month=models.functions.TruncMonth('assigned_at'))
+               .values('month')
+               .annotate(count=Count('report_id'))
+               .order_by('month')),
+    )
+
+    context = {
+        'total_assigned': total_pending + total_resolved + total_rejected,
+        'total_pending': total_pending,
+        'total_resolved': total_resolved,
+        'total_rejected': total_rejected,
+        'pie_labels': [s['status'].replace('_', ' ').title() for s in status_distribution],
+        'pie_data': [s['total'] for s in status_distribution],
+        'bar_labels': [m['month'].strftime("%b %Y") for m in monthly_data],
+        'bar_data': [m['count'] for m in monthly_data],
+        'contractor': contractor,
+    }
+    return render(request, "contractor/dashboard.html", context)
+
+@contractor_login_required
+async def acomplaint_list(request):
+    contractor = request.contractor
+    complaints = await _alist(
+        Complaint.objects.filter(assigned_to=contractor).select_related('user').order_by('-assigned_at'))
+    context = {
+        'complaints': complaints,
+        'contractor': contractor,
+    }
+    return render(request, "contractor/complaint_list.html", context)
+
 # --- Contractor Complaint Detail (with Status Update) ---
 @contractor_login_required
 def complaint_detail(request, report_id):
@@ -139,10 +228,11 @@ def complaint_detail(request, report_id):
     
     # Get the complaint, ensuring it is assigned to this contractor
     complaint = get_object_or_404(Complaint, report_id=report_id, assigned_to=contractor)
+    # Contractors can start a pending complaint, or close one
+    allowed_statuses = ContractorComplaintSerializer.allowed_statuses(complaint.status)
 
     if request.method == 'POST':
         new_status = request.POST.get('status')
-        allowed_statuses = ['resolved', 'rejected'] # Contractors can only set these
         
         if new_status in allowed_statuses:
             complaint.status = new_status
@@ -155,10 +245,149 @@ def complaint_detail(request, report_id):
     context = {
         'complaint': complaint,
         'contractor': contractor,
-        # Only allow setting to resolved or rejected
-        'status_choices': [c for c in Complaint.STATUS_CHOICES if c[0] in ['resolved', 'rejected']],
+        'status_choices': [c for c in Complaint.STATUS_CHOICES if c[0] in allowed_statuses],
     }
     return render(request, "contractor/complaint_detail.html", context)
 
 def home(request):
     return render(request, "user/home.html")
+
+# --- Contractor API (JWT) ---
+SYNC_PAGE_SIZE = 500
+# Re-sent on every sync: rows written by transactions still open when we read
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def _encode_sync_cursor(positions):
+    data = {key: [ts.isoformat(), pk] for key, (ts, pk) in positions.items()}
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+def _decode_sync_cursor(cursor):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return {key: (datetime.fromisoformat(data[key][0]), int(data[key][1])) for key in ('changed', 'removed')}
+    except (ValueError, TypeError, KeyError, IndexError):
+        raise ValidationError({'since': "Invalid cursor."})
+
+
+def _after(queryset, field, position):
+    # (field, id) > position, written so the (..., field, id) index can seek to it
+    if position is None:
+        return queryset
+    ts, pk = position
+    return queryset.filter(**{f'{field}__gte': ts}).exclude(**{field: ts, 'id__lte': pk})
+
+
+class ContractorTokenViewBase(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get_authenticate_header(self, request):
+        # Bad credentials are a 401 (not 403), as with the citizen token views
+        return 'Bearer realm="contractor"'
+
+
+class ContractorTokenView(ContractorTokenViewBase):
+    """
+    POST email + password -> {"access": ..., "refresh": ...} for the contractor API.
+    """
+
+    def post(self, request):
+        email, password = request.data.get('email'), request.data.get('password')
+        contractor = Contractor.objects.filter(email=email).first() if email and password else None
+        if contractor is None or not contractor.is_active or not contractor.check_password(password):
+            raise AuthenticationFailed("Invalid credentials or account inactive.")
+        return Response(tokens_for_contractor(contractor))
+
+
+class ContractorTokenRefreshView(ContractorTokenViewBase):
+    """
+    POST refresh -> {"access": ...}, refused once the contractor is deactivated.
+    """
+
+    def post(self, request):
+        try:
+            refresh = RefreshToken(request.data.get('refresh', ''))
+        except TokenError as e:
+            raise AuthenticationFailed(str(e))
+        contractor_from_token(refresh)
+        return Response({'access': str(refresh.access_token)})
+
+
+class ContractorComplaintViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin,
+                                 mixins.UpdateModelMixin, viewsets.GenericViewSet):
+    """
+    The authenticated contractor's assigned complaints. PATCH {"status": ...} closes
+    one; GET changes/?since=<cursor> is the delta-sync feed.
+    """
+    serializer_class = ContractorComplaintSerializer
+    authentication_classes = [ContractorJWTAuthentication]
+    permission_classes = [IsContractor]
+    lookup_field = 'report_id'
+
+    def get_queryset(self):
+        return Complaint.objects.filter(assigned_to=self.request.user) \
+            .select_related('user').order_by('-assigned_at', '-id')
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Complaints assigned or updated, and complaints taken away, since `since`.
+
+        Without `since` this returns the whole current list (paged). Each response
+        has a `cursor` to send as `since` next time; keep going while `has_more` is
+        true. Items are upserts keyed by id, and a few may be sent twice.
+        """
+        contractor = request.user
+        now = timezone.now()
+        since = request.query_params.get('since')
+        if since:
+            positions = _decode_sync_cursor(since)
+            if positions['removed'][0] < now - ComplaintUnassignment.TOMBSTONE_RETENTION:
+                return Response({'detail': "Cursor expired; sync again without `since`.", 'reset': True},
+                                status=status.HTTP_410_GONE)
+        else:
+            # Full sync: every assigned complaint, and no older removals to replay
+            positions = {'changed': None, 'removed': (now, 0)}
+
+        changed = list(_after(Complaint.objects.filter(assigned_to=contractor), 'updated_at', positions['changed'])
+                       .select_related('user').order_by('updated_at', 'id')[:SYNC_PAGE_SIZE + 1])
+        removed = list(_after(ComplaintUnassignment.objects.filter(contractor=contractor), 'unassigned_at', positions['removed'])
+                       .order_by('unassigned_at', 'id')
+                       .values('id', 'complaint_id', 'report_id', 'unassigned_at')[:SYNC_PAGE_SIZE + 1])
+        has_more = len(changed) > SYNC_PAGE_SIZE or len(removed) > SYNC_PAGE_SIZE
+        changed, removed = changed[:SYNC_PAGE_SIZE], removed[:SYNC_PAGE_SIZE]
+
+        # One tombstone per complaint, the latest: a complaint can be taken away more
+        # than once, and the overlap window replays recent tombstones
+        latest = {}
+        for row in removed:
+            latest.pop(row['complaint_id'], None)
+            latest[row['complaint_id']] = row
+
+        # A complaint taken away and then given back is current again: drop its removal
+        if latest:
+            reassigned = set(Complaint.objects.filter(id__in=latest, assigned_to=contractor)
+                             .values_list('id', flat=True))
+            removed_rows = [row for complaint_id, row in latest.items() if complaint_id not in reassigned]
+        else:
+            removed_rows = []
+
+        settled = (now - SYNC_OVERLAP, 0)
+        next_positions = {}
+        for key, rows, last in (
+            ('changed', changed, changed and (changed[-1].updated_at, changed[-1].id)),
+            ('removed', removed, removed and (removed[-1]['unassigned_at'], removed[-1]['id'])),
+        ):
+            if len(rows) == SYNC_PAGE_SIZE:
+                next_positions[key] = last          # Page boundary; more may follow
+            else:
+                next_positions[key] = settled       # Caught up, minus the overlap window
+
+        return Response({
+            'changed': self.get_serializer(changed, many=True).data,
+            'removed': [{'id': row['complaint_id'], 'report_id': row['report_id']} for row in removed_rows],
+            'cursor': _encode_sync_cursor(next_positions),
+            'has_more': has_more,
+        })
@@ -10,21 +10,20 @@ class ComplaintAdmin(admin.ModelAdmin):
     def image_tag(self, obj):
         if not obj.photo:
             return "No Image"
-        
-        try:
-            # Check if file exists on disk
-            if obj.photo.name and obj.photo.storage.exists(obj.photo.name):
-                return format_html(
-                    '<img src="{}" width="100" height="auto" '
-                    'style="max-height: 100px; object-fit: cover; border-radius: 4px;" '
-                    'onerror="this.style.display=\'none\'; this.nextSibling.style.display=\'inline\';" />'
-                    '<span style="display:none; color: #999; font-size: 12px;">Image Error</span>',
-                    obj.photo.url
-                )
-            else:
-                return '<span style="color: #999;">File Missing</span>'
-        except (ValueError, IOError, OSError) as e:
-            return f'<span style="color: #red;">Error: {str(e)[:20]}...</span>'
+
+        # Cached metadata only - the changelist never stats the storage backend
+        if obj.photo_checked_at and not obj.photo_exists:
+            return format_html('<span style="color: #999;">File Missing</span>')
+        if not obj.photo_processed_at:
+            return "Processing"    # The original still carries its EXIF
+        return format_html(
+            '<img src="{}" width="100" height="auto" '
+            'style="max-height: 100px; object-fit: cover; border-radius: 4px;" '
+            'onerror="this.style.display=\'none\'; this.nextSibling.style.display=\'inline\';" />'
+            '<span style="display:none; color: #999; font-size: 12px;">Image Error</span>',
+            # The small rendition the photo pipeline made
+            obj.photo_thumbnail.url if obj.photo_thumbnail else obj.photo.url
+        )
     
     image_tag.short_description = 'Photo'
     image_tag.allow_tags = True
@@ -0,0 +1,141 @@
+# user/assignment.py
+"""
+Automatic contractor assignment.
+
+A complaint can go to any active contractor whose specialization matches its
+category. Among those, the one with the fewest open (pending / in-progress)
+complaints wins, where a contractor whose `area_assigned` names a place that
+appears in the complaint's location counts AREA_PREFERENCE complaints fewer. So a
+local contractor is preferred, but not once they are that much busier than
+everyone else. An automatic assignment leaves the complaint 'pending' until the
+contractor starts work on it.
+
+`choose()` is used at submission time. `plan()` and `apply()` back the
+`assign_backlog` command, which balances the whole unassigned backlog in memory
+and writes it with a few set-based UPDATEs.
+"""
+import re
+from collections import Counter, defaultdict
+
+APPLY_CHUNK_SIZE = 500
+# Open complaints a local contractor may have beyond an outside one and still win
+AREA_PREFERENCE = 5
+
+_non_word = re.compile(r'[^a-z0-9]+')
+
+
+def _normalize(text):
+    return f" {_non_word.sub(' ', (text or '').lower()).strip()} "
+
+
+def area_phrases(area_assigned):
+    """
+    The place names in an `area_assigned` value ("Koramangala, HSR Layout").
+    """
+    return tuple(
+        phrase for phrase in (_normalize(part) for part in re.split(r'[,;/\n]', area_assigned or ''))
+        if phrase.strip()
+    )
+
+
+class AssignmentEngine:
+    """
+    Active contractors grouped by specialization, with their current open workload.
+    Loads are kept up to date in memory as complaints are assigned, so a batch
+    spreads out instead of piling onto whoever was least busy at the start.
+    """
+
+    def __init__(self, contractors, loads, max_open=None):
+        self.max_open = max_open
+        self.loads = Counter(loads)
+        self.by_category = defaultdict(list)     # category -> [(contractor_id, area phrases)]
+        for contractor_id, specialization, area_assigned in contractors:
+            self.by_category[specialization].append((contractor_id, area_phrases(area_assigned)))
+
+    @classmethod
+    def load(cls, categories=None, max_open=None):
+        """
+        Engine over the active contractors (for `categories` only, if given); one query,
+        reading each contractor's open_complaints counter.
+        """
+        from .models import Contractor
+
+        contractors = Contractor.objects.filter(is_active=True)
+        if categories is not None:
+            contractors = contractors.filter(specialization__in=set(categories))
+        rows = list(contractors.values_list('id', 'specialization', 'area_assigned', 'open_complaints'))
+        loads = {contractor_id: open_complaints for contractor_id, _, _, open_complaints in rows}
+        return cls([row[:3] for row in rows], loads, max_open)
+
+    def choose(self, category, location):
+        """
+        Contractor id for a new complaint (counted towards their load), or None.
+        """
+        candidates = self.by_category.get(category)
+        if not candidates:
+            return None
+        location = _normalize(location)
+        best, best_key = None, None
+        for contractor_id, phrases in candidates:
+            load = self.loads[contractor_id]
+            if self.max_open is not None and load >= self.max_open:
+                continue
+            in_area = any(phrase in location for phrase in phrases)
+            key = (load - AREA_PREFERENCE * in_area, not in_area, contractor_id)
+            if best_key is None or key < best_key:
+                best, best_key = contractor_id, key
+        if best is not None:
+            self.loads[best] += 1
+        return best
+
+    def plan(self, complaints):
+        """
+        [(complaint row, contractor_id)] for complaint rows (dicts with id, category,
+        location), oldest first so the longest-waiting complaints are served first.
+        """
+        proposals = []
+        for row in complaints:
+            contractor_id = self.choose(row['category'], row['location'])
+            if contractor_id is not None:
+                proposals.append((row, contractor_id))
+        return proposals
+
+
+def choose_contractor(category, location):
+    """
+    Contractor id for one newly submitted complaint, or None if nobody matches.
+    """
+    return AssignmentEngine.load(categories=[category]).choose(category, location)
+
+
+def backlog_rows(limit=None):
+    """
+    Unassigned pending complaints, oldest first (duplicates follow their original).
+    """
+    from .models import Complaint
+
+    rows = Complaint.objects.filter(status='pending', assigned_to__isnull=True, duplicate_of__isnull=True) \
+        .order_by('submitted_at', 'id') \
+        .values('id', 'category', 'location')
+    return list(rows[:limit] if limit else rows)
+
+
+def apply(proposals):
+    """
+    Write planned assignments with one set-based UPDATE per contractor and chunk
+    (see Complaint.bulk_assign). Complaints assigned or changed since planning are
+    skipped. Returns the number of complaints assigned.
+    """
+    from .models import Complaint
+
+    assigned = 0
+    by_contractor = defaultdict(list)
+    for row, contractor_id in proposals:
+        by_contractor[contractor_id].append(row['id'])
+
+    for contractor_id, ids in by_contractor.items():
+        for start in range(0, len(ids), APPLY_CHUNK_SIZE):
+            still_open = Complaint.objects.filter(
+                id__in=ids[start:start + APPLY_CHUNK_SIZE], status='pending', assigned_to__isnull=True)
+            assigned += Complaint.bulk_assign(still_open, contractor_id, start=False)
+    return assigned
@@ -0,0 +1,127 @@
+# user/clusters.py
+"""
+Server-side marker clustering for map views.
+
+Complaints are aggregated per slippy-map tile (z/x/y) into a few clusters, one per
+geohash cell about a quarter of a tile wide, each with a count, centroid and status
+breakdown. Every tile is cached; Complaint.save() and its post_delete hook drop the
+tiles that contain a changed complaint, at every zoom level.
+"""
+import math
+
+from django.core.cache import cache
+from django.db.models import Avg, Case, Count, IntegerField, Sum, When
+from django.db.models.functions import Substr
+
+from . import geo
+
+MIN_ZOOM = 0
+MAX_ZOOM = 18
+MAX_TILES_PER_REQUEST = 64
+TILE_CACHE_TIMEOUT = 60 * 60
+CELLS_PER_TILE_SIDE = 4
+
+
+def tile_for(latitude, longitude, zoom):
+    """
+    (x, y) of the Web Mercator tile containing the point.
+    """
+    n = 1 << zoom
+    lat = max(min(float(latitude), 85.0511), -85.0511)
+    x = int((float(longitude) + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(zoom, x, y):
+    """
+    (south, west, north, east) of a tile.
+    """
+    n = 1 << zoom
+
+    def lat_of(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return lat_of(y + 1), x / n * 360.0 - 180.0, lat_of(y), (x + 1) / n * 360.0 - 180.0
+
+
+def tiles_in_bbox(zoom, south, west, north, east):
+    """
+    Every tile at `zoom` overlapping the box, or None if there are too many.
+    """
+    min_x, min_y = tile_for(north, west, zoom)
+    max_x, max_y = tile_for(south, east, zoom)
+    if (max_x - min_x + 1) * (max_y - min_y + 1) > MAX_TILES_PER_REQUEST:
+        return None
+    return [(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)]
+
+
+def _cache_key(zoom, x, y):
+    return f"complaint-clusters:{zoom}:{x}:{y}"
+
+
+def _cell_precision(zoom):
+    # Longest geohash whose cells are still at least 1/CELLS_PER_TILE_SIDE of a tile wide
+    tile_width = 360.0 / (1 << zoom) / CELLS_PER_TILE_SIDE
+    for precision in range(geo.GEOHASH_PRECISION, 0, -1):
+        if geo.cell_size(precision)[1] >= tile_width:
+            return precision
+    return 1
+
+
+def _compute_tile(queryset, zoom, x, y):
+    from .models import Complaint
+
+    south, west, north, east = tile_bounds(zoom, x, y)
+    points = geo.in_bbox(queryset, south, west, north, east)
+    # Half-open like tile_for(): west <= lng < east and south < lat <= north, so a point
+    # on an edge shared by two tiles is counted once (the last column and row keep the
+    # world's east and south edges)
+    last = (1 << zoom) - 1
+    if x < last:
+        points = points.filter(longitude__lt=east)
+    if y < last:
+        points = points.filter(latitude__gt=south)
+    status_counts = {
+        status: Sum(Case(When(status=status, then=1), default=0, output_field=IntegerField()))
+        for status, _ in Complaint.STATUS_CHOICES
+    }
+    rows = points.annotate(cell=Substr('geohash', 1, _cell_precision(zoom))) \
+        .values('cell') \
+        .annotate(count=Count('id'), lat=Avg('latitude'), lng=Avg('longitude'), **status_counts) \
+        .order_by()
+    return [{
+        'tile': [zoom, x, y],
+        'count': row['count'],
+        'lat': round(float(row['lat']), 6),
+        'lng': round(float(row['lng']), 6),
+        'statuses': {status: row[status] for status, _ in Complaint.STATUS_CHOICES if row[status]},
+    } for row in rows]
+
+
+def clusters_for_tile(zoom, x, y):
+    """
+    Cached clusters for one tile.
+    """
+    from .models import Complaint
+
+    key = _cache_key(zoom, x, y)
+    clusters = cache.get(key)
+    if clusters is None:
+        clusters = _compute_tile(Complaint.objects.all(), zoom, x, y)
+        cache.set(key, clusters, TILE_CACHE_TIMEOUT)
+    return clusters
+
+
+def invalidate_points(points):
+    """
+    Drop the cached tiles containing any of the (latitude, longitude) points, at every zoom.
+    """
+    keys = {
+        _cache_key(zoom, *tile_for(latitude, longitude, zoom))
+        for latitude, longitude in points
+        if latitude is not None and longitude is not None
+        for zoom in range(MIN_ZOOM, MAX_ZOOM + 1)
+    }
+    if keys:
+        cache.delete_many(list(keys))
@@ -0,0 +1,219 @@
+# user/duplicates.py
+"""
+Duplicate-complaint detection at submission time.
+
+Each process keeps an in-memory spatial grid of open complaints: geohash cells of
+~150m, each holding (category, coordinates, description token set) per complaint.
+A new report only looks at its own cell and the 8 around it, so the cost per
+submission depends on local density, not on how many complaints are open.
+
+The grid is loaded once per process at startup (wsgi.py / asgi.py call warm()), and
+every lookup then applies only the complaints changed since the last one, by
+updated_at: new open complaints are added, resolved, rejected and linked ones are
+dropped. Changes made in this process are also dropped right away (evict(), from
+Complaint's derived-data hooks), so the grid only ever holds open complaints.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.db import DatabaseError
+from django.utils import timezone
+from nltk.stem import PorterStemmer
+from nltk.tokenize import RegexpTokenizer
+
+from . import geo
+
+CELL_PRECISION = 7              # ~153m x 153m grid cells
+DUPLICATE_RADIUS_M = 75         # Max distance between duplicate reports
+SIMILARITY_THRESHOLD = 0.4      # Min Jaccard similarity of description token sets
+MAX_CANDIDATES = 500            # Upper bound on complaints compared per lookup
+MAX_TOKENS = 32
+OPEN_STATUSES = ('pending', 'in_progress')
+REFRESH_OVERLAP = timedelta(seconds=30)     # Re-read window for rows whose transaction committed late
+
+logger = logging.getLogger(__name__)
+
+STOP_WORDS = frozenset("""
+    a an and are as at be been but by for from has have in is it its near of on or
+    our please since so that the there this to very was were with
+""".split())
+
+_tokenizer = RegexpTokenizer(r'[a-z0-9]+')
+_stemmer = PorterStemmer()
+
+
+def description_tokens(text):
+    """
+    Stemmed, stop-word-free token set of a description.
+    """
+    tokens = set()
+    for word in _tokenizer.tokenize((text or '').lower()):
+        if word not in STOP_WORDS:
+            tokens.add(_stemmer.stem(word))
+            if len(tokens) >= MAX_TOKENS:
+                break
+    return frozenset(tokens)
+
+
+def similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def neighbour_cells(latitude, longitude):
+    """
+    The grid cell containing the point and the 8 cells around it.
+    """
+    lat_step, lng_step = geo.cell_size(CELL_PRECISION)
+    return {
+        geo.encode(latitude + d_lat * lat_step, longitude + d_lng * lng_step, CELL_PRECISION)
+        for d_lat in (-1, 0, 1) for d_lng in (-1, 0, 1)
+    }
+
+
+class DuplicateIndex:
+    """
+    In-memory grid of open complaints for one process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cells = {}      # cell -> {complaint_id: (category, lat, lng, tokens)}
+        self._cell_of = {}    # complaint_id -> cell
+        self._synced_at = None    # updated_at high-water mark; None until loaded
+
+    def _add(self, pk, category, latitude, longitude, description):
+        self._discard(pk)
+        if latitude is None or longitude is None:
+            return
+        lat, lng = float(latitude), float(longitude)
+        cell = geo.encode(lat, lng, CELL_PRECISION)
+        self._cells.setdefault(cell, {})[pk] = (category, lat, lng, description_tokens(description))
+        self._cell_of[pk] = cell
+
+    def _discard(self, pk):
+        cell = self._cell_of.pop(pk, None)
+        if cell is not None:
+            entries = self._cells[cell]
+            entries.pop(pk, None)
+            if not entries:
+                del self._cells[cell]
+
+    def _load(self):
+        from .models import Complaint
+
+        started = timezone.now()
+        self._cells, self._cell_of = {}, {}
+        # Reports already linked as duplicates are not candidates themselves
+        rows = Complaint.objects.filter(status__in=OPEN_STATUSES, duplicate_of__isnull=True) \
+            .values_list('id', 'category', 'latitude', 'longitude', 'description') \
+            .iterator(chunk_size=5000)
+        for row in rows:
+            self._add(*row)
+        self._synced_at = started
+
+    def _refresh(self):
+        # Apply the complaints created or changed since the last lookup (by any process)
+        from .models import Complaint
+
+        if self._synced_at is None:
+            self._load()    # Not warmed at startup
+            return
+        rows = Complaint.objects.filter(updated_at__gte=self._synced_at - REFRESH_OVERLAP) \
+            .values_list('id', 'category', 'latitude', 'longitude', 'description',
+                         'status', 'duplicate_of_id', 'updated_at') \
+            .iterator(chunk_size=5000)
+        for pk, category, latitude, longitude, description, status, duplicate_of_id, updated_at in rows:
+            if status in OPEN_STATUSES and duplicate_of_id is None:
+                self._add(pk, category, latitude, longitude, description)
+            else:
+                self._discard(pk)
+            self._synced_at = max(self._synced_at, updated_at)
+
+    def warm(self):
+        """
+        Load the grid, so that no submission pays for it. A database that is not
+        ready yet (e.g. before migrate) leaves it to the first lookup.
+        """
+        with self._lock:
+            try:
+                self._load()
+            except DatabaseError:
+                logger.warning("Duplicate index not warmed; it will load on the first lookup.", exc_info=True)
+
+    def register(self, complaint):
+        with self._lock:
+            self._add(complaint.pk, complaint.category, complaint.latitude,
+                      complaint.longitude, complaint.description)
+
+    def evict(self, complaint_ids):
+        """
+        Drop complaints that are no longer open (or were deleted).
+        """
+        with self._lock:
+            for pk in complaint_ids:
+                self._discard(pk)
+
+    def _scored(self, category, latitude, longitude, description):
+        # Nearby same-category candidates above the threshold, most similar first
+        lat, lng = float(latitude), float(longitude)
+        tokens = description_tokens(description)
+        scored = []
+        checked = 0
+        for cell in neighbour_cells(lat, lng):
+            for pk, (other_category, other_lat, other_lng, other_tokens) in self._cells.get(cell, {}).items():
+                if checked >= MAX_CANDIDATES:
+                    break
+                checked += 1
+                if other_category != category:
+                    continue
+                if geo.distance_m(lat, lng, other_lat, other_lng) > DUPLICATE_RADIUS_M:
+                    continue
+                score = similarity(tokens, other_tokens)
+                if score >= SIMILARITY_THRESHOLD:
+                    scored.append((score, pk))
+        scored.sort(reverse=True)
+        return scored
+
+    def find_duplicates(self, reports):
+        """
+        find_duplicate() for each (category, latitude, longitude, description) in
+        `reports`, with one refresh and one confirming query for the whole batch.
+        """
+        from .models import Complaint
+
+        with self._lock:
+            self._refresh()
+            all_scored = [
+                self._scored(*report) if report[1] not in (None, '') and report[2] not in (None, '') else []
+                for report in reports
+            ]
+            candidate_ids = {pk for scored in all_scored for _, pk in scored}
+            if not candidate_ids:
+                return [None] * len(all_scored)
+            # Status changes made elsewhere are not pushed into the grid: confirm with one query
+            still_open = set(Complaint.objects.filter(
+                id__in=candidate_ids, status__in=OPEN_STATUSES,
+            ).values_list('id', flat=True))
+
+            matches = []
+            for scored in all_scored:
+                match = None
+                for _, pk in scored:
+                    if pk in still_open:
+                        match = pk
+                        break
+                    self._discard(pk)    # Deleted, or closed within the overlap window
+                matches.append(match)
+            return matches
+
+    def find_duplicate(self, category, latitude, longitude, description):
+        """
+        Id of the most similar open complaint nearby in the same category, or None.
+        """
+        return self.find_duplicates([(category, latitude, longitude, description)])[0]
+
+
+duplicate_index = DuplicateIndex()
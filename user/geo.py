@@ -0,0 +1,137 @@
+# user/geo.py
+"""
+Geohash helpers for spatial complaint queries on a plain database (no PostGIS).
+
+Every complaint stores the geohash of its coordinates in an indexed column. A
+bounding box is covered by a handful of geohash prefixes, each of which is one
+index range scan; only the rows inside those cells are then checked exactly.
+"""
+import math
+
+from django.db.models import Q
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9          # ~4.8m x 4.8m cells
+MAX_COVER_CELLS = 32           # Index ranges used to cover one query box
+EARTH_RADIUS_M = 6371008.8
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """
+    Geohash of a point, or '' when either coordinate is missing.
+    """
+    if latitude is None or longitude is None or latitude == '' or longitude == '':
+        return ''
+    lat, lng = float(latitude), float(longitude)
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if coord >= mid:
+            value = (value << 1) | 1
+            rng[0] = mid
+        else:
+            value <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """
+    (lat_degrees, lng_degrees) spanned by a geohash cell of the given length.
+    """
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 - lng_bits
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def covering_prefixes(south, west, north, east, max_cells=MAX_COVER_CELLS):
+    """
+    The longest geohash prefixes (at most `max_cells` of them) that cover the box.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lng_step = cell_size(precision)
+        rows = math.floor(north / lat_step) - math.floor(south / lat_step) + 1
+        cols = math.floor(east / lng_step) - math.floor(west / lng_step) + 1
+        if rows * cols <= max_cells:
+            break
+    prefixes = set()
+    lat = south
+    while True:
+        lng = west
+        while True:
+            prefixes.add(encode(lat, lng, precision))
+            if lng >= east:
+                break
+            lng = min(lng + lng_step, east)
+        if lat >= north:
+            break
+        lat = min(lat + lat_step, north)
+    return prefixes
+
+
+def prefix_q(prefixes, field='geohash'):
+    """
+    OR of index range conditions matching every value that starts with a prefix.
+    """
+    condition = Q(pk__in=[])
+    for prefix in prefixes:
+        # '{' sorts right after 'z', the last geohash character
+        condition |= Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + '{'})
+    return condition
+
+
+def bbox_around(latitude, longitude, radius_m):
+    """
+    (south, west, north, east) box that contains a circle of `radius_m` metres.
+    """
+    lat_delta = math.degrees(radius_m / EARTH_RADIUS_M)
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    lng_delta = math.degrees(radius_m / (EARTH_RADIUS_M * cos_lat))
+    return (
+        max(latitude - lat_delta, -90.0), max(longitude - lng_delta, -180.0),
+        min(latitude + lat_delta, 90.0), min(longitude + lng_delta, 180.0),
+    )
+
+
+def distance_m(lat1, lng1, lat2, lng2):
+    """
+    Great-circle (haversine) distance in metres.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def in_bbox(queryset, south, west, north, east):
+    """
+    Complaints inside the box: geohash index ranges first, exact coordinates second.
+    """
+    return queryset.filter(prefix_q(covering_prefixes(south, west, north, east))).filter(
+        latitude__gte=south, latitude__lte=north, longitude__gte=west, longitude__lte=east,
+    )
+
+
+def within_radius(queryset, latitude, longitude, radius_m, fields, limit):
+    """
+    Rows (dicts of `fields` plus 'distance_m') within `radius_m` metres, nearest first.
+    """
+    candidates = in_bbox(queryset, *bbox_around(latitude, longitude, radius_m)).values(
+        *fields, 'latitude', 'longitude'
+    )
+    results = []
+    for row in candidates.iterator(chunk_size=2000):
+        distance = distance_m(latitude, longitude, float(row['latitude']), float(row['longitude']))
+        if distance <= radius_m:
+            row['distance_m'] = round(distance, 1)
+            results.append(row)
+    results.sort(key=lambda row: row['distance_m'])
+    return results[:limit]
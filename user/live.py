@@ -0,0 +1,179 @@
+# user/live.py
+"""
+Live complaint updates over Server-Sent Events.
+
+Complaint status and assignment changes are published once their transaction
+commits (Complaint.save() and the bulk paths call publish_changes()), on these
+channels:
+
+- "complaint:<report_id>": a citizen tracking that complaint;
+- "contractor:<id>": the contractor it was assigned to or taken from;
+- "admin": the admin dashboards.
+
+The stream views hold one long-lived response per client, so they need an async
+server (ASGI, e.g. `uvicorn Urbanfix.asgi:application`). Under WSGI they answer
+204, which tells EventSource to stop, and the pages keep working as before.
+
+The default broker lives in this process. With several worker processes, set
+LIVE_UPDATES['BROKER'] to 'user.live.RedisBroker' (needs the `redis` package and
+LIVE_UPDATES['OPTIONS'] = {'url': ...}) so every worker sees every change.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+
+HEARTBEAT_SECONDS = 20
+RETRY_MILLISECONDS = 5000
+QUEUE_SIZE = 100
+
+
+def _offer(queue, message):
+    if queue.full():
+        queue.get_nowait()    # A slow client loses its oldest update rather than blocking publishers
+    queue.put_nowait(message)
+
+
+class InProcessBroker:
+    """
+    Fan-out to the subscribers in this process. publish() may be called from any
+    thread (sync views run in a thread pool under ASGI).
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)    # channel -> {(event loop, queue)}
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, message)
+            except RuntimeError:
+                pass    # Loop already closed; the subscriber is going away
+
+    @asynccontextmanager
+    async def subscribe(self, channels):
+        """
+        A queue receiving the messages published on `channels` while the block runs.
+        """
+        entry = (asyncio.get_running_loop(), asyncio.Queue(self.queue_size))
+        with self._lock:
+            for channel in channels:
+                self._subscribers[channel].add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                for channel in channels:
+                    self._subscribers[channel].discard(entry)
+                    if not self._subscribers[channel]:
+                        del self._subscribers[channel]
+
+
+class RedisBroker:
+    """
+    Redis pub/sub, for deployments with more than one worker process.
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='urbanfix-live:'):
+        import redis   # Optional dependency, only needed when this broker is configured
+
+        self.url = url
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def publish(self, channel, message):
+        self._client.publish(self.prefix + channel, json.dumps(message))
+
+    @asynccontextmanager
+    async def subscribe(self, channels):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(*(self.prefix + channel for channel in channels))
+        try:
+            yield _RedisSubscription(pubsub)
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+class _RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def get(self):
+        while True:
+            item = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+            if item is not None:
+                return json.loads(item['data'])
+
+
+@lru_cache(maxsize=None)
+def broker():
+    config = getattr(settings, 'LIVE_UPDATES', {})
+    return import_string(config.get('BROKER', 'user.live.InProcessBroker'))(**config.get('OPTIONS', {}))
+
+
+# --- Publishing ---
+def publish_changes(changes):
+    """
+    Publish the status / assignment changes among `changes` ([(old values, new
+    values)], old None for a new complaint). Call it from transaction.on_commit().
+    """
+    from .models import Complaint
+
+    status_names = dict(Complaint.STATUS_CHOICES)
+    target = broker()
+    for old, new in changes:
+        if old and old['status'] == new['status'] and old['assigned_to_id'] == new['assigned_to_id']:
+            continue
+        message = {
+            'report_id': new['report_id'],
+            'status': new['status'],
+            'status_display': status_names.get(new['status'], new['status']),
+            'assigned_to_id': new['assigned_to_id'],
+            'created': old is None,
+        }
+        channels = {f"complaint:{new['report_id']}", 'admin'}
+        for contractor_id in (new['assigned_to_id'], old['assigned_to_id'] if old else None):
+            if contractor_id is not None:
+                channels.add(f"contractor:{contractor_id}")
+        for channel in channels:
+            target.publish(channel, message)
+
+
+# --- Streaming ---
+async def event_stream(channels):
+    async with broker().subscribe(channels) as subscription:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"    # Keeps proxies from closing an idle connection
+                continue
+            yield f"event: complaint\ndata: {json.dumps(message)}\n\n"
+
+
+def sse_response(request, channels):
+    """
+    A text/event-stream response for `channels`, or 204 when not served over ASGI.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(event_stream(channels), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'    # nginx: pass events through unbuffered
+    return response
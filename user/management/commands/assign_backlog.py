@@ -0,0 +1,43 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from user import assignment
+from user.models import Contractor
+
+
+class Command(BaseCommand):
+    help = "Assign the unassigned pending complaint backlog to contractors by specialization, area and workload."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Show the proposed assignments without saving them.")
+        parser.add_argument('--max-open', type=int, default=None,
+                            help="Do not give a contractor more than this many open complaints.")
+        parser.add_argument('--limit', type=int, default=None, help="Only consider the oldest N complaints.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = assignment.backlog_rows(options['limit'])
+        engine = assignment.AssignmentEngine.load(
+            categories={row['category'] for row in rows}, max_open=options['max_open'],
+        )
+        proposals = engine.plan(rows)
+        planned = time.perf_counter() - started
+
+        per_contractor = Counter(contractor_id for _, contractor_id in proposals)
+        names = dict(Contractor.objects.filter(id__in=per_contractor).values_list('id', 'name'))
+        for contractor_id, count in per_contractor.most_common():
+            self.stdout.write(f"{names.get(contractor_id, contractor_id)}: +{count} (now {engine.loads[contractor_id]} open)")
+        self.stdout.write(
+            f"{len(proposals)} of {len(rows)} backlog complaints matched a contractor (planned in {planned:.2f}s)."
+        )
+
+        if options['dry_run']:
+            self.stdout.write("Dry run - nothing saved.")
+            return
+        assigned = assignment.apply(proposals)
+        self.stdout.write(self.style.SUCCESS(
+            f"Assigned {assigned} complaints in {time.perf_counter() - started:.2f}s "
+            f"({len(proposals) - assigned} changed since planning and were skipped)."
+        ))
@@ -0,0 +1,198 @@
+import asyncio
+import importlib
+import statistics
+import time
+from collections import Counter
+from functools import partial
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import clear_url_caches
+from django.utils.crypto import get_random_string
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user.models import Complaint, Contractor
+
+# URLconfs that pick their views from settings.ASYNC_VIEWS, children before the root
+URLCONFS = ('user.urls', 'contractor.urls', settings.ROOT_URLCONF)
+
+
+def _reload_urlconfs():
+    clear_url_caches()
+    for name in URLCONFS:
+        importlib.reload(importlib.import_module(name))
+
+
+async def _call(application, method, path, headers, body=b''):
+    """
+    One request through the ASGI application: (status, response headers).
+    """
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'scheme': 'http',
+        'method': method, 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        'client': ('127.0.0.1', 50000), 'server': ('localhost', 8000),
+    }
+    pending = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    disconnected = asyncio.get_running_loop().create_future()    # Never resolves: the client stays connected
+    start = {}
+
+    async def receive():
+        return pending.pop() if pending else await disconnected
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            start.update(message)
+
+    await application(scope, receive, send)
+    disconnected.cancel()
+    return start['status'], {name.decode().lower(): value.decode() for name, value in start['headers']}
+
+
+async def _http_call(address, method, path, headers, body=b''):
+    """
+    One request to a running server over a new HTTP/1.1 connection: (status, response headers).
+    """
+    reader, writer = await asyncio.open_connection(*address)
+    lines = [f"{method} {path} HTTP/1.1",
+             *(f"{name}: {value}" for name, value in headers.items()),
+             f"content-length: {len(body)}", "connection: close"]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+    response = await reader.read()    # Until the server closes the connection
+    writer.close()
+    await writer.wait_closed()
+    status_line, *header_lines = response.split(b"\r\n\r\n", 1)[0].decode('latin-1').split("\r\n")
+    response_headers = dict(line.split(':', 1) for line in header_lines)
+    return int(status_line.split()[1]), {name.lower(): value.strip() for name, value in response_headers.items()}
+
+
+async def _load(call, request, total, concurrency):
+    """
+    `total` requests from `concurrency` concurrent clients: (requests/s, p50, p99 in ms, statuses).
+    """
+    latencies, statuses = [], Counter()
+    remaining = iter(range(total))
+
+    async def client():
+        for _ in remaining:
+            started = time.perf_counter()
+            status, _ = await call(*request)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return total / elapsed, quantiles[49] * 1000, quantiles[98] * 1000, statuses
+
+
+class Command(BaseCommand):
+    help = ("Compare requests/s and p99 latency of the sync and async variants of the hot read views "
+            "(settings.ASYNC_VIEWS), driving the ASGI application in-process with concurrent clients. "
+            "With --url, load a running ASGI server instead (its own ASYNC_VIEWS decides the variant: "
+            "run once per setting). Uses the configured database; log in as an existing user and contractor.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Requests per view and mode.")
+        parser.add_argument('--concurrency', type=int, default=50, help="Concurrent clients.")
+        parser.add_argument('--user', help="Citizen username (default: whoever filed the latest complaint).")
+        parser.add_argument('--contractor', type=int, help="Contractor id (default: the busiest active one).")
+        parser.add_argument('--url', help="Base URL of a running ASGI server on the same database, "
+                                          "e.g. http://127.0.0.1:8000 (uvicorn Urbanfix.asgi:application).")
+
+    def _session(self, **data):
+        store = importlib.import_module(settings.SESSION_ENGINE).SessionStore()
+        store.update(data)
+        store.save()
+        return store
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2 or options['concurrency'] < 1:
+            raise CommandError("Need at least 2 requests and 1 client.")
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            latest = Complaint.objects.order_by('-submitted_at').select_related('user').first()
+            user = latest.user if latest else None
+        if user is None:
+            raise CommandError("No citizen with complaints to log in as (see --user).")
+        contractors = Contractor.objects.filter(is_active=True)
+        if options['contractor']:
+            contractors = contractors.filter(pk=options['contractor'])
+        contractor = contractors.order_by('-open_complaints', 'id').first()
+        if contractor is None:
+            raise CommandError("No active contractor to log in as (see --contractor).")
+        complaint = Complaint.objects.filter(user=user).order_by('-submitted_at').first()
+
+        user_session = self._session(**{
+            SESSION_KEY: str(user.pk), BACKEND_SESSION_KEY: settings.AUTHENTICATION_BACKENDS[0],
+            HASH_SESSION_KEY: user.get_session_auth_hash(),
+        })
+        contractor_session = self._session(contractor_id=contractor.pk)
+        csrf_token = get_random_string(32)
+        citizen = {'host': 'localhost', 'cookie': f"{settings.SESSION_COOKIE_NAME}={user_session.session_key}; "
+                                                   f"{settings.CSRF_COOKIE_NAME}={csrf_token}"}
+        worker = {'host': 'localhost', 'cookie': f"{settings.SESSION_COOKIE_NAME}={contractor_session.session_key}"}
+        token = {'host': 'localhost', 'authorization': f"Bearer {RefreshToken.for_user(user).access_token}"}
+        views = {
+            'home': ('GET', '/', citizen),
+            'track_complaint': ('POST', '/track/', {**citizen, 'x-csrftoken': csrf_token,
+                                                    'content-type': 'application/x-www-form-urlencoded'},
+                                f"report_id={complaint.report_id}".encode()),
+            'contractor dashboard': ('GET', '/contractor/', worker),
+            'contractor complaint_list': ('GET', '/contractor/complaints/', worker),
+            'api list': ('GET', '/api/complaints/', citizen),
+            'api retrieve': ('GET', f'/api/complaints/{complaint.pk}/', citizen),
+            'api list (token)': ('GET', '/api/complaints/', token),
+        }
+
+        self.stdout.write(f"{options['requests']} requests per view from {options['concurrency']} clients, "
+                          f"as {user.username} and contractor #{contractor.pk}")
+        results = {}
+        try:
+            if options['url']:
+                url = urlsplit(options['url'])
+                if url.scheme != 'http' or not url.hostname:
+                    raise CommandError("--url must be an http:// URL.")
+                call = partial(_http_call, (url.hostname, url.port or 80))
+                results['server'] = asyncio.run(self._run(call, views, options['requests'], options['concurrency']))
+            else:
+                for mode, label in ((False, 'sync'), (True, 'async')):
+                    with override_settings(ASYNC_VIEWS=mode):
+                        _reload_urlconfs()
+                        call = partial(_call, ASGIHandler())
+                        results[label] = asyncio.run(self._run(call, views, options['requests'], options['concurrency']))
+        finally:
+            _reload_urlconfs()
+            user_session.delete()
+            contractor_session.delete()
+
+        labels = list(results)
+        self.stdout.write(f"{'view':<34}" + ''.join(f"{label + ' req/s':>13}{'p50 ms':>9}{'p99 ms':>9}"
+                                                   for label in labels))
+        for name in results[labels[0]]:
+            self.stdout.write(f"{name:<34}" + ''.join(f"{rps:>13,.0f}{p50:>9.1f}{p99:>9.1f}"
+                                                      for rps, p50, p99, _ in (results[label][name] for label in labels)))
+        for label in labels:
+            for name, (*_, statuses) in results[label].items():
+                unexpected = {status: count for status, count in statuses.items() if status >= 400}
+                if unexpected:
+                    self.stderr.write(f"{label} {name}: error responses {unexpected}")
+
+    async def _run(self, call, views, total, concurrency):
+        results = {}
+        for name, request in views.items():
+            status, headers = await call(*request)    # Warm-up, and the ETag for the poll
+            results[name] = await _load(call, request, total, concurrency)
+            if 'etag' in headers:
+                method, path, request_headers = request[:3]
+                poll = (method, path, {**request_headers, 'if-none-match': headers['etag']})
+                results[f"{name} (304 poll)"] = await _load(call, poll, total, concurrency)
+        return results
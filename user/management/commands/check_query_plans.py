@@ -0,0 +1,93 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, F
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from user import geo
+from user.models import Complaint, ComplaintRollup, ComplaintUnassignment, Contractor
+
+# A plan line that reads the whole complaint table instead of an index
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (user_complaint|user_complaintrollup)\b(?! USING)'),
+    'postgresql': re.compile(r'Seq Scan on (user_complaint|user_complaintrollup)\b'),
+}
+
+
+def hot_queries():
+    """
+    The query shapes behind the high-traffic views, with representative parameters.
+    """
+    now = timezone.now()
+    six_months_ago = now - timedelta(days=180)
+    user_id = 1
+    contractor_id = 1
+    by_user = Complaint.objects.filter(user_id=user_id)
+    by_contractor = Complaint.objects.filter(assigned_to_id=contractor_id)
+    newest_first = Complaint.objects.order_by('-submitted_at', '-id')
+
+    return [
+        ("user.home: status counts", by_user.values('status').annotate(total=Count('status'))),
+        ("user.home: own complaints", by_user),
+        ("api complaints: cursor page", by_user.filter(submitted_at__lt=now).order_by('-submitted_at', '-id')[:51]),
+        ("user.track_complaint", Complaint.objects.filter(report_id='URB000000')),
+        ("admin complaint_list: first page", newest_first[:51]),
+        ("admin complaint_list: keyset page", newest_first.filter(submitted_at__lte=now).exclude(
+            submitted_at=now, id__gte=1000)[:51]),
+        ("admin complaint_list: by status", newest_first.filter(status='pending')[:51]),
+        ("admin complaint_list: by category", newest_first.filter(category='road')[:51]),
+        ("admin complaint_list: unassigned", newest_first.filter(assigned_to__isnull=True)[:51]),
+        ("admin complaint_list: by contractor", newest_first.filter(assigned_to_id=contractor_id)[:51]),
+        ("admin dashboard_home: monthly trend", ComplaintRollup.objects.filter(day__gte=six_months_ago.date())
+            .annotate(month=TruncMonth('day')).values('month').annotate(count=Count('id'))),
+        ("admin contractor_analytics: assigned per contractor",
+            Contractor.objects.annotate(
+                assigned_count=F('open_complaints') + F('resolved_complaints') + F('rejected_complaints'))
+            .order_by('-assigned_count')),
+        ("admin contractor_analytics: open backlog",
+            Complaint.objects.filter(status__in=('pending', 'in_progress')).values_list('submitted_at')),
+        ("contractor dashboard: status counts", by_contractor.values('status').annotate(total=Count('status'))),
+        ("contractor dashboard: monthly assignments", by_contractor.filter(assigned_at__gte=six_months_ago)
+            .annotate(month=TruncMonth('assigned_at')).values('month').annotate(count=Count('report_id'))),
+        ("contractor complaint_list", by_contractor.order_by('-assigned_at')),
+        ("api map: bounding box", geo.in_bbox(Complaint.objects.all(), 12.95, 77.55, 13.0, 77.6)),
+        ("contractor api: changes since", by_contractor.filter(updated_at__gte=six_months_ago).exclude(
+            updated_at=six_months_ago, id__lte=1000).order_by('updated_at', 'id')[:501]),
+        ("duplicate index: changed since", Complaint.objects.filter(updated_at__gte=six_months_ago)),
+        ("contractor api: removals since", ComplaintUnassignment.objects.filter(
+            contractor_id=contractor_id, unassigned_at__gte=six_months_ago).order_by('unassigned_at', 'id')[:501]),
+    ]
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN each hot complaint query and fail if any of them scans the whole table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help="Print every plan, not just failures.")
+
+    def handle(self, *args, **options):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f"Query plan checks are not implemented for {connection.vendor}.")
+
+        if connection.vendor == 'postgresql':
+            # Tiny dev tables make sequential scans cheapest; ask whether an index *can* serve
+            with connection.cursor() as cursor:
+                cursor.execute("SET enable_seqscan = off")
+
+        failures = []
+        for name, queryset in hot_queries():
+            plan = queryset.explain()
+            full_scan = pattern.search(plan)
+            if full_scan:
+                failures.append(name)
+            if full_scan or options['verbose_plans']:
+                self.stdout.write(f"{'FULL SCAN' if full_scan else 'ok'}: {name}\n{plan}\n")
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot quer{'y' if len(failures) == 1 else 'ies'} "
+                               f"fall back to a full table scan: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("All hot queries use an index."))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from user import photos
+from user.models import Complaint
+
+
+class Command(BaseCommand):
+    help = "Generate missing complaint photo renditions (thumbnail/medium, JPEG + WebP)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Regenerate renditions for every photo.")
+
+    def handle(self, *args, **options):
+        qs = Complaint.objects.exclude(photo='').exclude(photo__isnull=True)
+        if not options['all']:
+            qs = qs.filter(photo_processed_at__isnull=True)
+        done = failed = 0
+        for pk in qs.order_by('id').values_list('id', flat=True).iterator():
+            try:
+                photos.process_photo(pk)
+                done += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"Complaint {pk}: {exc}")
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} photos ({failed} failed)."))
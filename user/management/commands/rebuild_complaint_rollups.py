@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from user.models import ComplaintRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the dashboard KPI rollups (ComplaintRollup) from the complaint table."
+
+    def handle(self, *args, **options):
+        buckets = ComplaintRollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {buckets} complaint rollup buckets."))
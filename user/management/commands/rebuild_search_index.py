@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from user import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the complaint full-text search index from the complaint table."
+
+    def handle(self, *args, **options):
+        if not search.is_enabled():
+            raise CommandError("No full-text search table on this database; run migrate first (SQLite needs FTS5).")
+        indexed = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} complaints."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from user import sla
+
+
+class Command(BaseCommand):
+    help = "Rebuild the SLA aggregates (ComplaintSlaBucket) by replaying the complaint event log."
+
+    def handle(self, *args, **options):
+        buckets = sla.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {buckets} SLA buckets."))
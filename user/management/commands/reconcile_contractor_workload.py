@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from user.models import Contractor
+
+
+class Command(BaseCommand):
+    help = "Recount the contractor workload counters (open/resolved/rejected) and repair any drift."
+
+    def handle(self, *args, **options):
+        repaired = Contractor.reconcile_workload()
+        self.stdout.write(self.style.SUCCESS(f"Repaired the workload counters of {repaired} contractor(s)."))
@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from user import photos
+from user.models import Complaint, ComplaintCollectionVersion
+
+
+class Command(BaseCommand):
+    help = "Re-check complaint photos against storage and refresh their cached metadata."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age-hours', type=int, default=24,
+                            help="Only re-check photos last checked longer ago than this (0 = all).")
+        parser.add_argument('--rehash', action='store_true',
+                            help="Re-read every file, not just new ones or ones whose size changed.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        qs = Complaint.objects.exclude(photo='').exclude(photo__isnull=True)
+        if options['max_age_hours']:
+            cutoff = timezone.now() - timedelta(hours=options['max_age_hours'])
+            qs = qs.filter(Q(photo_checked_at__isnull=True) | Q(photo_checked_at__lt=cutoff))
+        # Rows are updated as we go, so walk a fixed list of ids rather than a live cursor
+        ids = list(qs.order_by('id').values_list('id', flat=True))
+        fields = ('id', 'user', 'photo', *photos.METADATA_FIELDS)
+        storage = Complaint._meta.get_field('photo').storage
+        batch_size, missing, changed_users = options['batch_size'], 0, set()
+        for start in range(0, len(ids), batch_size):
+            batch = list(Complaint.objects.filter(id__in=ids[start:start + batch_size]).only(*fields))
+            changed, checked = [], []
+            for complaint in batch:
+                (changed if self._refresh(complaint, storage, options['rehash']) else checked).append(complaint)
+                missing += not complaint.photo_exists
+            # Only a real change moves updated_at (API ETags, the contractor changes feed)
+            now = timezone.now()
+            for complaint in changed:
+                complaint.updated_at = now
+            Complaint.objects.bulk_update(changed, (*photos.METADATA_FIELDS, 'updated_at'))
+            Complaint.objects.bulk_update(checked, photos.METADATA_FIELDS)
+            changed_users.update(complaint.user_id for complaint in changed)
+        if changed_users:
+            ComplaintCollectionVersion.bump(changed_users)
+
+        self.stdout.write(self.style.SUCCESS(f"Checked {len(ids)} photos ({missing} missing)."))
+
+    def _refresh(self, complaint, storage, rehash):
+        """
+        Update `complaint`'s metadata from storage; returns whether anything but the
+        check time changed.
+        """
+        name = complaint.photo.name
+        if not storage.exists(name):
+            metadata = photos.missing_metadata()
+        elif rehash or not complaint.photo_sha256 or storage.size(name) != complaint.photo_size:
+            with storage.open(name, 'rb') as file:
+                metadata = photos.read_metadata(file)
+        else:
+            metadata = {'photo_exists': True, 'photo_checked_at': timezone.now()}
+        changed = False
+        for field, value in metadata.items():
+            changed |= field != 'photo_checked_at' and getattr(complaint, field) != value
+            setattr(complaint, field, value)
+        return changed
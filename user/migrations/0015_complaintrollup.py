@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:13
+
+from django.db import migrations, models
+from django.db.models import BooleanField, Count, ExpressionWrapper, Q
+from django.db.models.functions import TruncDate
+
+
+def populate_rollups(apps, schema_editor):
+    Complaint = apps.get_model('user', 'Complaint')
+    ComplaintRollup = apps.get_model('user', 'ComplaintRollup')
+    rows = Complaint.objects.annotate(
+        day=TruncDate('submitted_at'),
+        is_assigned=ExpressionWrapper(Q(assigned_to__isnull=False), output_field=BooleanField()),
+    ).values('day', 'category', 'status', 'is_assigned').annotate(total=Count('id')).order_by()
+    ComplaintRollup.objects.bulk_create([ComplaintRollup(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0014_alter_complaint_options_alter_contractor_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(choices=[('water', 'Water Leakage'), ('road', 'Broken Road/Potholes'), ('garbage', 'Garbage Collection'), ('electricity', 'Electricity Issues'), ('sewage', 'Sewage Problems'), ('parks', 'Park Maintenance'), ('streetlights', 'Street Light Issues'), ('traffic', 'Traffic Problems'), ('other', 'Other')], max_length=50)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('in_progress', 'In Progress'), ('resolved', 'Resolved'), ('rejected', 'Rejected')], max_length=20)),
+                ('is_assigned', models.BooleanField(default=False)),
+                ('total', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'category', 'status', 'is_assigned'), name='unique_complaint_rollup_bucket')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Full-text search tables for complaints (see user/search.py)
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA compile_options")
+            if 'ENABLE_FTS5' not in {row[0] for row in cursor.fetchall()}:
+                return  # No FTS5 in this SQLite build: search keeps using icontains
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE user_complaint_fts USING fts5("
+            "report_id, location, description, username, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "INSERT INTO user_complaint_fts (rowid, report_id, location, description, username) "
+            "SELECT c.id, c.report_id, c.location, c.description, u.username "
+            "FROM user_complaint c JOIN auth_user u ON u.id = c.user_id"
+        )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE user_complaint_search ("
+            "complaint_id bigint PRIMARY KEY REFERENCES user_complaint (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX user_complaint_search_document ON user_complaint_search USING GIN (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO user_complaint_search (complaint_id, document) "
+            "SELECT c.id, setweight(to_tsvector('simple', c.report_id), 'A') || "
+            "setweight(to_tsvector('simple', c.location), 'B') || "
+            "setweight(to_tsvector('simple', c.description), 'C') || "
+            "setweight(to_tsvector('simple', u.username), 'B') "
+            "FROM user_complaint c JOIN auth_user u ON u.id = c.user_id"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    schema_editor.execute("DROP TABLE IF EXISTS user_complaint_fts")
+    schema_editor.execute("DROP TABLE IF EXISTS user_complaint_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0015_complaintrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0016_complaint_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['user', 'status'], name='complaint_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['assigned_to', 'status'], name='complaint_assignee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['assigned_to', 'assigned_at'], name='complaint_assignee_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['submitted_at', 'id'], name='complaint_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['status', 'submitted_at', 'id'], name='complaint_status_sub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['category', 'submitted_at', 'id'], name='complaint_category_sub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(condition=models.Q(('assigned_to__isnull', True)), fields=['submitted_at', 'id'], name='complaint_unassigned_sub_idx'),
+        ),
+    ]
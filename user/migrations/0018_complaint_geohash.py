@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:20
+
+from django.db import migrations, models
+
+from user.geo import encode
+
+
+def backfill_geohash(apps, schema_editor):
+    Complaint = apps.get_model('user', 'Complaint')
+    pending = []
+    rows = Complaint.objects.filter(latitude__isnull=False, longitude__isnull=False) \
+        .values_list('id', 'latitude', 'longitude')
+    for pk, latitude, longitude in rows:
+        pending.append(Complaint(id=pk, geohash=encode(latitude, longitude)))
+        if len(pending) >= 2000:
+            Complaint.objects.bulk_update(pending, ['geohash'])
+            pending = []
+    Complaint.objects.bulk_update(pending, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0017_complaint_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
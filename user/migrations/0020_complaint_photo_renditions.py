@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0019_complaint_duplicate_of'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='photo_medium',
+            field=models.FileField(blank=True, editable=False, upload_to='complaint_photos/renditions/'),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='photo_medium_webp',
+            field=models.FileField(blank=True, editable=False, upload_to='complaint_photos/renditions/'),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='photo_processed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='photo_thumbnail',
+            field=models.FileField(blank=True, editable=False, upload_to='complaint_photos/renditions/'),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='photo_thumbnail_webp',
+            field=models.FileField(blank=True, editable=False, upload_to='complaint_photos/renditions/'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0020_complaint_photo_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='photo_checked_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='photo_exists',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='photo_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='photo_sha256',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='photo_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='photo_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:29
+
+from django.db import migrations, models
+
+
+def create_counter(apps, schema_editor):
+    # New-format IDs are 10+ characters, so the sequence can start at 1 next to legacy IDs
+    ReportIdCounter = apps.get_model('user', 'ReportIdCounter')
+    ReportIdCounter.objects.get_or_create(name='complaint', defaults={'next_value': 1})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0021_complaint_photo_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportIdCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('next_value', models.BigIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(create_counter, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:34
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Best known "last change" for existing rows, instead of the migration time
+    Complaint = apps.get_model('user', 'Complaint')
+    Complaint.objects.update(updated_at=Coalesce('assigned_at', 'submitted_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0022_reportidcounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintUnassignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('complaint_id', models.BigIntegerField()),
+                ('report_id', models.CharField(max_length=100)),
+                ('unassigned_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['assigned_to', 'updated_at', 'id'], name='complaint_assignee_upd_idx'),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='complaintunassignment',
+            name='contractor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unassignments', to='user.contractor'),
+        ),
+        migrations.AddIndex(
+            model_name='complaintunassignment',
+            index=models.Index(fields=['contractor', 'unassigned_at', 'id'], name='unassignment_sync_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:38
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def populate_versions(apps, schema_editor):
+    Complaint = apps.get_model('user', 'Complaint')
+    ComplaintCollectionVersion = apps.get_model('user', 'ComplaintCollectionVersion')
+    rows = Complaint.objects.values('user_id').annotate(changed_at=Max('updated_at')).order_by()
+    ComplaintCollectionVersion.objects.bulk_create(
+        [ComplaintCollectionVersion(user_id=row['user_id'], changed_at=row['changed_at']) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('user', '0023_complaint_updated_at_unassignments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintCollectionVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='complaint_version', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.BigIntegerField(default=1)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(populate_versions, migrations.RunPython.noop),
+    ]
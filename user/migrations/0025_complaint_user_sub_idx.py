@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0024_complaintcollectionversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['user', 'submitted_at', 'id'], name='complaint_user_sub_idx'),
+        ),
+    ]
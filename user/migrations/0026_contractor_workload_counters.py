@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:45
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_workload(apps, schema_editor):
+    Complaint = apps.get_model('user', 'Complaint')
+    Contractor = apps.get_model('user', 'Contractor')
+    rows = Complaint.objects.filter(assigned_to__isnull=False).values('assigned_to').annotate(
+        open_complaints=Count('id', filter=Q(status__in=('pending', 'in_progress'))),
+        resolved_complaints=Count('id', filter=Q(status='resolved')),
+        rejected_complaints=Count('id', filter=Q(status='rejected')),
+    ).order_by()
+    for row in rows:
+        Contractor.objects.filter(pk=row.pop('assigned_to')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0025_complaint_user_sub_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contractor',
+            name='open_complaints',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='contractor',
+            name='rejected_complaints',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='contractor',
+            name='resolved_complaints',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_workload, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,133 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:48
+
+import math
+from collections import defaultdict
+
+from django.db import migrations, models
+
+# A frozen copy of the user/sla.py replay as of this migration, so that later changes
+# to that module can't change what the migration does. Event kinds and metrics are
+# the integer codes of the models below.
+GAMMA = 1.25
+SUBMITTED, ASSIGNED, REASSIGNED, UNASSIGNED, STATUS_CHANGED, DELETED = range(1, 7)
+TIME_TO_ASSIGN, TIME_TO_RESOLVE, REASSIGNMENTS = 1, 2, 3
+
+
+def bucket_for(seconds):
+    return 0 if seconds <= 1 else math.ceil(math.log(seconds) / math.log(GAMMA))
+
+
+def observe(state, event, category, resolved_code):
+    if event.kind == SUBMITTED:
+        state['submitted'] = event.ts
+    elapsed = max((event.ts - state['submitted']).total_seconds(), 0.0) if state.get('submitted') else None
+    observations = []
+    if event.kind in (REASSIGNED, UNASSIGNED) and state.get('contractor'):
+        observations.append((REASSIGNMENTS, category, state['contractor'], 0.0))
+    if event.kind == ASSIGNED and not state.get('assigned') and elapsed is not None:
+        observations.append((TIME_TO_ASSIGN, category, event.contractor_id, elapsed))
+    if event.kind in (ASSIGNED, REASSIGNED):
+        state['assigned'] = True
+    if (event.kind == STATUS_CHANGED and event.status == resolved_code
+            and not state.get('resolved') and elapsed is not None):
+        observations.append((TIME_TO_RESOLVE, category, event.contractor_id or 0, elapsed))
+        state['resolved'] = True
+    state['contractor'] = None if event.kind in (UNASSIGNED, DELETED) else event.contractor_id
+    return observations
+
+
+def replay_sla_buckets(apps):
+    """
+    Recompute every ComplaintSlaBucket row from the event log (sla.rebuild()).
+    """
+    Complaint = apps.get_model('user', 'Complaint')
+    ComplaintEvent = apps.get_model('user', 'ComplaintEvent')
+    ComplaintSlaBucket = apps.get_model('user', 'ComplaintSlaBucket')
+    category_keys = {code: key for code, (key, _) in enumerate(Complaint._meta.get_field('category').choices, 1)}
+    resolved_code = [key for key, _ in Complaint._meta.get_field('status').choices].index('resolved') + 1
+
+    buckets = defaultdict(lambda: [0, 0.0])
+    complaint_id, state = None, {}
+    for event in ComplaintEvent.objects.order_by('complaint_id', 'ts', 'id').iterator(chunk_size=5000):
+        if event.complaint_id != complaint_id:
+            complaint_id, state = event.complaint_id, {}
+        category = category_keys.get(event.category, 'other')
+        for metric, category, contractor_id, seconds in observe(state, event, category, resolved_code):
+            entry = buckets[(metric, category, contractor_id or 0, bucket_for(seconds))]
+            entry[0] += 1
+            entry[1] += seconds
+
+    ComplaintSlaBucket.objects.all().delete()
+    ComplaintSlaBucket.objects.bulk_create([
+        ComplaintSlaBucket(metric=metric, category=category, contractor_id=contractor_id, bucket=bucket,
+                           count=count, total_seconds=seconds)
+        for (metric, category, contractor_id, bucket), (count, seconds) in buckets.items()
+    ], batch_size=1000)
+
+
+def backfill_events(apps, schema_editor):
+    # Only what the current rows still tell us: submission and the current assignment.
+    # When a closed complaint was closed is not known (updated_at was itself backfilled
+    # by 0023), so no closing event is made up: those complaints stay out of the
+    # time-to-resolve figures rather than reporting a fake duration.
+    Complaint = apps.get_model('user', 'Complaint')
+    ComplaintEvent = apps.get_model('user', 'ComplaintEvent')
+    status_codes = {key: code for code, (key, _) in enumerate(Complaint._meta.get_field('status').choices, 1)}
+    category_codes = {key: code for code, (key, _) in enumerate(Complaint._meta.get_field('category').choices, 1)}
+
+    events = []
+    rows = Complaint.objects.order_by('id').values_list(
+        'id', 'category', 'assigned_to_id', 'submitted_at', 'assigned_at')
+    for pk, category, assigned_to_id, submitted_at, assigned_at in rows.iterator(chunk_size=5000):
+        common = {'complaint_id': pk, 'category': category_codes.get(category, 0)}
+        events.append(ComplaintEvent(ts=submitted_at, kind=SUBMITTED, status=status_codes['pending'],
+                                     contractor_id=None, **common))
+        if assigned_to_id is not None:
+            events.append(ComplaintEvent(ts=assigned_at or submitted_at, kind=ASSIGNED, status=status_codes['in_progress'],
+                                         contractor_id=assigned_to_id, **common))
+        if len(events) >= 5000:
+            ComplaintEvent.objects.bulk_create(events)
+            events = []
+    ComplaintEvent.objects.bulk_create(events)
+    replay_sla_buckets(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0026_contractor_workload_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('complaint_id', models.BigIntegerField()),
+                ('ts', models.DateTimeField()),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'Submitted'), (2, 'Assigned'), (3, 'Reassigned'), (4, 'Unassigned'), (5, 'Status changed'), (6, 'Deleted')])),
+                ('status', models.PositiveSmallIntegerField()),
+                ('category', models.PositiveSmallIntegerField()),
+                ('contractor_id', models.IntegerField(null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['complaint_id', 'ts'], name='complaint_event_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ComplaintSlaBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.PositiveSmallIntegerField(choices=[(1, 'Time to assign'), (2, 'Time to resolve'), (3, 'Reassignments')])),
+                ('category', models.CharField(choices=[('water', 'Water Leakage'), ('road', 'Broken Road/Potholes'), ('garbage', 'Garbage Collection'), ('electricity', 'Electricity Issues'), ('sewage', 'Sewage Problems'), ('parks', 'Park Maintenance'), ('streetlights', 'Street Light Issues'), ('traffic', 'Traffic Problems'), ('other', 'Other')], max_length=50)),
+                ('contractor_id', models.IntegerField(default=0)),
+                ('bucket', models.SmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('total_seconds', models.FloatField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('metric', 'category', 'contractor_id', 'bucket'), name='unique_complaint_sla_bucket')],
+            },
+        ),
+        migrations.RunPython(backfill_events, migrations.RunPython.noop),
+    ]
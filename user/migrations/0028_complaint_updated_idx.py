@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0027_complaint_event_log'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['updated_at'], name='complaint_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-17 09:20
+
+from importlib import import_module
+
+from django.db import migrations
+from django.db.models import Exists, OuterRef
+
+event_log = import_module('user.migrations.0027_complaint_event_log')
+
+
+def drop_backfilled_close_events(apps, schema_editor):
+    # Databases that ran an earlier 0027 got a closing event at updated_at for every
+    # closed complaint, and 0023 had backfilled updated_at with assigned_at or
+    # submitted_at. Those events share their timestamp with the complaint's own
+    # submission or assignment event, which a real close never does.
+    Complaint = apps.get_model('user', 'Complaint')
+    ComplaintEvent = apps.get_model('user', 'ComplaintEvent')
+    statuses = [key for key, _ in Complaint._meta.get_field('status').choices]
+    closed = [statuses.index('resolved') + 1, statuses.index('rejected') + 1]
+
+    same_ts = ComplaintEvent.objects.filter(
+        complaint_id=OuterRef('complaint_id'), ts=OuterRef('ts'),
+        kind__in=(event_log.SUBMITTED, event_log.ASSIGNED))
+    backfilled = ComplaintEvent.objects.filter(kind=event_log.STATUS_CHANGED, status__in=closed).filter(Exists(same_ts))
+    if backfilled.delete()[0]:
+        event_log.replay_sla_buckets(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0028_complaint_updated_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_backfilled_close_events, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,18 @@
 # user/models.py
-from django.db import models
+from collections import Counter, defaultdict
+from datetime import timedelta
+from functools import partial
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Q, Case, Count, BooleanField, ExpressionWrapper, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.db.models.signals import post_delete
+from django.dispatch import Signal, receiver
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.contrib.auth.hashers import make_password, check_password
-import uuid
+
+from . import clusters, geo, live, photos, report_ids, search, sla
+from .duplicates import OPEN_STATUSES, duplicate_index
 
 # --- Complaint Model (Deduced from your views) ---
 class Complaint(models.Model):
@@ -32,11 +41,28 @@ class Complaint(models.Model):
     location = models.CharField(max_length=255)
     description = models.TextField()
     photo = models.ImageField(upload_to='complaint_photos/', blank=True, null=True)
+    # --- Photo renditions written by user/photos.py (orientation fixed, no EXIF) ---
+    photo_thumbnail = models.FileField(upload_to='complaint_photos/renditions/', blank=True, editable=False)
+    photo_thumbnail_webp = models.FileField(upload_to='complaint_photos/renditions/', blank=True, editable=False)
+    photo_medium = models.FileField(upload_to='complaint_photos/renditions/', blank=True, editable=False)
+    photo_medium_webp = models.FileField(upload_to='complaint_photos/renditions/', blank=True, editable=False)
+    photo_processed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # --- Cached metadata of the original photo (set at upload, refreshed by verify_complaint_photos) ---
+    photo_exists = models.BooleanField(default=False, editable=False)
+    photo_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    photo_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    photo_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    photo_sha256 = models.CharField(max_length=64, blank=True, default='', editable=False)
+    photo_checked_at = models.DateTimeField(null=True, blank=True, editable=False)
     # --- ADDED: Lat/Lng fields for the map ---
     latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    # Geohash of (latitude, longitude), kept by save(); the spatial index for user/geo.py
+    geohash = models.CharField(max_length=12, blank=True, default='', db_index=True, editable=False)
     # ---
     submitted_at = models.DateTimeField(auto_now_add=True)
+    # Bumped by every save(); set-based .update() calls must set it themselves (contractor delta sync)
+    updated_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     
     # --- Contractor Relationship ---
@@ -49,21 +75,341 @@ class Complaint(models.Model):
     )
     assigned_at = models.DateTimeField(null=True, blank=True)
 
+    # --- Duplicate reports are linked to the open complaint they repeat ---
+    duplicate_of = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='duplicates'
+    )
+
+    class Meta:
+        # Matched to the hot query shapes; `manage.py check_query_plans` verifies them
+        indexes = [
+            # Citizen home page: a user's complaints and their status counts
+            models.Index(fields=['user', 'status'], name='complaint_user_status_idx'),
+            # Complaints API: a user's complaints, newest first, in cursor pages
+            models.Index(fields=['user', 'submitted_at', 'id'], name='complaint_user_sub_idx'),
+            # Contractor dashboard / lists: workload per status, newest assignments first
+            models.Index(fields=['assigned_to', 'status'], name='complaint_assignee_status_idx'),
+            models.Index(fields=['assigned_to', 'assigned_at'], name='complaint_assignee_date_idx'),
+            # Contractor API delta sync: ?since= cursor over (updated_at, id)
+            models.Index(fields=['assigned_to', 'updated_at', 'id'], name='complaint_assignee_upd_idx'),
+            # Duplicate index refresh: complaints changed since the last lookup
+            models.Index(fields=['updated_at'], name='complaint_updated_idx'),
+            # Admin list keyset pages and submitted_at month ranges
+            models.Index(fields=['submitted_at', 'id'], name='complaint_submitted_idx'),
+            models.Index(fields=['status', 'submitted_at', 'id'], name='complaint_status_sub_idx'),
+            models.Index(fields=['category', 'submitted_at', 'id'], name='complaint_category_sub_idx'),
+            # Unassigned backlog (small partial index)
+            models.Index(
+                fields=['submitted_at', 'id'],
+                condition=models.Q(assigned_to__isnull=True),
+                name='complaint_unassigned_sub_idx',
+            ),
+        ]
+
+    # Stored values save() compares against to keep derived data in step
+    TRACKED_FIELDS = (
+        'submitted_at', 'category', 'status', 'assigned_to_id',
+        'report_id', 'location', 'description', 'user_id',
+        'latitude', 'longitude', 'geohash', 'photo',
+    )
+    SEARCH_FIELDS = ('report_id', 'location', 'description', 'user_id')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what is stored, so save() can tell what changed
+        instance._loaded = {f: instance.__dict__[f] for f in cls.TRACKED_FIELDS if f in instance.__dict__}
+        if 'photo' in instance._loaded:
+            instance._loaded['photo'] = instance._loaded['photo'] or ''
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # What was just read is what is stored (a partial refresh leaves other edits pending)
+        refreshed = self.TRACKED_FIELDS if fields is None else \
+            [f for f in self.TRACKED_FIELDS if f in fields or f.removesuffix('_id') in fields]
+        loaded = getattr(self, '_loaded', {})
+        loaded.update({f: self.__dict__[f] for f in refreshed if f in self.__dict__})
+        if 'photo' in loaded:
+            loaded['photo'] = loaded['photo'] or ''
+        self._loaded = loaded
+
+    @staticmethod
+    def rollup_key_for(values):
+        """
+        The (day, category, status, is_assigned) ComplaintRollup bucket for a set of values.
+        """
+        return (
+            timezone.localdate(values['submitted_at']),
+            values['category'],
+            values['status'],
+            values['assigned_to_id'] is not None,
+        )
+
+    @staticmethod
+    def workload_key_for(values):
+        """
+        The (contractor_id, counter field) Contractor workload counter for a set of values, or None.
+        """
+        if values['assigned_to_id'] is None:
+            return None
+        return values['assigned_to_id'], Contractor.workload_field(values['status'])
+
+    def rollup_key(self):
+        return self.rollup_key_for(self._current_values())
+
+    def workload_key(self):
+        return self.workload_key_for(self._current_values())
+
+    def _current_values(self):
+        values = {f: getattr(self, f) for f in self.TRACKED_FIELDS}
+        values['photo'] = self.photo.name or ''
+        return values
+
+    def _stored_values(self):
+        if self._state.adding:
+            return None
+        stored = dict(getattr(self, '_loaded', {}))
+        missing = [f for f in self.TRACKED_FIELDS if f not in stored]
+        if missing:
+            # Loaded with .only()/.defer() - read the rest of the stored values back
+            row = Complaint.objects.filter(pk=self.pk).values(*missing).first()
+            if row is None:
+                return None
+            stored.update(row)
+        return stored
+
+    def _sync_derived(self, old, new):
+        # Dashboard rollups
+        old_key = self.rollup_key_for(old) if old else None
+        new_key = self.rollup_key_for(new)
+        if old_key != new_key:
+            changes = Counter({new_key: 1})
+            if old_key is not None:
+                changes[old_key] -= 1
+            ComplaintRollup.apply_changes(changes)
+
+        # Contractor workload counters
+        old_workload = self.workload_key_for(old) if old else None
+        new_workload = self.workload_key_for(new)
+        if old_workload != new_workload:
+            changes = Counter()
+            if new_workload is not None:
+                changes[new_workload] += 1
+            if old_workload is not None:
+                changes[old_workload] -= 1
+            Contractor.apply_workload_changes(changes)
+
+        # Event log and SLA metrics
+        sla.record([(self.pk, old, new)])
+
+        # Live updates for citizens, contractors and admins (user/live.py)
+        transaction.on_commit(partial(live.publish_changes, [(old, new)]))
+
+        # Duplicate detection grid (other processes catch up by updated_at)
+        if old and old['status'] in OPEN_STATUSES and new['status'] not in OPEN_STATUSES:
+            transaction.on_commit(partial(duplicate_index.evict, [self.pk]))
+
+        # Full-text search index
+        if not old or any(old[f] != new[f] for f in self.SEARCH_FIELDS):
+            search.index_complaint(self)
+
+        # Cached map cluster tiles (dropped once the change is committed)
+        if not old or old['geohash'] != new['geohash'] or old['status'] != new['status']:
+            points = {(new['latitude'], new['longitude'])}
+            if old:
+                points.add((old['latitude'], old['longitude']))
+            transaction.on_commit(partial(clusters.invalidate_points, points))
+
+        # Tell the previous contractor's devices the complaint is no longer theirs
+        if old and old['assigned_to_id'] is not None and old['assigned_to_id'] != new['assigned_to_id']:
+            ComplaintUnassignment.objects.create(
+                contractor_id=old['assigned_to_id'], complaint_id=self.pk, report_id=new['report_id'])
+
+        # API conditional GETs: the owner's collection changed
+        ComplaintCollectionVersion.bump({new['user_id'], old['user_id'] if old else new['user_id']})
+
+        # Photo renditions are rebuilt off the request path
+        if new['photo'] and (not old or old['photo'] != new['photo']):
+            photos.queue_photo_processing(self.pk)
+
     def save(self, *args, **kwargs):
         if not self.report_id:
-            # Generate a unique report ID, e.g., URB12345
-            self.report_id = f"URB{str(uuid.uuid4().int)[:6]}"
+            # Sequence-allocated, check-digited report ID, e.g. URB016JK7QXH (see report_ids.py)
+            self.report_id = report_ids.next_report_id()
         
         # Update assigned_at timestamp when a contractor is first assigned
-        if self.assigned_to and not self.assigned_at:
+        if self.assigned_to_id and not self.assigned_at:
             self.assigned_at = timezone.now()
-        
-        super().save(*args, **kwargs)
+
+        # Photo metadata is read from a new upload while it is still in memory. Its EXIF
+        # (GPS position etc.) is stripped by process_photo() in the background; until
+        # then photo_processed_at is None and the original is not served
+        if self.photo and not self.photo._committed:
+            metadata = {**photos.read_metadata(self.photo.file), 'photo_processed_at': None}
+        elif not self.photo and self.photo_checked_at:
+            metadata = photos.empty_metadata()
+        else:
+            metadata = {}
+        for field, value in metadata.items():
+            setattr(self, field, value)
+        update_fields = kwargs.get('update_fields')
+        if metadata and update_fields is not None and 'photo' in update_fields:
+            kwargs['update_fields'] = {*update_fields, *metadata}
+
+        # Spatial key for bbox / radius queries
+        self.geohash = geo.encode(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+
+        # Keep rollups and the search index in step with the row, in the same transaction
+        with transaction.atomic():
+            old = self._stored_values()
+            super().save(*args, **kwargs)
+            new = self._current_values()
+            self._sync_derived(old, new)
+        self._loaded = new
+
+    @classmethod
+    def bulk_create_reports(cls, complaints):
+        """
+        Insert new complaints with one bulk_create() and bring the derived data
+        (rollups, search index, map tiles) up to date as save() would, in one
+        transaction. Photos are not handled here; upload those one complaint at a time.
+        """
+        new_ids = iter(report_ids.next_report_ids(sum(1 for c in complaints if not c.report_id)))
+        for complaint in complaints:
+            complaint.report_id = complaint.report_id or next(new_ids)
+            complaint.geohash = geo.encode(complaint.latitude, complaint.longitude)
+            if complaint.assigned_to_id and not complaint.assigned_at:
+                complaint.assigned_at = timezone.now()
+
+        with transaction.atomic():
+            created = cls.objects.bulk_create(complaints)
+            ComplaintRollup.apply_changes(Counter(complaint.rollup_key() for complaint in created))
+            Contractor.apply_workload_changes(Counter(
+                complaint.workload_key() for complaint in created if complaint.assigned_to_id is not None))
+            sla.record([(complaint.pk, None, complaint._current_values()) for complaint in created])
+            transaction.on_commit(partial(
+                live.publish_changes, [(None, complaint._current_values()) for complaint in created]))
+            search.index_complaints(complaint.pk for complaint in created)
+            ComplaintCollectionVersion.bump({complaint.user_id for complaint in created})
+            points = {(complaint.latitude, complaint.longitude) for complaint in created}
+            transaction.on_commit(partial(clusters.invalidate_points, points))
+        for complaint in created:
+            complaint._loaded = complaint._current_values()
+        return created
+
+    # --- Set-based changes (admin bulk actions, backlog assignment) ---
+    # Each runs as one UPDATE over the locked rows. The derived data is brought up to
+    # date as save() would, from the rows' old and new values.
+    BULK_ROW_FIELDS = ('id', 'report_id', 'submitted_at', 'category', 'status', 'assigned_to_id',
+                       'user_id', 'latitude', 'longitude')
+
+    @classmethod
+    def _bulk_change(cls, complaints, new_values, **update):
+        """
+        UPDATE `complaints` (a queryset) with `update`. `new_values(row)` gives the
+        (status, assigned_to_id) the UPDATE leaves a row with. Returns the number changed.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            rows = list(complaints.select_for_update().values(*cls.BULK_ROW_FIELDS))
+            if not rows:
+                return 0
+            cls.objects.filter(id__in=[row['id'] for row in rows]).update(updated_at=now, **update)
+
+            changes = Counter()
+            workload = Counter()
+            tombstones = []
+            transitions = []
+            for row in rows:
+                new = dict(row)
+                new['status'], new['assigned_to_id'] = new_values(row)
+                transitions.append((row, new))
+                changes[cls.rollup_key_for(row)] -= 1
+                changes[cls.rollup_key_for(new)] += 1
+                if row['assigned_to_id'] is not None:
+                    workload[cls.workload_key_for(row)] -= 1
+                if new['assigned_to_id'] is not None:
+                    workload[cls.workload_key_for(new)] += 1
+                if row['assigned_to_id'] is not None and row['assigned_to_id'] != new['assigned_to_id']:
+                    tombstones.append(ComplaintUnassignment(
+                        contractor_id=row['assigned_to_id'], complaint_id=row['id'],
+                        report_id=row['report_id'], unassigned_at=now))
+            ComplaintRollup.apply_changes(changes)
+            Contractor.apply_workload_changes(workload)
+            sla.record([(row['id'], row, new) for row, new in transitions], ts=now)
+            transaction.on_commit(partial(live.publish_changes, transitions))
+            transaction.on_commit(partial(duplicate_index.evict, [
+                row['id'] for row, new in transitions if new['status'] not in OPEN_STATUSES]))
+            ComplaintUnassignment.objects.bulk_create(tombstones)
+            ComplaintCollectionVersion.bump({row['user_id'] for row in rows})
+            points = {(row['latitude'], row['longitude']) for row in rows}
+            transaction.on_commit(partial(clusters.invalidate_points, points))
+        return len(rows)
+
+    @classmethod
+    def bulk_assign(cls, complaints, contractor_id, start=True):
+        """
+        Assign `complaints` to a contractor. assigned_at is kept if already set, and with
+        `start` pending ones move to 'in_progress', as in the admin complaint_detail view
+        (automatic assignment leaves them pending for the contractor to start).
+        """
+        update = {'status': Case(When(status='pending', then=Value('in_progress')), default=F('status'))} if start else {}
+        return cls._bulk_change(
+            complaints.exclude(assigned_to_id=contractor_id),
+            lambda row: ('in_progress' if start and row['status'] == 'pending' else row['status'], contractor_id),
+            assigned_to_id=contractor_id,
+            assigned_at=Coalesce('assigned_at', Value(timezone.now())),
+            **update,
+        )
+
+    @classmethod
+    def bulk_unassign(cls, complaints):
+        """
+        Unassign `complaints`; those 'in_progress' go back to 'pending'.
+        """
+        return cls._bulk_change(
+            complaints.filter(assigned_to__isnull=False),
+            lambda row: ('pending' if row['status'] == 'in_progress' else row['status'], None),
+            assigned_to_id=None,
+            assigned_at=None,
+            status=Case(When(status='in_progress', then=Value('pending')), default=F('status')),
+        )
+
+    @classmethod
+    def bulk_set_status(cls, complaints, status):
+        return cls._bulk_change(
+            complaints.exclude(status=status),
+            lambda row: (status, row['assigned_to_id']),
+            status=status,
+        )
 
     def __str__(self):
         return self.report_id
 
 # --- Contractor Model (MODIFIED) ---
+# Sent after a Contractor queryset .update() that may change a logged-in contractor
+# (contractor/principal.py drops their cached principals); `pks` are the matched rows.
+contractors_updated = Signal()
+
+
+class ContractorQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        if set(kwargs) <= set(Contractor.WORKLOAD_FIELDS):
+            return super().update(**kwargs)    # Counters only, not part of the principal
+        pks = list(self.values_list('pk', flat=True))
+        rows = super().update(**kwargs)
+        contractors_updated.send(sender=Contractor, pks=pks)
+        return rows
+
+
 class Contractor(models.Model):
     # --- Using the specializations from your uploaded file ---
     SPECIALIZATION_CHOICES = [
@@ -89,18 +435,330 @@ class Contractor(models.Model):
     email = models.EmailField(unique=True) # This was already in your file
     password = models.CharField(max_length=128) # <-- THIS IS THE MISSING FIELD
 
+    # --- Workload counters of assigned complaints ---
+    # Maintained with F() in the transaction that changes a complaint's assignee or
+    # status (Complaint.save(), the bulk methods, post_delete); repaired with
+    # `manage.py reconcile_contractor_workload`. Never written by save().
+    open_complaints = models.PositiveIntegerField(default=0, editable=False)        # pending + in progress
+    resolved_complaints = models.PositiveIntegerField(default=0, editable=False)
+    rejected_complaints = models.PositiveIntegerField(default=0, editable=False)
+    WORKLOAD_FIELDS = ('open_complaints', 'resolved_complaints', 'rejected_complaints')
+
+    objects = ContractorQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
+    @property
+    def total_complaints(self):
+        return self.open_complaints + self.resolved_complaints + self.rejected_complaints
+
     # --- NEW: Save method to hash password ---
     def save(self, *args, **kwargs):
         # Hash the password if it's not already hashed (e.g., pbkdf2_sha256$)
         if not self.password.startswith(('pbkdf2_sha256$', 'bcrypt$', 'argon2')):
             self.password = make_password(self.password)
+        # An edit form must not write back counters read before a concurrent F() update
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.WORKLOAD_FIELDS
+            ]
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def workload_field(status):
+        return {'resolved': 'resolved_complaints', 'rejected': 'rejected_complaints'}.get(status, 'open_complaints')
+
+    @classmethod
+    def apply_workload_changes(cls, changes):
+        """
+        Add each delta in `changes` ({(contractor_id, counter field): delta}), with one
+        UPDATE per contractor. Must be called inside the transaction that changed the complaints.
+        """
+        by_contractor = defaultdict(dict)
+        for (contractor_id, field), delta in changes.items():
+            if delta:
+                by_contractor[contractor_id][field] = F(field) + delta
+        for contractor_id, updates in by_contractor.items():
+            cls.objects.filter(pk=contractor_id).update(**updates)
+
+    @classmethod
+    def reconcile_workload(cls):
+        """
+        Recount every contractor's counters from the complaint table and fix any
+        that drifted. Returns the number of contractors repaired.
+        """
+        counts = {
+            row.pop('assigned_to'): row
+            for row in Complaint.objects.filter(assigned_to__isnull=False).values('assigned_to').annotate(
+                open_complaints=Count('id', filter=Q(status__in=('pending', 'in_progress'))),
+                resolved_complaints=Count('id', filter=Q(status='resolved')),
+                rejected_complaints=Count('id', filter=Q(status='rejected')),
+            ).order_by()
+        }
+        empty = dict.fromkeys(cls.WORKLOAD_FIELDS, 0)
+        repaired = 0
+        with transaction.atomic():
+            for contractor_id, *stored in cls.objects.select_for_update().values_list('id', *cls.WORKLOAD_FIELDS):
+                actual = counts.get(contractor_id, empty)
+                if dict(zip(cls.WORKLOAD_FIELDS, stored)) != actual:
+                    cls.objects.filter(pk=contractor_id).update(**actual)
+                    repaired += 1
+        return repaired
+
     # --- NEW: Method to check password ---
     def check_password(self, raw_password):
         # Helper method to check password
         return check_password(raw_password, self.password)
 
+
+
+# --- Report ID Sequence ---
+class ReportIdCounter(models.Model):
+    """
+    Next unreserved report number; user/report_ids.py reserves blocks from it.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+
+# --- Per-user Complaint Collection Version ---
+class ComplaintCollectionVersion(models.Model):
+    """
+    Bumped whenever one of a user's complaints is created, changed or deleted, so the
+    complaints API can answer If-None-Match / If-Modified-Since polls with a single
+    primary-key lookup. Maintained by Complaint.save(), the delete hook and the bulk
+    paths; set-based .update() calls must call bump() themselves.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='complaint_version')
+    version = models.BigIntegerField(default=1)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user_id}: v{self.version}"
+
+    @classmethod
+    def bump(cls, user_ids, create=True):
+        user_ids = set(user_ids)
+        now = timezone.now()
+        bumped = cls.objects.filter(user_id__in=user_ids).update(version=F('version') + 1, changed_at=now)
+        if create and bumped < len(user_ids):
+            # First complaint of these users; a concurrent insert wins and is just as new
+            cls.objects.bulk_create([cls(user_id=user_id, changed_at=now) for user_id in user_ids],
+                                    ignore_conflicts=True)
+
+    @classmethod
+    def current(cls, user_id):
+        """
+        (version, changed_at) for a user, or (0, None) if they never had a complaint.
+        """
+        return cls.objects.filter(user_id=user_id).values_list('version', 'changed_at').first() or (0, None)
+
+    @classmethod
+    async def acurrent(cls, user_id):
+        return await cls.objects.filter(user_id=user_id).values_list('version', 'changed_at').afirst() or (0, None)
+
+
+# --- Contractor Sync Tombstones ---
+class ComplaintUnassignment(models.Model):
+    """
+    A complaint leaving a contractor's list (reassigned, unassigned or deleted), so
+    the contractor API's changes feed can tell devices to drop it. Written by
+    Complaint.save() and the post_delete hook; pruned after TOMBSTONE_RETENTION.
+
+    Deleting a contractor deletes their tombstones with them (CASCADE): a deleted
+    contractor can no longer authenticate, so nobody is left to sync them. Deactivated
+    contractors keep theirs until they are pruned.
+    """
+    TOMBSTONE_RETENTION = timedelta(days=30)
+
+    contractor = models.ForeignKey(Contractor, on_delete=models.CASCADE, related_name='unassignments')
+    complaint_id = models.BigIntegerField()    # No FK: the complaint may be gone
+    report_id = models.CharField(max_length=100)
+    unassigned_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['contractor', 'unassigned_at', 'id'], name='unassignment_sync_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.report_id} left contractor {self.contractor_id}"
+
+    @classmethod
+    def prune(cls):
+        return cls.objects.filter(unassigned_at__lt=timezone.now() - cls.TOMBSTONE_RETENTION).delete()[0]
+
+
+# --- Dashboard KPI Rollups ---
+class ComplaintRollup(models.Model):
+    """
+    Pre-aggregated complaint counts per day x category x status x assigned flag.
+    Maintained by Complaint.save() and the post_delete hook below; rebuilt from
+    scratch with `manage.py rebuild_complaint_rollups`.
+    """
+    day = models.DateField()
+    category = models.CharField(max_length=50, choices=Complaint.CATEGORY_CHOICES)
+    status = models.CharField(max_length=20, choices=Complaint.STATUS_CHOICES)
+    is_assigned = models.BooleanField(default=False)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'category', 'status', 'is_assigned'],
+                name='unique_complaint_rollup_bucket',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.category}/{self.status} ({self.total})"
+
+    @classmethod
+    def apply_changes(cls, changes):
+        """
+        Add each delta in `changes` ({rollup_key: delta}) to its bucket row.
+        Must be called inside the transaction that changed the complaints.
+        """
+        for (day, category, status, is_assigned), delta in changes.items():
+            if not delta:
+                continue
+            bucket = cls.objects.filter(day=day, category=category, status=status, is_assigned=is_assigned)
+            if bucket.update(total=F('total') + delta):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(day=day, category=category, status=status,
+                                       is_assigned=is_assigned, total=delta)
+            except IntegrityError:
+                # Another writer created the bucket between our UPDATE and INSERT
+                bucket.update(total=F('total') + delta)
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recompute every bucket from the complaint table. Returns the bucket count.
+        """
+        rows = Complaint.objects.annotate(
+            day=TruncDate('submitted_at'),
+            is_assigned=ExpressionWrapper(Q(assigned_to__isnull=False), output_field=BooleanField()),
+        ).values('day', 'category', 'status', 'is_assigned').annotate(total=Count('id')).order_by()
+        buckets = [cls(**row) for row in rows]
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(buckets, batch_size=1000)
+        return len(buckets)
+
+
+# --- Complaint Event Log ---
+class ComplaintEvent(models.Model):
+    """
+    Append-only log of complaint status and assignment transitions, written with the
+    change itself by sla.record(). Fields are integer-coded to keep rows small.
+    """
+    SUBMITTED, ASSIGNED, REASSIGNED, UNASSIGNED, STATUS_CHANGED, DELETED = range(1, 7)
+    KIND_CHOICES = [
+        (SUBMITTED, 'Submitted'),
+        (ASSIGNED, 'Assigned'),
+        (REASSIGNED, 'Reassigned'),
+        (UNASSIGNED, 'Unassigned'),
+        (STATUS_CHANGED, 'Status changed'),
+        (DELETED, 'Deleted'),
+    ]
+    # Codes are 1-based positions in the Complaint choices, so new choices must be appended
+    STATUS_CODES = {key: code for code, (key, _) in enumerate(Complaint.STATUS_CHOICES, 1)}
+    CATEGORY_CODES = {key: code for code, (key, _) in enumerate(Complaint.CATEGORY_CHOICES, 1)}
+    CATEGORY_KEYS = {code: key for key, code in CATEGORY_CODES.items()}
+
+    complaint_id = models.BigIntegerField()    # No FK: the log outlives deleted complaints
+    ts = models.DateTimeField()
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    status = models.PositiveSmallIntegerField()             # STATUS_CODES, after the event
+    category = models.PositiveSmallIntegerField()           # CATEGORY_CODES
+    contractor_id = models.IntegerField(null=True)          # Assignee after the event (UNASSIGNED: the one removed)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['complaint_id', 'ts'], name='complaint_event_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.complaint_id} {self.get_kind_display()} at {self.ts}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Complaint events are append-only.")
+        super().save(*args, **kwargs)
+
+
+# --- Running SLA Aggregates ---
+class ComplaintSlaBucket(models.Model):
+    """
+    Count and summed seconds of SLA observations per metric x category x contractor
+    and log-spaced duration bucket (see user/sla.py), so SLA dashboards read a few
+    precomputed rows. Maintained by sla.record(); rebuilt from the event log with
+    `manage.py rebuild_sla_metrics`.
+    """
+    TIME_TO_ASSIGN, TIME_TO_RESOLVE, REASSIGNMENTS = 1, 2, 3
+    METRIC_CHOICES = [
+        (TIME_TO_ASSIGN, 'Time to assign'),
+        (TIME_TO_RESOLVE, 'Time to resolve'),
+        (REASSIGNMENTS, 'Reassignments'),
+    ]
+
+    metric = models.PositiveSmallIntegerField(choices=METRIC_CHOICES)
+    category = models.CharField(max_length=50, choices=Complaint.CATEGORY_CHOICES)
+    contractor_id = models.IntegerField(default=0)    # 0: nobody assigned
+    bucket = models.SmallIntegerField()
+    count = models.IntegerField(default=0)
+    total_seconds = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['metric', 'category', 'contractor_id', 'bucket'],
+                name='unique_complaint_sla_bucket',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_metric_display()} {self.category}/{self.contractor_id} #{self.bucket} ({self.count})"
+
+    @classmethod
+    def apply_changes(cls, changes):
+        """
+        Add each (count, seconds) in `changes` ({(metric, category, contractor_id, bucket): ...})
+        to its bucket row. Must be called inside the transaction that logged the events.
+        """
+        for (metric, category, contractor_id, bucket), (count, seconds) in changes.items():
+            rows = cls.objects.filter(metric=metric, category=category, contractor_id=contractor_id, bucket=bucket)
+            if rows.update(count=F('count') + count, total_seconds=F('total_seconds') + seconds):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(metric=metric, category=category, contractor_id=contractor_id,
+                                       bucket=bucket, count=count, total_seconds=seconds)
+            except IntegrityError:
+                # Another writer created the bucket between our UPDATE and INSERT
+                rows.update(count=F('count') + count, total_seconds=F('total_seconds') + seconds)
+
+
+@receiver(post_delete, sender=Complaint)
+def remove_complaint_from_derived(sender, instance, **kwargs):
+    # Also fires for queryset and cascade deletes, inside the delete transaction
+    values = {**instance.__dict__, **getattr(instance, '_loaded', {})}
+    ComplaintRollup.apply_changes({Complaint.rollup_key_for(values): -1})
+    if values['assigned_to_id'] is not None:
+        Contractor.apply_workload_changes({Complaint.workload_key_for(values): -1})
+        ComplaintUnassignment.objects.create(
+            contractor_id=values['assigned_to_id'], complaint_id=instance.pk, report_id=values['report_id'])
+    sla.record([(instance.pk, values, None)])
+    search.remove_complaint(instance.pk)
+    transaction.on_commit(partial(duplicate_index.evict, [instance.pk]))
+    # Update only: when the user is being deleted too, their row is already gone
+    ComplaintCollectionVersion.bump({values['user_id']}, create=False)
+    transaction.on_commit(partial(clusters.invalidate_points, [(values['latitude'], values['longitude'])]))
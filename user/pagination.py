@@ -0,0 +1,13 @@
+# user/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class ComplaintCursorPagination(CursorPagination):
+    """
+    Newest-first cursor pages for the complaints API (?cursor=, ?page_size=), served
+    by the (user, submitted_at, id) index at any depth.
+    """
+    ordering = ('-submitted_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
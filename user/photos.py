@@ -0,0 +1,191 @@
+# user/photos.py
+"""
+Complaint photo pipeline.
+
+When a complaint's photo changes, Complaint.save() queues process_photo() on a small
+thread pool once the transaction commits. It fixes the orientation from EXIF, drops
+all metadata and writes fixed-size thumbnail and medium renditions as JPEG and WebP.
+Lists and detail pages serve these renditions; the original upload is only linked.
+`manage.py process_complaint_photos` catches up on anything the queue missed.
+
+process_photo() also rewrites the original without its metadata (GPS position,
+device, timestamps). Until it has (photo_processed_at is set), pages and the API do
+not link the original, so they never reveal where or with what a photo was taken.
+
+The original's metadata (size, dimensions, SHA-256) is read from the upload by
+Complaint.save() and re-checked against storage by `manage.py verify_complaint_photos`,
+so pages, the API and exports never have to stat the storage backend.
+"""
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS = {
+    'thumbnail': (200, 200),
+    'medium': (960, 960),
+}
+JPEG_QUALITY = 82
+WEBP_QUALITY = 78
+WORKERS = 2
+HASH_CHUNK_SIZE = 64 * 1024
+ORIENTATION_TAG = 0x0112
+
+METADATA_FIELDS = (
+    'photo_exists', 'photo_size', 'photo_width', 'photo_height', 'photo_sha256', 'photo_checked_at',
+)
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='complaint-photos')
+
+
+def read_metadata(file):
+    """
+    Size, dimensions and SHA-256 of an open photo file, as Complaint field values.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    file.seek(0)
+    for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    file.seek(0)
+    try:
+        width, height = Image.open(file).size   # Reads the header only
+    except (OSError, Image.DecompressionBombError):
+        width = height = None
+    file.seek(0)
+    return {
+        'photo_exists': True,
+        'photo_size': size,
+        'photo_width': width,
+        'photo_height': height,
+        'photo_sha256': digest.hexdigest(),
+        'photo_checked_at': timezone.now(),
+    }
+
+
+def missing_metadata():
+    return {
+        'photo_exists': False,
+        'photo_checked_at': timezone.now(),
+    }
+
+
+def empty_metadata():
+    return {
+        'photo_exists': False,
+        'photo_size': None,
+        'photo_width': None,
+        'photo_height': None,
+        'photo_sha256': '',
+        'photo_checked_at': None,
+    }
+
+
+def strip_metadata(file):
+    """
+    The photo in `file` re-encoded without EXIF, XMP or text metadata, with its EXIF
+    orientation applied to the pixels, as bytes. None if it carries no such metadata
+    or is not an image Pillow can read.
+    """
+    file.seek(0)
+    try:
+        image = Image.open(file)
+        image.load()
+    except (OSError, Image.DecompressionBombError):
+        file.seek(0)
+        return None
+    file.seek(0)
+    exif = image.getexif()
+    if not exif and not getattr(image, 'text', None) \
+            and not any(key in image.info for key in ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment')):
+        return None
+
+    fmt = image.format
+    options = {}
+    if image.info.get('icc_profile'):
+        options['icc_profile'] = image.info['icc_profile']   # Colour profile only, not identifying
+    if exif.get(ORIENTATION_TAG, 1) != 1:
+        image = ImageOps.exif_transpose(image)
+        if fmt == 'JPEG':
+            options['quality'] = 95
+    elif fmt == 'JPEG':
+        options['quality'] = 'keep'    # Same quantization tables as the upload
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)  # Pillow writes no EXIF/XMP unless asked to
+    return buffer.getvalue()
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    if fmt == 'jpeg':
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def process_photo(complaint_id):
+    """
+    Write every rendition for one complaint's photo and store their paths on it.
+    """
+    from .models import Complaint, ComplaintCollectionVersion
+
+    complaint = Complaint.objects.filter(pk=complaint_id).only('id', 'photo', 'user_id').first()
+    if complaint is None or not complaint.photo:
+        return False
+
+    with complaint.photo.open('rb') as original:
+        cleaned = strip_metadata(original)
+        image = Image.open(original)
+        image = ImageOps.exif_transpose(image)   # Apply the EXIF orientation to the pixels
+        image = image.convert('RGB')             # Re-encoding below keeps no EXIF/ICC metadata
+        image.load()
+
+    now = timezone.now()
+    updates = {'photo_processed_at': now, 'updated_at': now}   # New rendition URLs count as a change
+    for name, size in RENDITIONS.items():
+        rendition = image.copy()
+        rendition.thumbnail(size, Image.LANCZOS)
+        for fmt, extension in (('jpeg', 'jpg'), ('webp', 'webp')):
+            field = f'photo_{name}' if fmt == 'jpeg' else f'photo_{name}_webp'
+            storage = Complaint._meta.get_field(field).storage
+            path = f"complaint_photos/renditions/{complaint.pk}_{name}.{extension}"
+            if storage.exists(path):
+                storage.delete(path)
+            updates[field] = storage.save(path, ContentFile(_encode(rendition, fmt)))
+
+    if cleaned is not None:
+        storage, name = complaint.photo.storage, complaint.photo.name
+        storage.delete(name)
+        updates['photo'] = storage.save(name, ContentFile(cleaned))
+        updates.update(read_metadata(io.BytesIO(cleaned)))
+
+    # Direct UPDATE: renditions do not affect rollups, search or the other derived data
+    with transaction.atomic():
+        Complaint.objects.filter(pk=complaint.pk).update(**updates)
+        ComplaintCollectionVersion.bump({complaint.user_id})
+    return True
+
+
+def _run(complaint_id):
+    try:
+        process_photo(complaint_id)
+    except Exception:
+        logger.exception("Photo processing failed for complaint %s", complaint_id)
+    finally:
+        close_old_connections()
+
+
+def queue_photo_processing(complaint_id):
+    """
+    Process the photo in the background once the current transaction commits.
+    """
+    transaction.on_commit(lambda: _executor.submit(_run, complaint_id))
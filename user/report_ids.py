@@ -0,0 +1,231 @@
+# user/report_ids.py
+"""
+Report ID allocation.
+
+IDs are "URB" + a sequence number + SECRET_CHARS random characters + a check
+character, all in Crockford base32 (digits and upper-case letters without I, L, O
+and U). The number takes at least MIN_CHARS characters, e.g. number 1234 with
+random part K7QX -> URB016JK7QX + check character -> URB016JK7QXH. Numbers come
+from the ReportIdCounter row, which hands each process a block of BLOCK_SIZE numbers
+at a time. So they are unique by construction, and only one save in BLOCK_SIZE pays
+for an extra UPDATE.
+
+The report ID is all a citizen needs to track a complaint (the track page and its
+live stream show category, location and status), so it must not be guessable from
+its neighbours: the random part makes each one a one-in-a-million guess even when
+the sequence number is known. It still fits in 12 characters, short enough to read
+out or type in.
+
+Older IDs stay valid: URB + 6 random digits (9 characters), and the all-digit IDs
+with a Damm check digit (10 and 16 characters). Current IDs are never all digits
+with those lengths, so the two kinds of check cannot be confused.
+"""
+import secrets
+import threading
+from collections import deque
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+PREFIX = 'URB'
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+MIN_CHARS = 4
+SECRET_CHARS = 4
+BLOCK_SIZE = 50
+COUNTER_NAME = 'complaint'
+
+_VALUES = {char: value for value, char in enumerate(ALPHABET)}
+# Crockford base32 reads the easily confused letters as the digits they look like
+_TYPOS = str.maketrans('ILO', '110')
+_DAMM_LENGTHS = (7, 13)   # Digits after the prefix in the older check-digited IDs
+
+# Damm quasigroup: the check digit catches every single-digit error and every
+# adjacent transposition, the usual mistakes when an ID is typed in by hand.
+_DAMM_TABLE = (
+    (0, 3, 1, 7, 5, 9, 8, 6, 4, 2),
+    (7, 0, 9, 2, 1, 5, 4, 8, 6, 3),
+    (4, 2, 0, 6, 8, 7, 1, 3, 5, 9),
+    (1, 7, 5, 0, 9, 8, 3, 4, 2, 6),
+    (6, 1, 2, 3, 0, 4, 5, 9, 7, 8),
+    (3, 6, 7, 4, 2, 0, 9, 5, 8, 1),
+    (5, 8, 6, 9, 7, 2, 0, 1, 3, 4),
+    (8, 9, 4, 5, 3, 6, 2, 0, 1, 7),
+    (9, 4, 3, 8, 6, 1, 7, 2, 0, 5),
+    (2, 5, 8, 1, 4, 3, 6, 7, 9, 0),
+)
+
+
+def damm_digit(digits):
+    interim = 0
+    for digit in digits:
+        interim = _DAMM_TABLE[interim][int(digit)]
+    return interim
+
+
+def check_value(chars):
+    """
+    The same scheme over base32, with x*y = 2x + y in GF(32) as the quasigroup: it
+    too catches every single-character error and adjacent transposition. A valid ID
+    (check character included) comes out at 0.
+    """
+    interim = 0
+    for char in chars:
+        interim <<= 1
+        if interim & 32:
+            interim ^= 0b100101    # Reduce by x^5 + x^2 + 1
+        interim ^= _VALUES[char]
+    return interim
+
+
+def encode(number, width):
+    chars = ''
+    while number:
+        number, value = divmod(number, 32)
+        chars = ALPHABET[value] + chars
+    return chars.rjust(width, '0')
+
+
+def format_report_id(number, secret=None):
+    if secret is None:
+        secret = secrets.randbelow(32 ** SECRET_CHARS)
+    chars = encode(number, MIN_CHARS) + encode(secret, SECRET_CHARS)
+    # Appending the check character c zeroes the sum when c = 2 * check_value(chars)
+    check = check_value(chars + '0')
+    return f"{PREFIX}{chars}{ALPHABET[check]}"
+
+
+def normalize(text):
+    """
+    Canonical form of a typed-in report ID (whitespace and dashes dropped, upper case,
+    I, L and O read as 1, 1 and 0 after the prefix).
+    """
+    text = ''.join((text or '').split()).replace('-', '').upper()
+    if text.startswith(PREFIX):
+        text = PREFIX + text[len(PREFIX):].translate(_TYPOS)
+    return text
+
+
+def has_valid_check_digit(report_id):
+    """
+    False only for a check-digited ID whose check character is wrong (i.e. a typo).
+    """
+    chars = report_id[len(PREFIX):]
+    if not report_id.startswith(PREFIX):
+        return True   # Foreign format - nothing to check
+    if chars.isdigit() and len(chars) in _DAMM_LENGTHS:
+        return damm_digit(chars) == 0
+    if len(chars) < MIN_CHARS + SECRET_CHARS + 1 or not all(char in _VALUES for char in chars):
+        return True   # Legacy format - nothing to check
+    return check_value(chars) == 0
+
+
+class ReportIdAllocator:
+    """
+    Hands out report numbers from blocks reserved in the ReportIdCounter table.
+
+    A block reserved outside a transaction is committed at once and shared by every
+    thread in the process. A block reserved inside an open transaction could still be
+    rolled back, and another process would then get the same numbers. So it stays
+    private to that transaction and joins the shared pool only once it commits.
+    """
+
+    def __init__(self, block_size=BLOCK_SIZE, using='default'):
+        self.block_size = block_size
+        self.using = using
+        self._lock = threading.Lock()
+        self._shared = deque()
+        self._local = threading.local()
+        self.blocks_reserved = 0
+
+    def _reserve(self, size=None):
+        from .models import ReportIdCounter
+
+        size = size or self.block_size
+        counter = ReportIdCounter.objects.using(self.using).filter(name=COUNTER_NAME)
+        with transaction.atomic(using=self.using):
+            if not counter.update(next_value=F('next_value') + size):
+                try:
+                    with transaction.atomic(using=self.using):
+                        ReportIdCounter.objects.using(self.using).create(
+                            name=COUNTER_NAME, next_value=1 + size)
+                except IntegrityError:
+                    counter.update(next_value=F('next_value') + size)
+            end = counter.values_list('next_value', flat=True).get()
+        with self._lock:
+            self.blocks_reserved += 1
+        return deque(range(end - size, end))
+
+    def _share(self, numbers):
+        with self._lock:
+            self._shared.extend(numbers)
+
+    def _pending_block(self, connection):
+        """
+        This transaction's private block, or None if there is none (or it was rolled back).
+        """
+        pending = getattr(self._local, 'pending', None)
+        if pending is None:
+            return None
+        # Our on_commit hook is dropped with the (savepoint) rollback that undid the reservation
+        callback, numbers = pending
+        if any(entry[1] is callback for entry in connection.run_on_commit):
+            return numbers
+        self._local.pending = None
+        return None
+
+    def next_number(self):
+        with self._lock:
+            if self._shared:
+                return self._shared.popleft()
+
+        connection = transaction.get_connection(self.using)
+        if not connection.in_atomic_block:
+            numbers = self._reserve()
+            number = numbers.popleft()
+            self._share(numbers)
+            return number
+
+        numbers = self._pending_block(connection)
+        if not numbers:
+            numbers = self._reserve()
+            pending = []
+            callback = partial(self._on_commit, pending)
+            pending.extend((callback, numbers))
+            self._local.pending = pending
+            transaction.on_commit(callback, using=self.using)
+        return numbers.popleft()
+
+    def _on_commit(self, pending):
+        if getattr(self._local, 'pending', None) is pending:
+            self._local.pending = None
+        self._share(pending[1])
+
+    def next_report_id(self):
+        return format_report_id(self.next_number())
+
+    def next_report_ids(self, count):
+        """
+        `count` report IDs for a bulk insert, reserving at most one extra block for them.
+        """
+        if transaction.get_connection(self.using).in_atomic_block:
+            return [self.next_report_id() for _ in range(count)]
+        with self._lock:
+            numbers = [self._shared.popleft() for _ in range(min(count, len(self._shared)))]
+        if len(numbers) < count:
+            block = self._reserve(max(count - len(numbers), self.block_size))
+            while len(numbers) < count:
+                numbers.append(block.popleft())
+            self._share(block)
+        return [format_report_id(number) for number in numbers]
+
+
+allocator = ReportIdAllocator()
+
+
+def next_report_id():
+    return allocator.next_report_id()
+
+
+def next_report_ids(count):
+    return allocator.next_report_ids(count)
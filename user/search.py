@@ -0,0 +1,182 @@
+# user/search.py
+"""
+Full-text search over complaints: report ID, location, description and reporter username.
+
+SQLite uses an FTS5 virtual table keyed by complaint id (rowid); PostgreSQL uses a
+side table holding a weighted tsvector with a GIN index. Both are created by
+migration 0016 and kept in sync by Complaint.save() and its post_delete hook;
+`manage.py rebuild_search_index` repopulates them. On any other database, or an
+SQLite build without FTS5, search falls back to the old icontains filters.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+SQLITE_TABLE = 'user_complaint_fts'
+POSTGRES_TABLE = 'user_complaint_search'
+MAX_QUERY_TERMS = 8
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_enabled = None
+
+
+def is_enabled():
+    """
+    True when the search table for the current database exists.
+    """
+    global _enabled
+    if _enabled is None:
+        table = {'sqlite': SQLITE_TABLE, 'postgresql': POSTGRES_TABLE}.get(connection.vendor)
+        _enabled = bool(table) and table in connection.introspection.table_names()
+    return _enabled
+
+
+def query_terms(text):
+    return [term.lower() for term in _TOKEN_RE.findall(text or '')][:MAX_QUERY_TERMS]
+
+
+def _match_expression(terms):
+    # Every term must match, each as a prefix ("pot" finds "pothole")
+    if connection.vendor == 'sqlite':
+        return ' '.join(f'"{term}"*' for term in terms)
+    return ' & '.join(f"{term}:*" for term in terms)
+
+
+def _match_sql():
+    if connection.vendor == 'sqlite':
+        return f"SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s"
+    return f"SELECT complaint_id FROM {POSTGRES_TABLE} WHERE document @@ to_tsquery('simple', %s)"
+
+
+def complaint_search_q(text):
+    """
+    A Q object restricting a Complaint queryset to matches for `text`.
+    """
+    if not is_enabled():
+        return (
+            Q(report_id__icontains=text) |
+            Q(location__icontains=text) |
+            Q(description__icontains=text) |
+            Q(user__username__icontains=text)
+        )
+    terms = query_terms(text)
+    if not terms:
+        return Q(pk__in=[])
+    return Q(id__in=RawSQL(_match_sql(), [_match_expression(terms)]))
+
+
+def ranked_matches(text, queryset, after=None, before=None, limit=50):
+    """
+    Up to `limit` matches for `text` among `queryset`, as (id, rank) pairs, best
+    first. Lower ranks are better; (rank, id) is the keyset, so pass the last pair of
+    a page as `after` (or the first as `before`) to get the neighbouring page.
+    """
+    terms = query_terms(text)
+    if not terms or not is_enabled():
+        return []
+    if connection.vendor == 'sqlite':
+        matches = (f"SELECT rowid AS id, bm25({SQLITE_TABLE}, 4.0, 2.0, 1.0, 2.0) AS rank "
+                   f"FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s")
+        id_column = 'rowid'
+    else:
+        matches = (f"SELECT complaint_id AS id, -ts_rank_cd(document, query) AS rank "
+                   f"FROM {POSTGRES_TABLE}, to_tsquery('simple', %s) query WHERE document @@ query")
+        id_column = 'complaint_id'
+    # The list's other filters apply inside the ranked query, before the limit
+    filtered_sql, filtered_params = queryset.order_by().values('id').query.sql_with_params()
+    sql = f"SELECT id, rank FROM ({matches} AND {id_column} IN ({filtered_sql})) ranked"
+    params = [_match_expression(terms), *filtered_params]
+    if after is not None or before is not None:
+        rank, pk = after if after is not None else before
+        op = '>' if after is not None else '<'
+        sql += f" WHERE (rank {op} %s OR (rank = %s AND id {op} %s))"
+        params += [rank, rank, pk]
+    direction = 'DESC' if before is not None else 'ASC'
+    sql += f" ORDER BY rank {direction}, id {direction} LIMIT %s"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, limit])
+        rows = cursor.fetchall()
+    return rows[::-1] if before is not None else rows
+
+
+def index_complaint(complaint):
+    """
+    Insert or refresh one complaint's search document.
+    """
+    if not is_enabled():
+        return
+    params = [complaint.pk, complaint.report_id, complaint.location, complaint.description, complaint.user.username]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {SQLITE_TABLE} WHERE rowid = %s", [complaint.pk])
+            cursor.execute(
+                f"INSERT INTO {SQLITE_TABLE} (rowid, report_id, location, description, username) "
+                f"VALUES (%s, %s, %s, %s, %s)", params)
+        else:
+            cursor.execute(
+                f"INSERT INTO {POSTGRES_TABLE} (complaint_id, document) VALUES (%s, "
+                f"setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B') || "
+                f"setweight(to_tsvector('simple', %s), 'C') || setweight(to_tsvector('simple', %s), 'B')) "
+                f"ON CONFLICT (complaint_id) DO UPDATE SET document = EXCLUDED.document", params)
+
+
+def remove_complaint(complaint_id):
+    if not is_enabled():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {SQLITE_TABLE} WHERE rowid = %s", [complaint_id])
+        else:
+            cursor.execute(f"DELETE FROM {POSTGRES_TABLE} WHERE complaint_id = %s", [complaint_id])
+
+
+# Search documents straight from the complaint table (bulk paths)
+_SQLITE_SELECT = (
+    f"INSERT INTO {SQLITE_TABLE} (rowid, report_id, location, description, username) "
+    f"SELECT c.id, c.report_id, c.location, c.description, u.username "
+    f"FROM user_complaint c JOIN auth_user u ON u.id = c.user_id")
+_POSTGRES_SELECT = (
+    f"INSERT INTO {POSTGRES_TABLE} (complaint_id, document) "
+    f"SELECT c.id, setweight(to_tsvector('simple', c.report_id), 'A') || "
+    f"setweight(to_tsvector('simple', c.location), 'B') || "
+    f"setweight(to_tsvector('simple', c.description), 'C') || "
+    f"setweight(to_tsvector('simple', u.username), 'B') "
+    f"FROM user_complaint c JOIN auth_user u ON u.id = c.user_id")
+
+
+def index_complaints(complaint_ids):
+    """
+    Insert or refresh several complaints' search documents in one statement
+    (for bulk-created rows, which skip Complaint.save()).
+    """
+    complaint_ids = list(complaint_ids)
+    if not complaint_ids or not is_enabled():
+        return
+    placeholders = ", ".join(["%s"] * len(complaint_ids))
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({placeholders})", complaint_ids)
+            cursor.execute(f"{_SQLITE_SELECT} WHERE c.id IN ({placeholders})", complaint_ids)
+        else:
+            cursor.execute(
+                f"{_POSTGRES_SELECT} WHERE c.id IN ({placeholders}) "
+                f"ON CONFLICT (complaint_id) DO UPDATE SET document = EXCLUDED.document", complaint_ids)
+
+
+def rebuild_index():
+    """
+    Repopulate the search table from the complaint table in one INSERT ... SELECT.
+    Returns the number of indexed complaints.
+    """
+    if not is_enabled():
+        return 0
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"DELETE FROM {SQLITE_TABLE}")
+            cursor.execute(_SQLITE_SELECT)
+        else:
+            cursor.execute(f"TRUNCATE {POSTGRES_TABLE}")
+            cursor.execute(_POSTGRES_SELECT)
+        return cursor.rowcount
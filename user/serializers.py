@@ -54,10 +54,98 @@ class ComplaintSerializer(serializers.ModelSerializer):
             'location', 
             'description', 
             'photo', 
+            'photo_thumbnail', # Resized renditions, empty until processed
+            'photo_thumbnail_webp',
+            'photo_medium',
+            'photo_medium_webp',
+            'photo_exists', # Cached metadata of the original photo
+            'photo_size',
+            'photo_width',
+            'photo_height',
+            'photo_sha256',
             'latitude', 
             'longitude', 
             'status', 
-            'submitted_at'
+            'submitted_at',
+            'duplicate_of',
         ]
         # user is now a nested object, so it's inherently read-only here
-        read_only_fields = ['status', 'report_id', 'submitted_at']
\ No newline at end of file
+        read_only_fields = [
+            'status', 'report_id', 'submitted_at', 'duplicate_of',
+            'photo_thumbnail', 'photo_thumbnail_webp', 'photo_medium', 'photo_medium_webp',
+            'photo_exists', 'photo_size', 'photo_width', 'photo_height', 'photo_sha256',
+        ]
+
+    def __init__(self, *args, fields=None, omit=None, **kwargs):
+        """
+        `fields` keeps only the named fields, `omit` drops the named ones (sparse fieldsets).
+        """
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in omit or ():
+            self.fields.pop(name, None)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # The original still carries its EXIF until the photo pipeline has cleaned it
+        if 'photo' in data and not instance.photo_processed_at:
+            data['photo'] = None
+        return data
+
+    # --- Fast read path: the same output as to_representation(), from .values() rows ---
+    def values_columns(self):
+        """
+        Columns to select with .values() for the current fields.
+        """
+        columns = {'id'}
+        for name, field in self.fields.items():
+            if name == 'user':
+                continue   # Always the requesting user (the list is filtered by owner)
+            elif name == 'category_display':
+                columns.add('category')
+            elif name == 'duplicate_of':
+                columns.add('duplicate_of_id')
+            elif name == 'photo':
+                columns |= {'photo', 'photo_processed_at'}
+            else:
+                columns.add(field.source)
+        return columns
+
+    def represent_rows(self, rows):
+        """
+        Serialize .values() rows of the requesting user's own complaints.
+        """
+        request = self.context.get('request')
+        categories = dict(Complaint.CATEGORY_CHOICES)
+        owner = BasicUserSerializer(request.user).data if 'user' in self.fields else None
+
+        def file_url(name, storage):
+            if not name:
+                return None
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request else url
+
+        def plain(value, field):
+            return None if value is None else field.to_representation(value)
+
+        converters = []
+        for name, field in self.fields.items():
+            if name == 'user':
+                converters.append((name, lambda row: owner))
+            elif name == 'category_display':
+                converters.append((name, lambda row: categories.get(row['category'], row['category'])))
+            elif name == 'duplicate_of':
+                converters.append((name, lambda row: row['duplicate_of_id']))
+            elif name == 'photo':
+                storage = Complaint._meta.get_field('photo').storage
+                converters.append((name, lambda row, storage=storage:
+                                   file_url(row['photo'], storage) if row['photo_processed_at'] else None))
+            elif isinstance(field, serializers.FileField):
+                storage = Complaint._meta.get_field(field.source).storage
+                converters.append((name, lambda row, source=field.source, storage=storage: file_url(row[source], storage)))
+            else:
+                converters.append((name, lambda row, source=field.source, field=field: plain(row[source], field)))
+        return [{name: convert(row) for name, convert in converters} for row in rows]
+
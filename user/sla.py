@@ -0,0 +1,227 @@
+# user/sla.py
+"""
+Complaint event log and running SLA metrics.
+
+Every status or assignment transition appends a ComplaintEvent row in the transaction
+that makes it (Complaint.save(), the bulk paths and the delete hook all call record()).
+The same call folds the transition into the ComplaintSlaBucket aggregates:
+
+- time to assign: submission -> first assignment, credited to that contractor;
+- time to resolve: submission -> first resolution, credited to the assignee at the time;
+- reassignments: a complaint taken away from a contractor (reassigned or unassigned).
+
+Durations are counted in log-spaced buckets, each GAMMA times wider than the last.
+p50/p90 therefore come from a few rows, accurate to about ±11%, and buckets simply add
+up across categories and contractors. `manage.py rebuild_sla_metrics` replays the log.
+"""
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+GAMMA = 1.25
+_LOG_GAMMA = math.log(GAMMA)
+
+
+def bucket_for(seconds):
+    """
+    Bucket i holds durations in (GAMMA**(i-1), GAMMA**i] seconds; bucket 0 is up to a second.
+    """
+    return 0 if seconds <= 1 else math.ceil(math.log(seconds) / _LOG_GAMMA)
+
+
+def bucket_value(bucket):
+    """
+    Representative duration of a bucket (its relative-error midpoint), in seconds.
+    """
+    if bucket <= 0:
+        return 0.0
+    return 2 * GAMMA ** bucket / (GAMMA + 1)
+
+
+def transition_events(pk, old, new, ts):
+    """
+    Unsaved ComplaintEvent rows for a complaint going from `old` to `new` values
+    (old is None for a new complaint, new is None for a deleted one).
+    """
+    from .models import ComplaintEvent
+
+    values = new or old
+    category = ComplaintEvent.CATEGORY_CODES.get(values['category'], 0)
+
+    def event(kind, status, contractor_id):
+        return ComplaintEvent(complaint_id=pk, ts=ts, kind=kind, category=category,
+                              status=ComplaintEvent.STATUS_CODES.get(status, 0), contractor_id=contractor_id)
+
+    if new is None:
+        return [event(ComplaintEvent.DELETED, old['status'], old['assigned_to_id'])]
+    events = []
+    if old is None:
+        submitted = event(ComplaintEvent.SUBMITTED, new['status'], None)
+        submitted.ts = new['submitted_at'] or ts    # Replays then measure from the same instant
+        events.append(submitted)
+    old_contractor = old['assigned_to_id'] if old else None
+    if new['assigned_to_id'] != old_contractor:
+        if new['assigned_to_id'] is None:
+            events.append(event(ComplaintEvent.UNASSIGNED, new['status'], old_contractor))
+        elif old_contractor is None:
+            events.append(event(ComplaintEvent.ASSIGNED, new['status'], new['assigned_to_id']))
+        else:
+            events.append(event(ComplaintEvent.REASSIGNED, new['status'], new['assigned_to_id']))
+    if old is not None and old['status'] != new['status']:
+        events.append(event(ComplaintEvent.STATUS_CHANGED, new['status'], new['assigned_to_id']))
+    return events
+
+
+def observe(state, event):
+    """
+    SLA observations [(metric, category, contractor_id, seconds)] for one event, in
+    log order. `state` is the complaint's running state (submitted, contractor,
+    assigned, resolved) and is updated in place.
+    """
+    from .models import ComplaintEvent as E, ComplaintSlaBucket as B
+
+    if event.kind == E.SUBMITTED:
+        state['submitted'] = event.ts
+    category = E.CATEGORY_KEYS.get(event.category, 'other')
+    elapsed = max((event.ts - state['submitted']).total_seconds(), 0.0) if state.get('submitted') else None
+    observations = []
+
+    if event.kind in (E.REASSIGNED, E.UNASSIGNED) and state.get('contractor'):
+        observations.append((B.REASSIGNMENTS, category, state['contractor'], 0.0))
+    if event.kind == E.ASSIGNED and not state.get('assigned') and elapsed is not None:
+        observations.append((B.TIME_TO_ASSIGN, category, event.contractor_id, elapsed))
+    if event.kind in (E.ASSIGNED, E.REASSIGNED):
+        state['assigned'] = True
+    if (event.kind == E.STATUS_CHANGED and event.status == E.STATUS_CODES['resolved']
+            and not state.get('resolved') and elapsed is not None):
+        observations.append((B.TIME_TO_RESOLVE, category, event.contractor_id or 0, elapsed))
+        state['resolved'] = True
+    state['contractor'] = None if event.kind in (E.UNASSIGNED, E.DELETED) else event.contractor_id
+    return observations
+
+
+def _add(buckets, observations):
+    for metric, category, contractor_id, seconds in observations:
+        entry = buckets[(metric, category, contractor_id or 0, bucket_for(seconds))]
+        entry[0] += 1
+        entry[1] += seconds
+
+
+def record(changes, ts=None):
+    """
+    Append the events for `changes` ([(pk, old values, new values)], as for
+    transition_events) and add them to the SLA buckets. Must be called inside the
+    transaction that made the changes.
+    """
+    from .models import ComplaintEvent, ComplaintSlaBucket
+
+    ts = ts or timezone.now()
+    by_complaint = []
+    for pk, old, new in changes:
+        events = transition_events(pk, old, new, ts)
+        if events:
+            by_complaint.append((pk, old, new, events))
+    if not by_complaint:
+        return
+
+    # "First" assignment / resolution: look for earlier ones in the log (complaint_event_idx)
+    could_be_first = [
+        pk for pk, old, new, events in by_complaint
+        if old is not None and any(e.kind in (ComplaintEvent.ASSIGNED, ComplaintEvent.STATUS_CHANGED) for e in events)
+    ]
+    earlier = defaultdict(set)
+    if could_be_first:
+        for pk, kind in ComplaintEvent.objects.filter(complaint_id__in=could_be_first).filter(
+                Q(kind=ComplaintEvent.ASSIGNED)
+                | Q(kind=ComplaintEvent.STATUS_CHANGED, status=ComplaintEvent.STATUS_CODES['resolved'])
+        ).values_list('complaint_id', 'kind'):
+            earlier[pk].add('assigned' if kind == ComplaintEvent.ASSIGNED else 'resolved')
+
+    buckets = defaultdict(lambda: [0, 0.0])
+    for pk, old, new, events in by_complaint:
+        values = old or new
+        state = {
+            'submitted': values['submitted_at'],
+            'contractor': old['assigned_to_id'] if old else None,
+            'assigned': 'assigned' in earlier[pk],
+            'resolved': 'resolved' in earlier[pk],
+        }
+        for event in events:
+            _add(buckets, observe(state, event))
+
+    ComplaintEvent.objects.bulk_create([event for *_, events in by_complaint for event in events])
+    ComplaintSlaBucket.apply_changes(buckets)
+
+
+def aggregate(events):
+    """
+    SLA buckets ({(metric, category, contractor_id, bucket): [count, seconds]}) for a
+    whole log, given its events ordered by complaint, ts and id.
+    """
+    buckets = defaultdict(lambda: [0, 0.0])
+    complaint_id, state = None, {}
+    for event in events:
+        if event.complaint_id != complaint_id:
+            complaint_id, state = event.complaint_id, {}
+        _add(buckets, observe(state, event))
+    return buckets
+
+
+def summaries(metric, by, **filters):
+    """
+    {group: {'count', 'mean', 'p50', 'p90'}} (durations in seconds) for a metric,
+    grouped by 'category' or 'contractor_id', read from the precomputed buckets.
+    """
+    from .models import ComplaintSlaBucket
+
+    rows = ComplaintSlaBucket.objects.filter(metric=metric, **filters) \
+        .values(by, 'bucket').annotate(n=Sum('count'), seconds=Sum('total_seconds')) \
+        .filter(n__gt=0).order_by(by, 'bucket')
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[row[by]].append((row['bucket'], row['n'], row['seconds']))
+
+    result = {}
+    for group, buckets in grouped.items():
+        count = sum(n for _, n, _ in buckets)
+        result[group] = {
+            'count': count,
+            'mean': sum(seconds for _, _, seconds in buckets) / count,
+            'p50': _quantile(buckets, count, 0.5),
+            'p90': _quantile(buckets, count, 0.9),
+        }
+    return result
+
+
+def _quantile(buckets, count, q):
+    rank = q * (count - 1)
+    seen = 0
+    for bucket, n, _ in buckets:
+        seen += n
+        if seen > rank:
+            return bucket_value(bucket)
+    return bucket_value(buckets[-1][0])
+
+
+def rebuild(event_model=None, bucket_model=None):
+    """
+    Recompute every SLA bucket by replaying the event log. Returns the bucket count.
+    The models can be passed in for use from a data migration.
+    """
+    from .models import ComplaintEvent, ComplaintSlaBucket
+
+    event_model = event_model or ComplaintEvent
+    bucket_model = bucket_model or ComplaintSlaBucket
+    events = event_model.objects.order_by('complaint_id', 'ts', 'id').iterator(chunk_size=5000)
+    rows = [
+        bucket_model(metric=metric, category=category, contractor_id=contractor_id, bucket=bucket,
+                     count=count, total_seconds=seconds)
+        for (metric, category, contractor_id, bucket), (count, seconds) in aggregate(events).items()
+    ]
+    with transaction.atomic():
+        bucket_model.objects.all().delete()
+        bucket_model.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -1,3 +1,630 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import timedelta
+from importlib import import_module, reload
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import clear_url_caches, resolve
+from django.utils import timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import assignment, clusters, live, photos, report_ids, sla
+from .duplicates import DuplicateIndex, duplicate_index
+from .models import Complaint, ComplaintRollup, ComplaintSlaBucket, Contractor
+from .serializers import ComplaintSerializer
+from .views import ComplaintViewSet
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+# Never the on-disk cache of settings.CACHES: tests clear it
+@override_settings(CACHES=TEST_CACHES)
+class ComplaintTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.citizen = User.objects.create_user('citizen', 'citizen@example.com', 'pw')
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.citizen)
+
+    def create_complaint(self, **fields):
+        defaults = {'user': self.citizen, 'category': 'road', 'location': 'Main Street',
+                    'description': 'Deep pothole in the left lane', 'latitude': 12.9716, 'longitude': 77.5946}
+        return Complaint.objects.create(**{**defaults, **fields})
+
+
+class DerivedDataConsistencyTests(ComplaintTestCase):
+    def rollups(self):
+        return sorted(ComplaintRollup.objects.filter(total__gt=0).values_list('day', 'category', 'status', 'is_assigned', 'total'))
+
+    def counters(self):
+        return sorted(Contractor.objects.values_list('id', *Contractor.WORKLOAD_FIELDS))
+
+    def test_rollups_and_counters_match_a_rebuild(self):
+        roads = Contractor.objects.create(name='Roads Ltd', email='roads@example.com', password='pw', specialization='road')
+        water = Contractor.objects.create(name='Water Co', email='water@example.com', password='pw', specialization='water')
+        complaints = [self.create_complaint(category=category) for category in ('road', 'road', 'water', 'garbage')]
+        batch = Complaint.bulk_create_reports([
+            Complaint(user=self.citizen, category='road', location='Elm Road', description='Crack', assigned_to=roads)
+            for _ in range(3)])
+
+        complaints[0].assigned_to = roads
+        complaints[0].status = 'in_progress'
+        complaints[0].save()
+        complaints[3].status = 'rejected'
+        complaints[3].save()
+        Complaint.bulk_assign(Complaint.objects.filter(pk__in=[complaints[1].pk, complaints[2].pk]), water.pk)
+        Complaint.bulk_assign(Complaint.objects.filter(pk=complaints[1].pk), roads.pk)
+        Complaint.bulk_set_status(Complaint.objects.filter(pk__in=[c.pk for c in batch[:2]]), 'resolved')
+        Complaint.bulk_unassign(Complaint.objects.filter(pk=batch[2].pk))
+        complaints[2].refresh_from_db()    # Changed behind its back by bulk_assign
+        complaints[2].delete()
+
+        rollups, counters = self.rollups(), self.counters()
+        self.assertEqual(sum(row[-1] for row in rollups), Complaint.objects.count())
+        ComplaintRollup.rebuild()
+        self.assertEqual(self.rollups(), rollups)
+        self.assertEqual(Contractor.reconcile_workload(), 0)
+        self.assertEqual(self.counters(), counters)
+        self.assertEqual(counters, sorted([(roads.pk, 2, 2, 0), (water.pk, 0, 0, 0)]))
+
+
+class SlaMetricTests(ComplaintTestCase):
+    def buckets(self):
+        return sorted(ComplaintSlaBucket.objects.values_list(
+            'metric', 'category', 'contractor_id', 'bucket', 'count', 'total_seconds'))
+
+    def test_quantiles_are_within_the_bucket_error(self):
+        start = timezone.now() - timedelta(days=30)
+        durations = [60 * 1.37 ** i for i in range(40)]    # A minute to about 17 days
+        for pk, seconds in enumerate(durations, 1):
+            pending = {'category': 'road', 'status': 'pending', 'assigned_to_id': None, 'submitted_at': start}
+            sla.record([(pk, None, pending)], ts=start)
+            sla.record([(pk, pending, {**pending, 'status': 'resolved'})], ts=start + timedelta(seconds=seconds))
+
+        summary = sla.summaries(ComplaintSlaBucket.TIME_TO_RESOLVE, 'category')['road']
+        self.assertEqual(summary['count'], len(durations))
+        self.assertAlmostEqual(summary['mean'], sum(durations) / len(durations), places=3)
+        bound = (sla.GAMMA - 1) / (sla.GAMMA + 1)    # About 11%
+        for key, q in (('p50', 0.5), ('p90', 0.9)):
+            exact = sorted(durations)[int(q * (len(durations) - 1))]
+            self.assertLessEqual(abs(summary[key] - exact) / exact, bound + 1e-9, key)
+
+    def test_replays_match_the_running_buckets(self):
+        roads = Contractor.objects.create(name='Roads Ltd', email='roads@example.com', password='pw', specialization='road')
+        water = Contractor.objects.create(name='Water Co', email='water@example.com', password='pw', specialization='water')
+        complaints = [self.create_complaint(category=category) for category in ('road', 'road', 'water')]
+        complaints[0].assigned_to = roads
+        complaints[0].save()
+        complaints[0].status = 'resolved'
+        complaints[0].save()
+        Complaint.bulk_assign(Complaint.objects.filter(pk__in=[complaints[1].pk, complaints[2].pk]), water.pk)
+        Complaint.bulk_assign(Complaint.objects.filter(pk=complaints[1].pk), roads.pk)
+        Complaint.bulk_set_status(Complaint.objects.filter(pk=complaints[1].pk), 'resolved')
+
+        running = self.buckets()
+        self.assertEqual({row[0] for row in running}, {ComplaintSlaBucket.TIME_TO_ASSIGN,
+                                                       ComplaintSlaBucket.TIME_TO_RESOLVE, ComplaintSlaBucket.REASSIGNMENTS})
+        sla.rebuild()
+        self.assertEqual(self.buckets(), running)
+        # The migration's frozen copy of the replay still agrees with sla.py
+        import_module('user.migrations.0027_complaint_event_log').replay_sla_buckets(apps)
+        self.assertEqual(self.buckets(), running)
+
+
+class DuplicateDetectionTests(ComplaintTestCase):
+    def setUp(self):
+        super().setUp()
+        self.index = DuplicateIndex()
+
+    def find(self, description='Pothole in the left lane, very deep', category='road'):
+        return self.index.find_duplicate(category, 12.97162, 77.59461, description)
+
+    def test_links_a_nearby_similar_report(self):
+        original = self.create_complaint()
+        self.index.warm()
+        self.assertEqual(self.find(), original.pk)
+        self.assertIsNone(self.find(category='water'))
+        self.assertIsNone(self.find(description='Garbage not collected for a week'))
+
+    def test_api_links_duplicates_at_submission(self):
+        duplicate_index._synced_at = None
+        payload = {'category': 'road', 'location': 'Main Street', 'description': 'Deep pothole in the left lane',
+                   'latitude': '12.9716', 'longitude': '77.5946'}
+        self.assertEqual(self.api.post('/api/complaints/', payload, format='json').status_code, 201)
+        self.assertEqual(self.api.post('/api/complaints/', payload, format='json').status_code, 201)
+        first, second = Complaint.objects.order_by('id')
+        self.assertIsNone(first.duplicate_of_id)
+        self.assertEqual(second.duplicate_of_id, first.pk)
+
+    def test_resolved_complaints_are_evicted(self):
+        original = self.create_complaint()
+        duplicate_index.warm()
+        self.index.warm()
+        self.assertIn(original.pk, duplicate_index._cell_of)
+        original.status = 'resolved'
+        with self.captureOnCommitCallbacks(execute=True):
+            original.save()
+        # Dropped in the process that made the change ...
+        self.assertNotIn(original.pk, duplicate_index._cell_of)
+        # ... and by the updated_at refresh everywhere else
+        self.assertIsNone(self.find())
+        self.assertNotIn(original.pk, self.index._cell_of)
+
+    def test_refresh_sees_rows_committed_late(self):
+        self.index.warm()
+        # Written before the index was loaded, but committed after
+        late = self.create_complaint()
+        Complaint.objects.filter(pk=late.pk).update(updated_at=self.index._synced_at - timedelta(seconds=10))
+        self.assertEqual(self.find(), late.pk)
+
+
+def jpeg_with_gps(orientation=1):
+    image = Image.new('RGB', (40, 20), 'red')
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    exif[0x010F] = 'PhoneMaker'
+    exif.get_ifd(0x8825)[2] = (12.0, 58.0, 17.0)     # GPSLatitude
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+class PhotoMetadataTests(ComplaintTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def stored_image(self, complaint):
+        with complaint.photo.open('rb') as file:
+            image = Image.open(io.BytesIO(file.read()))
+        return image
+
+    def test_original_is_served_only_once_cleaned(self):
+        photo = SimpleUploadedFile('leak.jpg', jpeg_with_gps(orientation=6), content_type='image/jpeg')
+        response = self.api.post('/api/complaints/', {
+            'category': 'water', 'location': 'Main Street', 'description': 'Leak',
+            'latitude': '12.9716', 'longitude': '77.5946', 'photo': photo,
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        complaint = Complaint.objects.get()
+        self.assertIsNone(response.data['photo'])
+        self.assertIsNone(self.api.get(f'/api/complaints/{complaint.pk}/').data['photo'])
+        self.assertIsNone(self.api.get('/api/complaints/').data['results'][0]['photo'])
+
+        self.assertTrue(photos.process_photo(complaint.pk))
+        complaint.refresh_from_db()
+        image = self.stored_image(complaint)
+        self.assertFalse(image.getexif())
+        self.assertEqual(image.size, (20, 40))    # Orientation applied to the pixels
+        with complaint.photo.open('rb') as file:
+            self.assertEqual(photos.read_metadata(file)['photo_sha256'], complaint.photo_sha256)
+        self.assertTrue(self.api.get(f'/api/complaints/{complaint.pk}/').data['photo'].endswith(complaint.photo.url))
+        self.assertTrue(self.api.get('/api/complaints/').data['results'][0]['photo'].endswith(complaint.photo.url))
+
+    def test_processing_cleans_an_original_stored_with_exif(self):
+        complaint = self.create_complaint()
+        name = complaint.photo.storage.save('complaint_photos/old.jpg', ContentFile(jpeg_with_gps()))
+        Complaint.objects.filter(pk=complaint.pk).update(photo=name)
+        self.assertTrue(photos.process_photo(complaint.pk))
+        complaint.refresh_from_db()
+        self.assertFalse(self.stored_image(complaint).getexif())
+        self.assertTrue(complaint.photo_medium)
+        with complaint.photo.open('rb') as file:
+            self.assertEqual(photos.read_metadata(file)['photo_sha256'], complaint.photo_sha256)
+
+
+class ConditionalGetTests(ComplaintTestCase):
+    def assertNotModified(self, path, etag):
+        self.assertEqual(self.api.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def etag(self, path):
+        response = self.api.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_list_and_detail_change_after_writes(self):
+        complaint = self.create_complaint()
+        detail = f'/api/complaints/{complaint.pk}/'
+        list_etag, detail_etag = self.etag('/api/complaints/'), self.etag(detail)
+        self.assertNotModified('/api/complaints/', list_etag)
+        self.assertNotModified(detail, detail_etag)
+
+        response = self.api.patch(detail, {'location': 'High Street'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(self.etag('/api/complaints/'), list_etag)
+        self.assertNotEqual(self.etag(detail), detail_etag)
+
+        list_etag = self.etag('/api/complaints/')
+        self.create_complaint()
+        self.assertNotEqual(self.etag('/api/complaints/'), list_etag)
+
+    def test_photo_verification_changes_the_etag_only_when_metadata_changes(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media_root):
+            complaint = self.create_complaint()
+            name = complaint.photo.storage.save('complaint_photos/pothole.jpg', ContentFile(jpeg_with_gps()))
+            Complaint.objects.filter(pk=complaint.pk).update(photo=name)
+            detail = f'/api/complaints/{complaint.pk}/'
+            call_command('verify_complaint_photos', max_age_hours=0, stdout=io.StringIO())
+            list_etag, detail_etag = self.etag('/api/complaints/'), self.etag(detail)
+
+            # Nothing changed on disk: clients keep their copies
+            call_command('verify_complaint_photos', max_age_hours=0, stdout=io.StringIO())
+            self.assertNotModified('/api/complaints/', list_etag)
+            self.assertNotModified(detail, detail_etag)
+
+            complaint.photo.storage.delete(name)
+            call_command('verify_complaint_photos', max_age_hours=0, stdout=io.StringIO())
+            self.assertEqual(self.api.get('/api/complaints/', HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+            response = self.api.get(detail, HTTP_IF_NONE_MATCH=detail_etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.json()['photo_exists'])
+
+
+class SparseFieldsetTests(ComplaintTestCase):
+    def results(self, query=''):
+        response = self.api.get('/api/complaints/?' + query)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_fields_and_omit(self):
+        complaint = self.create_complaint()
+        self.assertEqual(self.results('fields=id,status'), [{'id': complaint.pk, 'status': 'pending'}])
+        detail = self.api.get(f'/api/complaints/{complaint.pk}/?fields=report_id,user').json()
+        self.assertEqual(detail, {'report_id': complaint.report_id,
+                                  'user': {'id': self.citizen.pk, 'username': 'citizen', 'email': 'citizen@example.com'}})
+        result, = self.results('omit=user,description')
+        self.assertFalse({'user', 'description'} & set(result))
+        self.assertEqual(set(result), set(ComplaintSerializer.Meta.fields) - {'user', 'description'})
+
+    def test_unknown_fields_are_a_bad_request(self):
+        complaint = self.create_complaint()
+        for path in ('/api/complaints/', f'/api/complaints/{complaint.pk}/'):
+            for query in ('fields=id,secret', 'omit=password'):
+                response = self.api.get(f'{path}?{query}')
+                self.assertEqual(response.status_code, 400, query)
+                self.assertIn(query.split('=')[0], response.json())
+
+    def test_list_fast_path_matches_the_serializer(self):
+        original = self.create_complaint()
+        duplicate = self.create_complaint(duplicate_of=original, category='water', latitude=None, longitude=None)
+        photographed = self.create_complaint(description='Leak')
+        Complaint.objects.filter(pk=photographed.pk).update(
+            photo='complaint_photos/leak.jpg', photo_thumbnail='complaint_photos/renditions/leak_thumb.jpg',
+            photo_processed_at=timezone.now(), photo_exists=True, photo_size=2048, photo_width=20, photo_height=40)
+        unprocessed = self.create_complaint()
+        Complaint.objects.filter(pk=unprocessed.pk).update(photo='complaint_photos/raw.jpg')
+
+        request = Request(APIRequestFactory().get('/api/complaints/'))
+        request.user = self.citizen
+        instances = Complaint.objects.filter(user=self.citizen).order_by('-submitted_at', '-id')
+        expected = JSONRenderer().render(ComplaintSerializer(instances, many=True, context={'request': request}).data)
+        self.assertEqual(self.results(), json.loads(expected))
+        self.assertEqual([result['id'] for result in self.results()],
+                         [unprocessed.pk, photographed.pk, duplicate.pk, original.pk])
+
+
+class GeoQueryTests(ComplaintTestCase):
+    def query(self, **params):
+        response = self.api.get('/api/map/complaints/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_bbox_returns_only_the_complaints_inside(self):
+        inside = self.create_complaint(latitude=12.9716, longitude=77.5946)
+        edge = self.create_complaint(latitude=12.99, longitude=77.6)
+        self.create_complaint(latitude=13.2, longitude=77.5946)
+        self.create_complaint(latitude=12.9716, longitude=78.1)
+        self.create_complaint(latitude=None, longitude=None)
+        data = self.query(bbox='77.5,12.9,77.6,12.99')
+        self.assertEqual(sorted(row['id'] for row in data['results']), [inside.pk, edge.pk])
+        self.assertEqual(self.query(bbox='77.5,12.9,77.6,12.99', category='water')['count'], 0)
+
+    def test_radius_returns_the_nearest_first(self):
+        here = (12.9716, 77.5946)
+        far = self.create_complaint(latitude=12.98, longitude=77.5946)     # About 930 m north
+        near = self.create_complaint(latitude=12.972, longitude=77.5946)   # About 45 m north
+        self.create_complaint(latitude=12.99, longitude=77.5946)           # About 2 km north
+        data = self.query(lat=here[0], lng=here[1], radius=1000)
+        self.assertEqual([row['id'] for row in data['results']], [near.pk, far.pk])
+        self.assertAlmostEqual(data['results'][1]['distance_m'], 934, delta=5)
+        self.assertEqual([row['id'] for row in self.query(lat=here[0], lng=here[1], radius=1000, limit=1)['results']],
+                         [near.pk])
+
+    def test_bad_queries_are_refused(self):
+        for params in ({}, {'bbox': '1,2,3'}, {'bbox': '10,0,-10,5'}, {'lat': 95, 'lng': 0, 'radius': 10},
+                       {'lat': 0, 'lng': 0, 'radius': 10 ** 6}):
+            self.assertEqual(self.api.get('/api/map/complaints/', params).status_code, 400, params)
+
+
+class ClusterTests(ComplaintTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def clusters(self, latitude, longitude, zoom):
+        return clusters.clusters_for_tile(zoom, *clusters.tile_for(latitude, longitude, zoom))
+
+    def test_tiles_aggregate_their_complaints(self):
+        for status in ('pending', 'pending', 'resolved'):
+            self.create_complaint(status=status)
+        self.create_complaint(latitude=-33.86, longitude=151.2)
+        cluster, = self.clusters(12.9716, 77.5946, 10)
+        self.assertEqual((cluster['count'], cluster['statuses']), (3, {'pending': 2, 'resolved': 1}))
+        self.assertEqual((cluster['lat'], cluster['lng']), (12.9716, 77.5946))
+
+    def test_a_point_on_a_tile_edge_is_counted_once(self):
+        # At zoom 1 longitude 0 is the edge between tiles x=0 and x=1; tile_for() puts it in x=1
+        self.create_complaint(latitude=10, longitude=0)
+        counts = {x: sum(cluster['count'] for cluster in clusters.clusters_for_tile(1, x, 0)) for x in (0, 1)}
+        self.assertEqual(counts, {0: 0, 1: 1})
+
+    def test_moving_a_complaint_clears_its_tiles(self):
+        complaint = self.create_complaint()
+        self.assertEqual(len(self.clusters(12.9716, 77.5946, 12)), 1)
+        self.assertEqual(self.clusters(-33.86, 151.2, 12), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            complaint.latitude, complaint.longitude = -33.86, 151.2
+            complaint.save()
+        self.assertEqual(self.clusters(12.9716, 77.5946, 12), [])
+        self.assertEqual(len(self.clusters(-33.86, 151.2, 12)), 1)
+
+
+class LiveUpdateTests(ComplaintTestCase):
+    @contextmanager
+    def subscribed(self, channels):
+        """
+        Queues of an in-process broker subscription, drained into a list by received().
+        """
+        broker, loop = live.InProcessBroker(), asyncio.new_event_loop()
+        subscription = broker.subscribe(channels)
+        queue = loop.run_until_complete(subscription.__aenter__())
+
+        def received():
+            loop.run_until_complete(asyncio.sleep(0))    # Run the callbacks publish() scheduled
+            messages = []
+            while not queue.empty():
+                messages.append(queue.get_nowait())
+            return messages
+
+        try:
+            with mock.patch.object(live, 'broker', return_value=broker):
+                yield received
+        finally:
+            loop.run_until_complete(subscription.__aexit__(None, None, None))
+            loop.close()
+
+    def test_changes_are_published_once_committed(self):
+        contractor = Contractor.objects.create(name='Roads Ltd', email='roads@example.com', password='pw',
+                                               specialization='road')
+        complaint = self.create_complaint()
+        with self.subscribed([f'complaint:{complaint.report_id}', 'admin', f'contractor:{contractor.pk}']) as received:
+            with self.captureOnCommitCallbacks(execute=True):
+                complaint.assigned_to = contractor
+                complaint.save()
+                self.assertEqual(received(), [])    # Nothing before the commit
+            message = {'report_id': complaint.report_id, 'status': 'pending', 'status_display': 'Pending',
+                       'assigned_to_id': contractor.pk, 'created': False}
+            # One queue per subscription: once per channel it was published on
+            self.assertEqual(received(), [message] * 3)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                Complaint.bulk_set_status(Complaint.objects.filter(pk=complaint.pk), 'resolved')
+            self.assertEqual({(m['status'], m['status_display']) for m in received()}, {('resolved', 'Resolved')})
+
+            with self.captureOnCommitCallbacks(execute=True):
+                complaint.refresh_from_db()
+                complaint.description = 'Deeper pothole'
+                complaint.save()
+            self.assertEqual(received(), [])    # Neither status nor assignment changed
+
+
+class AsyncApiTests(ComplaintTestCase):
+    def setUp(self):
+        super().setUp()
+        self.complaints = [self.create_complaint(), self.create_complaint(category='water')]
+        self.detail = f'/api/complaints/{self.complaints[0].pk}/'
+        # The sync views' answers, for comparison
+        self.expected = {path: self.api.get(path).json() for path in ('/api/complaints/', self.detail)}
+
+        # URLconfs pick their views from ASYNC_VIEWS when imported
+        def reload_urls():
+            clear_url_caches()
+            for name in ('user.urls', settings.ROOT_URLCONF):
+                reload(import_module(name))
+
+        override = override_settings(ASYNC_VIEWS=True)
+        override.enable()
+        self.addCleanup(reload_urls)
+        self.addCleanup(override.disable)
+        reload_urls()
+        self.bearer = {'Authorization': f'Bearer {RefreshToken.for_user(self.citizen).access_token}'}
+
+    def get(self, path, client=None, **headers):
+        return async_to_sync((client or AsyncClient()).get)(path, headers=headers)
+
+    def test_routes_are_async(self):
+        self.assertTrue(iscoroutinefunction(resolve('/api/complaints/').func))
+        self.assertTrue(iscoroutinefunction(resolve(self.detail).func))
+
+    def test_session_and_token_clients_get_the_same_answers(self):
+        session = AsyncClient()
+        session.force_login(self.citizen)
+        for path, expected in self.expected.items():
+            for client, headers in ((session, {}), (None, self.bearer)):
+                response = self.get(path, client, **headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), expected)
+                self.assertEqual(self.get(path, client, **headers, If_None_Match=response['ETag']).status_code, 304)
+
+    def test_polls_see_changes(self):
+        etag = self.get('/api/complaints/', **self.bearer)['ETag']
+        detail_etag = self.get(self.detail, **self.bearer)['ETag']
+        Complaint.objects.filter(pk=self.complaints[0].pk).update(location='High Street', updated_at=timezone.now())
+        self.create_complaint()
+        self.assertEqual(self.get('/api/complaints/', **self.bearer, If_None_Match=etag).status_code, 200)
+        response = self.get(self.detail, **self.bearer, If_None_Match=detail_etag)
+        self.assertEqual((response.status_code, response.json()['location']), (200, 'High Street'))
+
+    def test_errors_match_the_sync_views(self):
+        other = User.objects.create_user('other', 'other@example.com', 'pw')
+        foreign = self.create_complaint(user=other)
+        self.assertEqual(self.get('/api/complaints/').status_code, 403)
+        self.assertEqual(self.get('/api/complaints/', Authorization='Bearer not-a-token').status_code, 403)
+        self.assertEqual(self.get(f'/api/complaints/{foreign.pk}/', **self.bearer).status_code, 404)
+        self.assertEqual(self.get('/api/complaints/abc/', **self.bearer).status_code, 404)
+        response = self.get('/api/complaints/?fields=id,secret', **self.bearer)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.json())
+
+    def test_writes_still_run_the_sync_view(self):
+        response = async_to_sync(AsyncClient().post)('/api/complaints/', {
+            'category': 'road', 'location': 'Elm Road', 'description': 'Pothole',
+            'latitude': '12.9716', 'longitude': '77.5946'}, content_type='application/json', headers=self.bearer)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Complaint.objects.filter(user=self.citizen).count(), 3)
+
+
+class AssignmentTests(ComplaintTestCase):
+    def engine(self, local_load, outside_load, max_open=None):
+        contractors = [(1, 'road', 'Koramangala'), (2, 'road', 'Indiranagar'), (3, 'water', 'Koramangala')]
+        return assignment.AssignmentEngine(contractors, {1: local_load, 2: outside_load}, max_open)
+
+    def test_local_contractor_wins_until_much_busier(self):
+        self.assertEqual(self.engine(0, 0).choose('road', 'Koramangala 5th Block'), 1)
+        self.assertEqual(self.engine(assignment.AREA_PREFERENCE, 1).choose('road', 'Koramangala 5th Block'), 1)
+        self.assertEqual(self.engine(assignment.AREA_PREFERENCE + 1, 0).choose('road', 'Koramangala 5th Block'), 2)
+        self.assertIsNone(self.engine(0, 0).choose('garbage', 'Koramangala'))
+
+    def test_batch_spreads_the_load(self):
+        engine = self.engine(0, 0)
+        chosen = [engine.choose('road', 'Koramangala') for _ in range(2 * assignment.AREA_PREFERENCE + 2)]
+        # The local contractor keeps its head start (ties go local) and no more
+        self.assertEqual(chosen.count(1) - chosen.count(2), assignment.AREA_PREFERENCE + 1)
+
+    def test_max_open_caps_every_contractor(self):
+        engine = self.engine(2, 3, max_open=3)
+        self.assertEqual([engine.choose('road', 'Koramangala') for _ in range(3)], [1, None, None])
+
+    def test_submission_assigns_but_leaves_the_complaint_pending(self):
+        contractor = Contractor.objects.create(name='Roads Ltd', email='roads@example.com', password='pw',
+                                               specialization='road', area_assigned='Main Street')
+        response = self.api.post('/api/complaints/', {
+            'category': 'road', 'location': 'Main Street', 'description': 'Pothole',
+            'latitude': '12.9716', 'longitude': '77.5946'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        complaint = Complaint.objects.get()
+        self.assertEqual((complaint.assigned_to_id, complaint.status), (contractor.pk, 'pending'))
+        contractor.refresh_from_db()
+        self.assertEqual(contractor.open_complaints, 1)
+
+    def test_backlog_assignment_leaves_complaints_pending(self):
+        backlog = [self.create_complaint(location=location) for location in ('Main Street', 'Main Street', 'Elm Road')]
+        local = Contractor.objects.create(name='Roads Ltd', email='roads@example.com', password='pw',
+                                          specialization='road', area_assigned='Main Street')
+        outside = Contractor.objects.create(name='Paving Co', email='paving@example.com', password='pw',
+                                            specialization='road', area_assigned='Elm Road')
+        rows = assignment.backlog_rows()
+        self.assertEqual(assignment.apply(assignment.AssignmentEngine.load().plan(rows)), 3)
+        assigned = dict(Complaint.objects.values_list('id', 'assigned_to_id'))
+        self.assertEqual([assigned[complaint.pk] for complaint in backlog], [local.pk, local.pk, outside.pk])
+        self.assertEqual(set(Complaint.objects.values_list('status', flat=True)), {'pending'})
+        self.assertEqual(dict(Contractor.objects.values_list('id', 'open_complaints')), {local.pk: 2, outside.pk: 1})
+
+
+class BatchCreateTests(ComplaintTestCase):
+    def item(self, **fields):
+        return {'category': 'road', 'location': 'Main Street', 'description': 'Pothole',
+                'latitude': '12.9716', 'longitude': '77.5946', **fields}
+
+    def test_all_valid_is_created(self):
+        response = self.api.post('/api/complaints/batch/', [self.item(), self.item(category='water')], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 0))
+        self.assertEqual([result['id'] for result in response.data['results']],
+                         list(Complaint.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_partial_failure_is_a_multi_status(self):
+        response = self.api.post('/api/complaints/batch/', {'complaints': [
+            self.item(), self.item(category='volcano'), self.item(location='Elm Road')]}, format='json')
+        self.assertEqual(response.status_code, 207)
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], ['created', 'invalid', 'created'])
+        self.assertIn('category', results[1]['errors'])
+        self.assertEqual(sorted(Complaint.objects.values_list('location', flat=True)), ['Elm Road', 'Main Street'])
+        self.assertTrue(all(report_ids.has_valid_check_digit(result['report_id'])
+                            for result in results if result['status'] == 'created'))
+
+    def test_nothing_valid_is_a_bad_request(self):
+        response = self.api.post('/api/complaints/batch/', [self.item(category='volcano')], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Complaint.objects.exists())
+
+    def test_oversized_and_empty_batches_are_refused(self):
+        too_many = [self.item()] * (ComplaintViewSet.max_batch_size + 1)
+        self.assertEqual(self.api.post('/api/complaints/batch/', too_many, format='json').status_code, 400)
+        self.assertEqual(self.api.post('/api/complaints/batch/', [], format='json').status_code, 400)
+        self.assertFalse(Complaint.objects.exists())
+
+
+class ReportIdTests(ComplaintTestCase):
+    def test_check_character_catches_typos_and_transpositions(self):
+        report_id = report_ids.format_report_id(1234, 0b10011_00111_10111_11101)    # Random part K7QX
+        self.assertEqual(report_id, 'URB016JK7QXH')
+        self.assertTrue(report_ids.has_valid_check_digit(report_id))
+        self.assertFalse(report_ids.has_valid_check_digit('URB016JK7QXG'))    # Wrong last character
+        self.assertFalse(report_ids.has_valid_check_digit('URB016JKQ7XH'))    # 7Q -> Q7
+        self.assertEqual(report_ids.normalize(' urb-o16j k7qx h'), report_id)  # O read as 0
+        self.assertTrue(report_ids.has_valid_check_digit('URB0012344071930'))   # Damm-checked format
+        self.assertFalse(report_ids.has_valid_check_digit('URB0012344701930'))
+        self.assertTrue(report_ids.has_valid_check_digit('URB123456'))          # Legacy format
+
+    def test_ids_are_short_and_not_guessable_from_their_neighbours(self):
+        first, second = self.create_complaint(), self.create_complaint()
+        for complaint in (first, second):
+            self.assertEqual(len(complaint.report_id), 12)
+            self.assertTrue(report_ids.has_valid_check_digit(complaint.report_id))
+        # The same sequence number with a different random part is another, unknown ID
+        secret = first.report_id[-1 - report_ids.SECRET_CHARS:-1]
+        number = first.report_id[len(report_ids.PREFIX):-1 - report_ids.SECRET_CHARS]
+        other = report_ids.ALPHABET[(report_ids.ALPHABET.index(secret[0]) + 1) % 32] + secret[1:]
+        guess = report_ids.PREFIX + number + other
+        guess += report_ids.ALPHABET[report_ids.check_value(guess[len(report_ids.PREFIX):] + '0')]
+        self.assertTrue(report_ids.has_valid_check_digit(guess))
+        self.assertFalse(Complaint.objects.filter(report_id=guess).exists())
+
+    def test_track_page_rejects_typos_before_the_lookup(self):
+        complaint = self.create_complaint()
+        self.client.force_login(self.citizen)
+        last = report_ids.ALPHABET.index(complaint.report_id[-1])
+        typo = complaint.report_id[:-1] + report_ids.ALPHABET[(last + 1) % 32]
+        with self.assertNumQueries(0):
+            response = self.client.post('/track/', {'report_id': typo}, follow=False)
+        self.assertEqual(response.status_code, 302)
+
+        response = self.client.post('/track/', {'report_id': complaint.report_id.lower()})
+        self.assertEqual(self.client.session['tracked_complaint']['report_id'], complaint.report_id)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import (
@@ -13,17 +14,19 @@ router.register(r'complaints', views.ComplaintViewSet, basename='complaint')
 # --- URL Patterns ---
 urlpatterns = [
     # 1. Original Website URLs
-    path('', views.home, name="home"),
+    path('', views.ahome if settings.ASYNC_VIEWS else views.home, name="home"),
     path('signup/', views.signup, name="signup"),
     path('signin/', views.signin, name="signin"),
     path('signout/', views.signout, name="signout"),
     path('report/', views.report, name="report"),
-    path("track/", views.track_complaint, name="track"),
+    path("track/", views.atrack_complaint if settings.ASYNC_VIEWS else views.track_complaint, name="track"),
+    path("track/<str:report_id>/live/", views.complaint_live, name="complaint_live"),
     path('role_select/', views.role_select, name='role_select'),
     # 2. API URLs (now grouped under 'api/')
     path('api/register/', views.RegisterView.as_view(), name='api-register'),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/map/complaints/', views.ComplaintMapView.as_view(), name='api-complaint-map'),
     
     # Include the router-generated URLs under the 'api/' prefix
     path('api/', include(router.urls)),
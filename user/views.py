@@ -1,16 +1,33 @@
 from django.shortcuts import redirect, render
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse
 from django.contrib.auth.models import User
 from django.contrib import messages 
 from django.contrib.auth import authenticate,login,logout
 from django.contrib.auth.decorators import login_required
 from django.db.models import Count
 from django.shortcuts import get_object_or_404
-from rest_framework import generics, viewsets, permissions
+from rest_framework import generics, viewsets, permissions, status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from .serializers import UserSerializer, ComplaintSerializer
 from django.http import JsonResponse
-from .models import Complaint
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from functools import partial
+from asgiref.sync import sync_to_async
+import asyncio
+import hashlib
+from .models import Complaint, ComplaintCollectionVersion
+from .pagination import ComplaintCursorPagination
+from . import assignment, geo, live, report_ids
+from .duplicates import duplicate_index
 
 class RegisterView(generics.CreateAPIView):
     """
@@ -27,6 +44,10 @@ class ComplaintViewSet(viewsets.ModelViewSet):
     """
     serializer_class = ComplaintSerializer
     permission_classes = [permissions.IsAuthenticated] # Only authenticated users can access
+    # Session / basic as before, plus the access tokens from /api/token/
+    authentication_classes = [*api_settings.DEFAULT_AUTHENTICATION_CLASSES, JWTAuthentication]
+    pagination_class = ComplaintCursorPagination # ?cursor= / ?page_size=
+    max_batch_size = 200 # Largest accepted POST to /api/complaints/batch/
 
     def get_queryset(self):
         """
@@ -35,12 +56,309 @@ class ComplaintViewSet(viewsets.ModelViewSet):
         """
         return Complaint.objects.filter(user=self.request.user)
 
+    def get_serializer(self, *args, **kwargs):
+        """
+        On reads, apply the sparse fieldset: ?fields=id,status keeps only those
+        fields, ?omit=user,category_display drops them.
+        """
+        if self.request.method in ('GET', 'HEAD'):
+            available = set(self.serializer_class.Meta.fields) | {'user', 'category_display'}
+            for param in ('fields', 'omit'):
+                if param in self.request.query_params:
+                    names = [name.strip() for name in self.request.query_params[param].split(',') if name.strip()]
+                    unknown = set(names) - available
+                    if unknown:
+                        raise ValidationError({param: f"Unknown fields: {', '.join(sorted(unknown))}."})
+                    kwargs[param] = names
+        return super().get_serializer(*args, **kwargs)
+
+    def _list_rows(self):
+        # Fast path: .values() rows, no model instances
+        serializer = self.get_serializer()
+        ordering = {'submitted_at', 'id'}   # Needed for the cursor
+        return serializer, self.filter_queryset(self.get_queryset()).values(*(serializer.values_columns() | ordering))
+
+    def _list_page(self, request):
+        serializer, rows = self._list_rows()
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(serializer.represent_rows(page))
+
+    # --- Conditional GETs: polls that change nothing get a 304 before any serialization ---
+    def _etag(self, request, *version):
+        """
+        Strong ETag for one representation: the data version, the nested user, the
+        query string and the negotiated format.
+        """
+        user = request.user
+        parts = (*version, user.pk, user.username, user.email,
+                 request.accepted_renderer.format, request.META.get('QUERY_STRING', ''))
+        return quote_etag(hashlib.sha256('|'.join(map(str, parts)).encode()).hexdigest()[:32])
+
+    def _conditional_get(self, request, etag, last_modified, render):
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = render()
+        return self._set_validators(response, etag, last_modified)
+
+    def _set_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        # One primary-key lookup; bumped on every create/change/delete of the user's complaints
+        version, changed_at = ComplaintCollectionVersion.current(request.user.pk)
+        etag = self._etag(request, 'list', version)
+        return self._conditional_get(request, etag, changed_at, partial(self._list_page, request))
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = {self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        try:
+            updated_at = self.get_queryset().filter(**lookup).values_list('updated_at', flat=True).first()
+        except (TypeError, ValueError):
+            updated_at = None
+        if updated_at is None:
+            raise NotFound()
+        etag = self._etag(request, 'detail', lookup, updated_at.isoformat())
+        return self._conditional_get(request, etag, updated_at, partial(super().retrieve, request, *args, **kwargs))
+
+    # --- ASGI (settings.ASYNC_VIEWS): list and retrieve on the event loop ---
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        """
+        With ASYNC_VIEWS, GET and HEAD on the list and detail routes are served by
+        adispatch(), which awaits its queries instead of holding a worker thread for
+        the whole request. Other methods run the regular view in the thread pool.
+        """
+        view = super().as_view(actions, **initkwargs)
+        if not settings.ASYNC_VIEWS or (actions or {}).get('get') not in ('list', 'retrieve'):
+            return view
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await sync_view(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.action_map = {'get': actions['get'], 'head': actions['get']}
+            return await self.adispatch(request, *args, **kwargs)
+
+        async_view.cls, async_view.initkwargs, async_view.actions = view.cls, view.initkwargs, view.actions
+        return csrf_exempt(async_view)
+
+    async def adispatch(self, request, *args, **kwargs):
+        """
+        dispatch() for alist() / aretrieve(): the same request set-up, checks, error
+        handling and response finalizing, with authentication awaited first.
+        """
+        self.args, self.kwargs = args, kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await self._aauthenticate(request)
+            self.initial(request, *args, **kwargs)
+            handler = self.alist if self.action == 'list' else self.aretrieve
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def _aauthenticate(self, request):
+        """
+        Request._authenticate() without blocking the loop: the session user comes from
+        auser(), and the other authenticators (JWT, basic) run in the thread pool,
+        where the async ORM runs its queries too.
+        """
+        for authenticator in request.authenticators:
+            try:
+                if isinstance(authenticator, SessionAuthentication):
+                    # No CSRF check: only GET and HEAD get here
+                    user = await request._request.auser()
+                    result = (user, None) if user.is_active else None
+                else:
+                    result = await sync_to_async(authenticator.authenticate)(request)
+            except APIException:
+                request._not_authenticated()
+                raise
+            if result is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = result
+                return
+        request._not_authenticated()
+
+    async def _aconditional_get(self, request, etag, last_modified, render):
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await render()
+        return self._set_validators(response, etag, last_modified)
+
+    async def alist(self, request, *args, **kwargs):
+        version, changed_at = await ComplaintCollectionVersion.acurrent(request.user.pk)
+        etag = self._etag(request, 'list', version)
+
+        async def render():
+            serializer, rows = self._list_rows()
+            # One query for the page, through the thread pool like the async ORM's own methods
+            page = await sync_to_async(self.paginate_queryset)(rows)
+            return self.get_paginated_response(serializer.represent_rows(page))
+
+        return await self._aconditional_get(request, etag, changed_at, render)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        # The validators and the representation come from the same single-row query
+        lookup = {self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        serializer = self.get_serializer()
+        try:
+            row = await self.get_queryset().filter(**lookup) \
+                .values(*serializer.values_columns(), 'updated_at').afirst()
+        except (TypeError, ValueError):
+            row = None
+        if row is None:
+            raise NotFound()
+        etag = self._etag(request, 'detail', lookup, row['updated_at'].isoformat())
+
+        async def render():
+            return Response(serializer.represent_rows([row])[0])
+
+        return await self._aconditional_get(request, etag, row['updated_at'], render)
+
     def perform_create(self, serializer):
         """
-        Automatically associate the complaint with the logged-in user upon creation.
+        Automatically associate the complaint with the logged-in user upon creation,
+        linking it to an open duplicate nearby if there is one.
+        """
+        data = serializer.validated_data
+        duplicate_id = duplicate_index.find_duplicate(
+            data.get('category'), data.get('latitude'), data.get('longitude'), data.get('description'),
+        )
+        # Duplicates follow their original; everything else goes straight to a contractor
+        contractor_id = None if duplicate_id else assignment.choose_contractor(data.get('category'), data.get('location'))
+        complaint = serializer.save(user=self.request.user, duplicate_of_id=duplicate_id, assigned_to_id=contractor_id)
+        if not duplicate_id:
+            duplicate_index.register(complaint)
+
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch_create(self, request):
+        """
+        Create up to `max_batch_size` complaints in one request and one transaction.
+
+        The body is a JSON list of complaints, or {"complaints": [...]}. Invalid items
+        are skipped and the rest are still created. The response holds one result per
+        item, in order, e.g. {"index": 0, "status": "created", "id": 7, "report_id": "URB0007K7QXQ"}
+        or {"index": 1, "status": "invalid", "errors": {...}}.
         """
-        serializer.save(user=self.request.user)
+        items = request.data.get('complaints') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError("Expected a non-empty list of complaints.")
+        if len(items) > self.max_batch_size:
+            raise ValidationError(f"A batch can hold at most {self.max_batch_size} complaints.")
+
+        serializer = self.get_serializer(data=items, many=True)
+        if serializer.is_valid():
+            errors = {}
+            valid_data = serializer.validated_data
+        else:
+            # Re-validate just the good items so they can still go in
+            errors = {index: error for index, error in enumerate(serializer.errors) if error}
+            valid = self.get_serializer(data=[item for index, item in enumerate(items) if index not in errors], many=True)
+            valid.is_valid(raise_exception=True)
+            valid_data = valid.validated_data
+
+        duplicate_ids = duplicate_index.find_duplicates([
+            (data.get('category'), data.get('latitude'), data.get('longitude'), data.get('description'))
+            for data in valid_data
+        ])
+        engine = assignment.AssignmentEngine.load(categories={data.get('category') for data in valid_data})
+        complaints = []
+        for data, duplicate_id in zip(valid_data, duplicate_ids):
+            contractor_id = None if duplicate_id else engine.choose(data.get('category'), data.get('location'))
+            complaints.append(Complaint(
+                user=request.user, duplicate_of_id=duplicate_id, assigned_to_id=contractor_id, **data,
+            ))
+        created = iter(Complaint.bulk_create_reports(complaints) if complaints else [])
+        for complaint in complaints:
+            if not complaint.duplicate_of_id:
+                duplicate_index.register(complaint)
+
+        results = []
+        for index in range(len(items)):
+            if index in errors:
+                results.append({'index': index, 'status': 'invalid', 'errors': errors[index]})
+            else:
+                complaint = next(created)
+                results.append({'index': index, 'status': 'created', 'id': complaint.pk,
+                                'report_id': complaint.report_id, 'duplicate_of': complaint.duplicate_of_id})
+
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        elif complaints:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'created': len(complaints), 'failed': len(errors), 'results': results},
+                        status=response_status)
         
+# 3. API View for map queries (bounding box / radius)
+class ComplaintMapView(APIView):
+    """
+    API endpoint returning complaints inside a viewport or around a point.
+
+    ?bbox=west,south,east,north            -> complaints inside the box
+    ?lat=..&lng=..&radius=<metres>         -> complaints within the radius, nearest first
+    Optional: ?category=, ?status=, ?limit= (default 500, max 2000)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    fields = ('id', 'report_id', 'category', 'status', 'latitude', 'longitude')
+    default_limit = 500
+    max_limit = 2000
+    max_radius_m = 50000
+
+    def _float(self, name, low, high):
+        try:
+            value = float(self.request.query_params[name])
+        except (KeyError, ValueError):
+            raise ValidationError({name: "A number is required."})
+        if not low <= value <= high:
+            raise ValidationError({name: f"Must be between {low} and {high}."})
+        return value
+
+    def get(self, request):
+        complaints = Complaint.objects.all()
+        if request.query_params.get('category'):
+            complaints = complaints.filter(category=request.query_params['category'])
+        if request.query_params.get('status'):
+            complaints = complaints.filter(status=request.query_params['status'])
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            raise ValidationError({'limit': "An integer is required."})
+
+        if 'bbox' in request.query_params:
+            try:
+                west, south, east, north = (float(v) for v in request.query_params['bbox'].split(','))
+            except ValueError:
+                raise ValidationError({'bbox': "Expected west,south,east,north."})
+            if not (-180 <= west <= east <= 180 and -90 <= south <= north <= 90):
+                raise ValidationError({'bbox': "Box must not cross the antimeridian and must be within world bounds."})
+            rows = list(geo.in_bbox(complaints, south, west, north, east).values(*self.fields)[:limit])
+        elif 'lat' in request.query_params:
+            latitude = self._float('lat', -90, 90)
+            longitude = self._float('lng', -180, 180)
+            radius = self._float('radius', 1, self.max_radius_m)
+            rows = geo.within_radius(complaints, latitude, longitude, radius, self.fields, limit)
+        else:
+            raise ValidationError("Pass either bbox=west,south,east,north or lat, lng and radius.")
+
+        for row in rows:
+            row['latitude'] = float(row['latitude'])
+            row['longitude'] = float(row['longitude'])
+        return Response({'count': len(rows), 'results': rows})
+
 def home(request):
     complaints = []
     status_counts = {
@@ -61,6 +379,34 @@ def home(request):
         'tracked_complaint': tracked_complaint,
     })
 
+async def _alist(queryset):
+    return [row async for row in queryset]
+
+async def ahome(request):
+    # home() for ASGI (settings.ASYNC_VIEWS): the status counts and the list are queried together
+    status_counts = {
+        'pending': 0,
+        'in_progress': 0,
+        'resolved': 0,
+    }
+    tracked_complaint = await request.session.apop('tracked_complaint', None)
+    request.user = user = await request.auser()    # Resolved here, so the templates never query
+    complaints = []
+    if user.is_authenticated:
+        user_complaints = Complaint.objects.filter(user=user)
+        counts, complaints = await asyncio.gather(
+            _alist(user_complaints.values('status').annotate(total=Count('status'))),
+            _alist(user_complaints),
+        )
+        for c in counts:
+            status_counts[c['status']] = c['total']
+
+    return render(request, "user/home.html", {
+        'complaints': complaints,
+        'status_counts': status_counts,
+        'tracked_complaint': tracked_complaint,
+    })
+
 @login_required # Ensure only logged-in users can access this view
 def report(request):
     if request.method == 'POST':
@@ -79,6 +425,11 @@ def report(request):
             return redirect('home') # Or render the form again with errors
         
         try:
+            # --- Link repeat reports of an open issue nearby ---
+            duplicate_id = duplicate_index.find_duplicate(category, latitude, longitude, description)
+            # --- Route it straight to a matching contractor (duplicates follow their original) ---
+            contractor_id = None if duplicate_id else assignment.choose_contractor(category, location)
+
             complaint = Complaint.objects.create(
                 user=request.user,
                 category=category,
@@ -87,11 +438,17 @@ def report(request):
                 photo=photo,
                 # --- SAVE THE COORDINATES TO THE DATABASE ---
                 latitude=latitude,
-                longitude=longitude
+                longitude=longitude,
                 # ---------------------------------------------
+                duplicate_of_id=duplicate_id,
+                assigned_to_id=contractor_id,
             )
             # The .save() is not needed when using .create()
             messages.success(request, f"Your complaint has been submitted successfully! Your Report ID is {complaint.report_id} ")
+            if duplicate_id:
+                messages.info(request, f"A similar complaint ({complaint.duplicate_of.report_id}) is already open nearby, so yours has been linked to it.")
+            else:
+                duplicate_index.register(complaint)
             return redirect('home') # Redirect to home or a success page
         except Exception as e:
             messages.error(request, f"An error occurred: {e}")
@@ -101,7 +458,11 @@ def report(request):
 
 def track_complaint(request):
     if request.method == "POST":
-        report_id = request.POST.get("report_id")
+        report_id = report_ids.normalize(request.POST.get("report_id"))
+        if not report_ids.has_valid_check_digit(report_id):
+            # Caught by the check digit, no lookup needed
+            messages.error(request, f"{report_id} is not a valid Report ID. Please check it for typos.")
+            return redirect("home")
         try:
             complaint = Complaint.objects.get(report_id=report_id)
             # Store the complaint in the session to be accessed by the home view
@@ -118,6 +479,29 @@ def track_complaint(request):
             return redirect("home")
     return redirect("home")
 
+async def atrack_complaint(request):
+    # track_complaint() for ASGI (settings.ASYNC_VIEWS)
+    if request.method == "POST":
+        report_id = report_ids.normalize(request.POST.get("report_id"))
+        if not report_ids.has_valid_check_digit(report_id):
+            messages.error(request, f"{report_id} is not a valid Report ID. Please check it for typos.")
+            return redirect("home")
+        complaint = await Complaint.objects.filter(report_id=report_id) \
+            .values('report_id', 'category', 'location', 'status', 'submitted_at').afirst()
+        if complaint is None:
+            messages.error(request, f"No complaint found with ID: {report_id}.")
+            return redirect("home")
+        complaint['submitted_at'] = complaint['submitted_at'].strftime("%b %d, %Y")
+        await request.session.aset('tracked_complaint', complaint)
+        return redirect('home')
+    return redirect("home")
+
+async def complaint_live(request, report_id):
+    # Server-Sent Events for a tracked complaint (anyone with the Report ID can already see its status)
+    if not await Complaint.objects.filter(report_id=report_id).aexists():
+        raise Http404("No such complaint.")
+    return live.sse_response(request, [f"complaint:{report_id}"])
+
 def signup(request):
     if request.method == 'POST':
         username = request.POST['username']